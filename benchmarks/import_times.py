@@ -0,0 +1,93 @@
+"""
+Import-time breakdown of the CLI entry points and core modules.
+
+Each target is imported in a fresh interpreter with `python -X importtime`. The script
+reports the total import time and the heaviest modules it pulled in, and lists any
+heavy ML packages (torch, transformers, spaCy, ...) that were imported. Graph-only
+targets must not import those: the ML stack is loaded lazily, on first real use.
+With --max-ms, the exit code is 1 when a graph-only target is slower or imports the ML
+stack, so a regression can fail CI.
+
+Usage (from the repo root):
+    python -m benchmarks.import_times
+    python -m benchmarks.import_times --top 15 --max-ms 1000 --json import_times.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+# Entry points that only need the graph, and the ones that are allowed to pull in the ML stack
+GRAPH_ONLY = ["src.graph.engine", "src.graph.storage", "convert_graph", "main", "serve",
+              "src.agents.historian", "src.agents.critic", "src.utils.loader", "ingest"]
+ML = ["src.llm.wrapper"]
+
+HEAVY = ("torch", "transformers", "spacy", "sentence_transformers", "vaderSentiment", "bitsandbytes", "accelerate")
+
+
+def import_profile(module):
+    """[(module, self us, cumulative us)] from -X importtime, plus the import error if any."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    rows, error = [], None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+    return rows, error
+
+
+def summarize(module, top):
+    rows, error = import_profile(module)
+    total_us = next((cum for name, _, cum in rows if name == module), sum(s for _, s, _ in rows))
+    heavy = sorted({name.split(".")[0] for name, _, _ in rows if name.split(".")[0] in HEAVY})
+    # Heaviest packages: self time summed per top-level package (every import counted once)
+    roots = {}
+    for name, self_us, _ in rows:
+        root = name.split(".")[0]
+        roots[root] = roots.get(root, 0) + self_us
+    heaviest = sorted(roots.items(), key=lambda item: -item[1])[:top]
+    return {"module": module, "total_ms": total_us / 1000, "modules": len(rows), "heavy": heavy,
+            "heaviest": [{"package": name, "ms": us / 1000} for name, us in heaviest], "error": error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", help="Modules to profile (default: all entry points)")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest packages to list per module")
+    parser.add_argument("--max-ms", type=float, default=None, help="Budget for graph-only targets")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = [summarize(m, args.top) for m in (args.modules or GRAPH_ONLY + ML)]
+    failures = []
+    print(f"{'module':<24} {'import ms':>10} {'modules':>8}  heavy ML packages")
+    for r in results:
+        print(f"{r['module']:<24} {r['total_ms']:>10.1f} {r['modules']:>8}  {', '.join(r['heavy']) or '-'}")
+        if r["error"]:
+            print(f"{'':<24} [import failed] {r['error']}")
+        heaviest = ", ".join(f"{h['package']} {h['ms']:.0f}" for h in r["heaviest"])
+        print(f"{'':<24} heaviest (ms): {heaviest}")
+        if r["module"] in GRAPH_ONLY and args.max_ms is not None:
+            if r["error"]:
+                failures.append(f"{r['module']} fails to import")
+            if r["heavy"]:
+                failures.append(f"{r['module']} imports {', '.join(r['heavy'])}")
+            if r["total_ms"] > args.max_ms:
+                failures.append(f"{r['module']} takes {r['total_ms']:.0f} ms (budget {args.max_ms:.0f} ms)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"[Regression] {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
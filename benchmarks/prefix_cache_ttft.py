@@ -0,0 +1,58 @@
+"""
+Time-to-first-token with and without the prefix KV cache.
+
+Builds Historian- and Critic-shaped prompts (static system prefix + 50 synthetic
+review facts), then times a 1-token generation through SCCLlama.generate_raw:
+once prefilling the whole prompt, and once continuing from the cached prefix
+state (cache warmed beforehand). Needs the GPU and the Llama-3 weights.
+
+Usage (from the repo root):
+    python -m benchmarks.prefix_cache_ttft --repeats 10
+"""
+import argparse
+import statistics
+import time
+
+from src.agents import critic, historian
+from src.llm.wrapper import SCCLlama
+
+
+def synthetic_facts(n=50):
+    return "\n".join(f"- Review: 'Synthetic review number {i}, the battery died after a week...' "
+                     f"(Topic: Product Quality, Durability, and Build, Sentiment: Negative)" for i in range(n))
+
+
+def ttft(llm, prompt, prefix, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        llm.generate_raw(prompt, prefix=prefix, max_new_tokens=1)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    llm = SCCLlama()
+    facts = synthetic_facts()
+    prompts = {
+        "historian": (historian.SYSTEM_PREFIX, historian.SYSTEM_PREFIX + f"DATASET (2016):\n{facts}\n"),
+        "critic": (critic.SYSTEM_PREFIX, critic.SYSTEM_PREFIX + f"Ground Truth Facts:\n{facts}\n"),
+    }
+
+    print(f"{'prompt':<10} {'tokens':>7} {'prefix':>7} {'TTFT full (ms)':>15} {'TTFT cached (ms)':>17}")
+    for name, (prefix, prompt) in prompts.items():
+        llm.generate_raw(prompt, max_new_tokens=1)                 # Warm-up
+        llm.generate_raw(prompt, prefix=prefix, max_new_tokens=1)  # Fills the prefix cache
+        full = ttft(llm, prompt, None, args.repeats)
+        cached = ttft(llm, prompt, prefix, args.repeats)
+        n_prompt = len(llm.tokenizer(prompt).input_ids)
+        n_prefix = len(llm.tokenizer(prefix).input_ids)
+        print(f"{name:<10} {n_prompt:>7} {n_prefix:>7} {full:>15.1f} {cached:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Synthetic-scale benchmark suite for the engine, persistence and ingestion hot paths.
+
+Cases (each runs in a fresh subprocess, so peak RSS is per case):
+  engine  add_data throughput, and add_batch throughput per batch size (the loader's path),
+          get_snapshot latency (cold / cached / token-budgeted),
+          save_to_disk and load_from_disk time, .tga size, snapshot latency after load;
+          fails if a year window's get_window_summary total differs from its get_window facts
+  loader  UnsupervisedLoader throughput on generated NDJSON and CSV files, with spaCy,
+          VADER and the topic classifier replaced by fast stand-ins (benchmarks/synthetic.py)
+
+Results are written as JSON (commit, environment, one record per case) so runs can be
+compared across commits with --compare.
+
+Usage (from the repo root):
+    python -m benchmarks.suite --edges 10000 100000 --out bench.json
+    python -m benchmarks.suite --edges 1000000 10000000 --backends columnar --skip-loader
+    python -m benchmarks.suite --edges 10000 --compare bench.json
+    python -m benchmarks.suite --edges 100000 --insert-batches 16 256 4096 --skip-loader
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from src.graph.cube import year_window
+from benchmarks.synthetic import Generator, stand_in_models, write_csv, write_ndjson, FIRST_YEAR, LAST_YEAR
+
+# Durations and sizes are lower-is-better; throughputs ("..._per_s") higher-is-better
+LOWER_IS_BETTER = ("_ms", "_s", "_mb")
+
+# Triples materialised per timed insert section
+INSERT_CHUNK = 50_000
+
+
+def lower_is_better(metric):
+    name = metric.split(".")[0]
+    return not name.endswith("_per_s") and name.endswith(LOWER_IS_BETTER)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    return {"p50": round(statistics.median(ordered), 3),
+            "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3)}
+
+
+def time_snapshots(engine, queries, **kwargs):
+    timings = []
+    for brand, date in queries:
+        t0 = time.perf_counter()
+        engine.get_snapshot(date, target_brand=brand, **kwargs)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return percentiles(timings)
+
+
+def check_window_counts(engine, queries, n=20):
+    """
+    Raises if get_window_summary's total for a year window differs from the number of
+    get_window facts for it (both must cover exactly the reviews written that year).
+    """
+    for brand, date in queries[:n]:
+        window = year_window(date.year - 1)
+        facts = engine.get_window(brand, *window, limit=None)
+        n_facts = 0 if facts.startswith("No recorded") else len(facts.splitlines())
+        summary = engine.get_window_summary(brand, *window).splitlines()[0]
+        total = int(summary.rsplit(": ", 1)[1]) if summary.startswith("All reviews") else 0
+        if total != n_facts:
+            raise RuntimeError(f"{brand} {date.year - 1}: window summary counts {total}, get_window has {n_facts}")
+
+
+def snapshot_queries(generator, n=200):
+    """Brands drawn with the same skew as the reviews, at dates spread over the data."""
+    brands = generator.sample_brand(n)
+    years = generator.rng.integers(FIRST_YEAR + 1, LAST_YEAR + 2, size=n)
+    return [(generator.brands[b], datetime(int(y), 1, 1)) for b, y in zip(brands, years)]
+
+
+def batches(triples, size):
+    batch = []
+    for triple in triples:
+        batch.append(triple)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- CASES (run in the child process) ---
+def run_engine(backend, n_edges, n_brands, insert_batches, workdir):
+    from src.graph.engine import TemporalGraphEngine
+    n_brands = min(n_brands, max(1, n_edges // 2))
+
+    # Bulk path first (each engine is dropped before the next is built); same seed, same data.
+    # Triples are generated in chunks outside the timed sections, so only inserts are timed
+    add_batch_per_s = {}
+    for size in insert_batches:
+        engine = TemporalGraphEngine(backend=backend)
+        elapsed = 0.0
+        for chunk in batches(Generator(n_brands=n_brands).triples(n_edges), max(size, INSERT_CHUNK)):
+            t0 = time.perf_counter()
+            for batch in batches(chunk, size):
+                engine.add_batch(batch)
+            elapsed += time.perf_counter() - t0
+        add_batch_per_s[str(size)] = round(n_edges / elapsed)
+        del engine
+
+    generator = Generator(n_brands=n_brands)
+    engine = TemporalGraphEngine(backend=backend)
+    add_s = 0.0
+    for chunk in batches(generator.triples(n_edges), INSERT_CHUNK):
+        t0 = time.perf_counter()
+        for brand, review, edge in chunk:
+            engine.add_data(brand, review, edge)
+        add_s += time.perf_counter() - t0
+
+    queries = snapshot_queries(generator)
+    engine.snapshot_cache.clear()
+    cold = time_snapshots(engine, queries)
+    warm = time_snapshots(engine, queries)
+    engine.snapshot_cache.clear()
+    budgeted = time_snapshots(engine, queries, limit=None, token_budget=2048, ranking="coverage")
+    check_window_counts(engine, queries)
+
+    path = os.path.join(workdir, f"bench_{backend}_{n_edges}.tga")
+    t0 = time.perf_counter()
+    engine.save_to_disk(path)
+    save_s = time.perf_counter() - t0
+    file_mb = os.path.getsize(path) / 2**20
+    del engine
+
+    loaded = TemporalGraphEngine()
+    t0 = time.perf_counter()
+    loaded.load_from_disk(path)
+    load_s = time.perf_counter() - t0
+    after_load = time_snapshots(loaded, queries)
+    check_window_counts(loaded, queries)
+    return {"add_edges_per_s": round(n_edges / add_s), "add_s": round(add_s, 3),
+            "add_batch_edges_per_s": add_batch_per_s,
+            "snapshot_cold_ms": cold, "snapshot_cached_ms": warm, "snapshot_budgeted_ms": budgeted,
+            "save_s": round(save_s, 3), "file_mb": round(file_mb, 2), "load_s": round(load_s, 4),
+            "snapshot_after_load_ms": after_load}
+
+
+def run_loader(fmt, n_rows, n_brands, backend, workdir):
+    from src.graph.engine import TemporalGraphEngine
+    from src.utils.loader import UnsupervisedLoader
+    generator = Generator(n_brands=min(n_brands, max(1, n_rows // 2)))
+    data_dir = os.path.join(workdir, f"loader_{fmt}_{n_rows}")
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"reviews.{'json' if fmt == 'ndjson' else 'csv'}")
+    (write_ndjson if fmt == "ndjson" else write_csv)(path, n_rows, generator)
+
+    engine = TemporalGraphEngine(backend=backend)
+    loader = UnsupervisedLoader(engine, None, models=stand_in_models())
+    t0 = time.perf_counter()
+    loader.load_directory(data_dir)
+    elapsed = time.perf_counter() - t0
+    return {"rows_per_s": round(n_rows / elapsed), "load_directory_s": round(elapsed, 3),
+            "edges": engine.number_of_edges(), "input_mb": round(os.path.getsize(path) / 2**20, 2)}
+
+
+def child(spec):
+    with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(io.StringIO()):
+        if spec["case"] == "engine":
+            metrics = run_engine(spec["backend"], spec["size"], spec["brands"], spec["insert_batches"], workdir)
+        else:
+            metrics = run_loader(spec["format"], spec["size"], spec["brands"], spec["backend"], workdir)
+    return {**spec, **metrics, "peak_rss_mb": round(peak_rss_mb(), 1)}
+
+
+# --- DRIVER ---
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(spec, timeout):
+    try:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", json.dumps(spec)],
+                              capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {**spec, "error": f"timed out after {timeout}s"}
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or [f"exit {proc.returncode} (likely out of memory)"]
+        return {**spec, "error": last[0]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def case_id(r):
+    return f"{r['case']}/{r.get('backend')}/{r.get('format', '-')}/{r['size']}"
+
+
+def flatten(record):
+    out = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            out.update({f"{key}.{k}": v for k, v in value.items()})
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in ("size", "brands"):
+            out[key] = value
+    return out
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {case_id(r): flatten(r) for r in json.load(f)["results"] if "error" not in r}
+    print(f"\nChange vs {baseline_path} (+ = better):")
+    for r in results:
+        old = baseline.get(case_id(r))
+        if old is None or "error" in r:
+            continue
+        cells = []
+        for metric, value in flatten(r).items():
+            if metric not in old or not old[metric] or metric == "edges":
+                continue
+            ratio = value / old[metric]
+            gain = (1 / ratio - 1) if lower_is_better(metric) else (ratio - 1)
+            cells.append(f"{metric} {gain:+.0%}")
+        print(f"  {case_id(r)}: " + ", ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--edges", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", default=["networkx", "columnar"])
+    parser.add_argument("--brands", type=int, default=5000, help="Distinct brands (Zipf-skewed popularity)")
+    parser.add_argument("--insert-batches", type=int, nargs="+", default=[16, 256],
+                        help="add_batch sizes to time against per-edge add_data")
+    parser.add_argument("--loader-rows", type=int, nargs="+", default=[20_000])
+    parser.add_argument("--skip-loader", action="store_true")
+    parser.add_argument("--timeout", type=int, default=3600, help="Seconds per case")
+    parser.add_argument("--out", default=None, help="Write the results as JSON here")
+    parser.add_argument("--compare", default=None, help="Earlier --out file to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(json.loads(args.child))))
+        return
+
+    specs = [{"case": "engine", "backend": b, "size": n, "brands": args.brands, "insert_batches": args.insert_batches}
+             for n in args.edges for b in args.backends]
+    if not args.skip_loader:
+        specs += [{"case": "loader", "format": fmt, "backend": "columnar", "size": n, "brands": args.brands}
+                  for n in args.loader_rows for fmt in ("ndjson", "csv")]
+
+    results = []
+    for spec in specs:
+        r = run_case(spec, args.timeout)
+        results.append(r)
+        if "error" in r:
+            print(f"[Bench] {case_id(r):<32} failed: {r['error']}")
+        elif r["case"] == "engine":
+            bulk = "  ".join(f"batch {size} {rate:,}/s" for size, rate in r["add_batch_edges_per_s"].items())
+            print(f"[Bench] {case_id(r):<32} add {r['add_edges_per_s']:>9,}/s ({bulk})  "
+                  f"snapshot p50 {r['snapshot_cold_ms']['p50']:.2f} ms (cached {r['snapshot_cached_ms']['p50']:.3f}, "
+                  f"budgeted {r['snapshot_budgeted_ms']['p50']:.2f})  save {r['save_s']:.2f} s  "
+                  f"load {r['load_s']:.3f} s  {r['file_mb']:.1f} MB  peak RSS {r['peak_rss_mb']:.0f} MB")
+        else:
+            print(f"[Bench] {case_id(r):<32} {r['rows_per_s']:>9,} rows/s  {r['edges']:,} edges  "
+                  f"peak RSS {r['peak_rss_mb']:.0f} MB")
+
+    report = {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "machine": platform.machine(),
+              "cpus": os.cpu_count(), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] Results written to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
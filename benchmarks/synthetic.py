@@ -0,0 +1,198 @@
+"""
+Synthetic brand/review data for benchmarks, plus fast stand-ins for the ingestion models.
+
+Brands follow a Zipf-like popularity skew (a few brands get most reviews), review dates
+spread over 2005-2018 with volume growing every year, and the review text names the
+brand, a product aspect and an opinion. The same generator produces engine triples
+(iter_triples) and NDJSON / CSV files in the Amazon review layout the loader reads.
+
+The stand-ins replace spaCy NER, VADER and the topic classifier with regex/keyword rules,
+and the review embedding model with hashed bag-of-words vectors, so benchmarks measure
+the pipeline itself rather than model inference.
+"""
+import csv
+import json
+import re
+import zlib
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.graph.schema import Node, TemporalEdge, MarketingTopic, Sentiment
+
+SYLLABLES = ["zen", "tri", "vox", "lum", "kor", "bel", "mar", "qui", "dex", "nor", "ael", "tav"]
+SUFFIXES = ["Labs", "Works", "Audio", "Goods", "Tech", "Gear"]
+BRAND_PATTERN = re.compile(r"\b[A-Z][a-z]+ (?:" + "|".join(SUFFIXES) + r")\b")
+
+PRODUCTS = ["charger", "headphones", "blender", "backpack", "keyboard", "lamp", "kettle", "speaker"]
+ASPECTS = {
+    MarketingTopic.QUALITY: ["build", "stitching", "durability"],
+    MarketingTopic.PRICE: ["price", "value", "cost"],
+    MarketingTopic.SERVICE: ["shipping", "support", "refund"],
+    MarketingTopic.PERFORMANCE: ["battery", "speed", "reliability"],
+    MarketingTopic.USABILITY: ["design", "setup", "buttons"],
+    MarketingTopic.GENERAL: ["experience", "purchase", "product"],
+}
+OPINIONS = {1: "terrible", 2: "disappointing", 3: "okay", 4: "good", 5: "excellent"}
+POSITIVE_WORDS = {"good", "excellent", "great", "love"}
+NEGATIVE_WORDS = {"terrible", "disappointing", "broke", "awful"}
+
+TOPICS = list(MarketingTopic)
+FIRST_YEAR, LAST_YEAR = 2005, 2018
+
+
+def brand_name(i):
+    """Unique, NER-friendly brand name for index i (e.g. 'Zentrivox Labs')."""
+    digits = []
+    n = i
+    for _ in range(3):
+        digits.append(n % len(SYLLABLES))
+        n //= len(SYLLABLES)
+    stem = "".join(SYLLABLES[d] for d in digits) + ("" if n == 0 else "".join(SYLLABLES[int(c)] for c in str(n)))
+    return f"{stem.capitalize()} {SUFFIXES[i % len(SUFFIXES)]}"
+
+
+class Generator:
+    """Seeded sampler of synthetic reviews; columns are drawn in NumPy chunks."""
+
+    def __init__(self, n_brands=5000, skew=1.1, growth=1.25, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.brands = [brand_name(i) for i in range(n_brands)]
+        weights = 1.0 / np.arange(1, n_brands + 1) ** skew
+        self.brand_p = weights / weights.sum()
+        years = np.arange(FIRST_YEAR, LAST_YEAR + 1)
+        volume = growth ** (years - FIRST_YEAR)
+        self.years, self.year_p = years, volume / volume.sum()
+
+    def popular_brands(self, k):
+        return self.brands[:k]
+
+    def sample_brand(self, size):
+        return self.rng.choice(len(self.brands), size=size, p=self.brand_p)
+
+    def chunks(self, n, chunk=100_000):
+        """Yields dicts of column arrays (brand, timestamp, topic, rating) covering n reviews."""
+        year_start = {y: datetime(int(y), 1, 1, tzinfo=timezone.utc).timestamp() for y in self.years}
+        for offset in range(0, n, chunk):
+            size = min(chunk, n - offset)
+            years = self.rng.choice(self.years, size=size, p=self.year_p)
+            starts = np.array([year_start[y] for y in years])
+            yield {
+                "offset": offset,
+                "brand": self.sample_brand(size),
+                "timestamp": (starts + self.rng.random(size) * 365 * 86400).astype(np.int64),
+                "topic": self.rng.integers(0, len(TOPICS), size=size),
+                # J-shaped star ratings, as on Amazon
+                "rating": self.rng.choice([1, 2, 3, 4, 5], size=size, p=[0.1, 0.06, 0.09, 0.2, 0.55]),
+                "product": self.rng.integers(0, len(PRODUCTS), size=size),
+            }
+
+    def _text(self, brand, topic, rating, product, i):
+        aspect = ASPECTS[TOPICS[topic]][i % 3]
+        return (f"The {PRODUCTS[product]} from {brand} arrived on time. "
+                f"The {aspect} is {OPINIONS[rating]}, review number {i}.")
+
+    def rows(self, n):
+        """Review dicts in the Amazon layout (reviewText, summary, overall, unixReviewTime)."""
+        for c in self.chunks(n):
+            for j in range(len(c["brand"])):
+                i = c["offset"] + j
+                rating = int(c["rating"][j])
+                yield {"reviewerID": f"U{i}", "asin": f"B{i:09d}",
+                       "reviewText": self._text(self.brands[c["brand"][j]], c["topic"][j], rating, c["product"][j], i),
+                       "summary": f"{OPINIONS[rating].capitalize()} {PRODUCTS[c['product'][j]]}",
+                       "overall": float(rating), "unixReviewTime": int(c["timestamp"][j])}
+
+    def triples(self, n):
+        """(brand Node, review Node, TemporalEdge) triples, as the loader would produce them."""
+        for c in self.chunks(n):
+            for j in range(len(c["brand"])):
+                i = c["offset"] + j
+                brand, rating, topic = self.brands[c["brand"][j]], int(c["rating"][j]), c["topic"][j]
+                sentiment = Sentiment.POSITIVE if rating >= 4 else Sentiment.NEGATIVE if rating <= 2 else Sentiment.NEUTRAL
+                review = f"Rev_syn_{i}"
+                text = self._text(brand, topic, rating, c["product"][j], i)
+                edge = TemporalEdge(brand, review, "REVIEWED_IN", TOPICS[topic], sentiment,
+                                    datetime.fromtimestamp(int(c["timestamp"][j])))
+                yield Node(brand, "Brand"), Node(review, "Review", {"text": text, "rating": rating}), edge
+
+
+def write_ndjson(path, n, generator):
+    with open(path, "w") as f:
+        for row in generator.rows(n):
+            f.write(json.dumps(row) + "\n")
+
+
+def write_csv(path, n, generator):
+    fields = ["reviewerID", "asin", "reviewText", "summary", "overall", "unixReviewTime"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(generator.rows(n))
+
+
+# --- MODEL STAND-INS (see UnsupervisedLoader(models=...)) ---
+class StandInNER:
+    """spaCy-shaped: pipe(texts) -> docs whose .ents are the brand-pattern matches, labelled ORG."""
+    meta = {"name": "standin_ner", "version": "0"}
+
+    def pipe(self, texts, batch_size=None):
+        for text in texts:
+            ents = [SimpleNamespace(text=m.group(0), label_="ORG") for m in BRAND_PATTERN.finditer(text)]
+            yield SimpleNamespace(ents=ents)
+
+
+class StandInVader:
+    def polarity_scores(self, text):
+        words = set(text.lower().replace(".", " ").split())
+        score = len(words & POSITIVE_WORDS) - len(words & NEGATIVE_WORDS)
+        return {"compound": max(-1.0, min(1.0, 0.5 * score))}
+
+
+class StandInClassifier:
+    """Called like the zero-shot pipeline; ranks labels by aspect keyword hits."""
+    model_id = "standin-keywords"
+
+    def __init__(self):
+        self.keywords = {t.value: set(words) for t, words in ASPECTS.items()}
+
+    def __call__(self, texts, candidate_labels, batch_size=None):
+        single = isinstance(texts, str)
+        results = []
+        for text in [texts] if single else texts:
+            words = set(text.lower().replace(".", " ").split())
+            hits = [len(words & self.keywords.get(label, set())) for label in candidate_labels]
+            order = sorted(range(len(candidate_labels)), key=lambda j: -hits[j])
+            total = sum(hits) or 1
+            results.append({"sequence": text, "labels": [candidate_labels[j] for j in order],
+                            "scores": [hits[j] / total for j in order]})
+        return results[0] if single else results
+
+
+class StandInEncoder:
+    """ReviewEncoder-shaped: a hashed bag of words projected to `dim` dimensions, L2-normalised."""
+    model_id = "standin-hashing"
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self._words = {}
+
+    def _word(self, word):
+        vector = self._words.get(word)
+        if vector is None:
+            # Seeded by the word itself, so every process maps it to the same vector
+            seed = zlib.crc32(word.encode("utf-8"))
+            vector = self._words[word] = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def encode(self, texts, batch_size=None):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                out[i] += self._word(word)
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+def stand_in_models():
+    return {"nlp": StandInNER(), "vader": StandInVader(), "classifier": StandInClassifier()}
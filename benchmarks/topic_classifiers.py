@@ -0,0 +1,89 @@
+"""
+Topic classifier comparison: BART zero-shot vs the sentence-embedding mode.
+
+Runs both classifiers over the same sample of reviews (text built and truncated
+exactly as the loader does), and reports throughput in reviews/sec plus how often
+each mode agrees with the BART labels, overall and per BART label.
+
+Usage (from the repo root):
+    python -m benchmarks.topic_classifiers --data data/amazon_data/Electronics.json --reviews 500
+"""
+import argparse
+import csv
+import json
+import time
+from collections import Counter
+
+from src.graph.schema import MarketingTopic
+from src.utils.topics import load_topic_classifier, DEFAULT_EMBEDDING_MODEL
+
+LABELS = [t.value for t in MarketingTopic]
+BATCH_SIZES = {"zeroshot": 16, "embedding": 256}
+
+
+def read_reviews(path, limit):
+    texts = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        rows = (json.loads(line) for line in f) if path.endswith('.json') else csv.DictReader(f)
+        for row in rows:
+            row_lower = {k.lower(): v for k, v in row.items()}
+            text = row_lower.get('reviewtext', row_lower.get('text', ''))
+            summary = row_lower.get('summary', row_lower.get('title', ''))
+            full_text = f"{summary} . {text}"
+            if len(full_text) < 15: continue
+            texts.append(full_text[:512])
+            if len(texts) >= limit: break
+    return texts
+
+
+def run(mode, texts, embedding_model):
+    classifier, model_id = load_topic_classifier(mode, embedding_model)
+    batch_size = BATCH_SIZES[mode]
+    classifier(texts[:2], candidate_labels=LABELS, batch_size=batch_size)  # Warm-up
+    t0 = time.perf_counter()
+    labels = []
+    for i in range(0, len(texts), batch_size):
+        results = classifier(texts[i:i + batch_size], candidate_labels=LABELS, batch_size=batch_size)
+        results = [results] if isinstance(results, dict) else results
+        labels.extend(r['labels'][0] for r in results)
+    elapsed = time.perf_counter() - t0
+    return {"mode": mode, "model": model_id, "reviews": len(texts), "seconds": round(elapsed, 2),
+            "reviews_per_sec": round(len(texts) / elapsed, 1)}, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--data", required=True, help="CSV or NDJSON review file")
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--embedding-model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    texts = read_reviews(args.data, args.reviews)
+    print(f"[BENCH] {len(texts)} reviews from {args.data}")
+
+    reference, bart_labels = run("zeroshot", texts, args.embedding_model)
+    reference["agreement"] = 1.0
+    results = [reference]
+
+    stats, labels = run("embedding", texts, args.embedding_model)
+    matches = [a == b for a, b in zip(bart_labels, labels)]
+    stats["agreement"] = round(sum(matches) / len(matches), 3) if matches else 0.0
+    totals, agreed = Counter(bart_labels), Counter(b for b, m in zip(bart_labels, matches) if m)
+    stats["agreement_by_label"] = {label: round(agreed[label] / totals[label], 3) for label in totals}
+    results.append(stats)
+
+    print(f"\n{'mode':<10} {'reviews/sec':>12} {'agreement':>10}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['reviews_per_sec']:>12} {r['agreement']:>10.1%}")
+    print("\nAgreement with BART, by BART label:")
+    for label, rate in sorted(stats["agreement_by_label"].items()):
+        print(f"  {label:<45} {rate:>6.1%}  (n={totals[label]})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Semantic review search: float16 vs int8 storage, exact vs IVF, with and without filters.
+
+Builds a synthetic graph, indexes it once per configuration (hashed bag-of-words
+stand-in embeddings by default, or a real sentence-transformers model with --model),
+then times queries per filter: one brand + one year, one brand over all years, and no
+filter at all. Recall@k is measured against the exact float16 index; a result counts as
+a hit when its exact score reaches the k-th best one, so ties (frequent in the templated
+synthetic reviews) are not counted as misses.
+
+Usage (from the repo root):
+    python -m benchmarks.vector_search --reviews 200000 --ivf-lists 256
+    python -m benchmarks.vector_search --reviews 50000 --model sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import src.graph.vectors as vectors_module
+from src.graph.cube import year_window
+from src.graph.engine import TemporalGraphEngine
+from src.graph.vectors import ReviewVectorIndex, ReviewEncoder
+from benchmarks.synthetic import Generator, StandInEncoder, ASPECTS, OPINIONS
+from benchmarks.suite import batches, percentiles, INSERT_CHUNK
+
+K = 10
+
+
+def queries(n, seed=0):
+    """Short aspect + opinion queries in the vocabulary of the synthetic reviews."""
+    rng = np.random.default_rng(seed)
+    aspects = [a for words in ASPECTS.values() for a in words]
+    opinions = list(OPINIONS.values())
+    return [f"{aspects[rng.integers(len(aspects))]} is {opinions[rng.integers(len(opinions))]}" for _ in range(n)]
+
+
+def time_search(index, encoded, brand, window, nprobe):
+    samples, results = [], []
+    for q in encoded:
+        started = time.perf_counter()
+        results.append([row for row, _ in index.search(q[None, :], brand, *window, k=K, nprobe=nprobe)[0]])
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples, results
+
+
+def recall(reference, encoded, found, expected):
+    """Share of the found rows whose exact score (in `reference`) reaches the k-th best exact score."""
+    hits = []
+    for q, rows, best in zip(encoded, found, expected):
+        if not best:
+            continue
+        exact = reference.vectors[np.array(rows + best)].astype(np.float32) @ q
+        hits.append(np.mean(exact[:len(rows)] >= exact[len(rows):].min() - 1e-4) if rows else 0.0)
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200_000)
+    parser.add_argument("--brands", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--ivf-lists", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--model", default=None, help="sentence-transformers model (default: stand-in encoder)")
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    generator = Generator(n_brands=args.brands)
+    graph = TemporalGraphEngine("columnar")
+    for chunk in batches(generator.triples(args.reviews), INSERT_CHUNK):
+        graph.add_batch(chunk)
+    encoder = ReviewEncoder(args.model) if args.model else StandInEncoder()
+    encoded = encoder.encode(queries(args.queries))
+    brand = generator.brands[0]  # The most reviewed brand
+    filters = {"brand+year": (brand, year_window(2016)), "brand": (brand, (None, None)),
+               "none": (None, (None, None))}
+
+    workdir = tempfile.mkdtemp(prefix="tga_vec_")
+    configs = [("float16", 0), ("int8", 0), ("float16", args.ivf_lists), ("int8", args.ivf_lists)]
+    results, expected, reference = [], {}, None
+    try:
+        for dtype, ivf_lists in configs:
+            path = os.path.join(workdir, f"{dtype}_{ivf_lists}.vec")
+            index = ReviewVectorIndex(encoder.model_id if args.model else "standin", dtype, encoder=encoder)
+            started = time.perf_counter()
+            index.update(graph, path, ivf_lists=ivf_lists)
+            build_s = time.perf_counter() - started
+            size_mb = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2 ** 20
+
+            for name, (brand_filter, window) in filters.items():
+                candidates = len(index.candidates(brand_filter, *window))
+                samples, found = time_search(index, encoded, brand_filter, window, args.nprobe)
+                if (dtype, ivf_lists) == configs[0]:
+                    reference, expected[name] = index, found
+                # Rows are sorted the same way in every index, so row numbers are comparable
+                hit_rate = recall(reference, encoded, found, expected[name])
+                ivf_used = bool(ivf_lists) and candidates > vectors_module.IVF_MIN_CANDIDATES
+                record = {"dtype": dtype, "ivf_lists": ivf_lists, "filter": name, "candidates": candidates,
+                          "ivf_used": ivf_used, "recall_at_k": round(hit_rate, 3), "build_s": round(build_s, 3),
+                          "index_mb": round(size_mb, 1), "search_ms": percentiles(samples)}
+                results.append(record)
+                print(f"[Bench] {dtype:7} ivf={ivf_lists:<5} {name:10} candidates={candidates:>8} "
+                      f"p50={record['search_ms']['p50']:7.2f} ms  p95={record['search_ms']['p95']:7.2f} ms  "
+                      f"recall@{K}={hit_rate:.2f}  index={size_mb:.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"reviews": args.reviews, "k": K, "nprobe": args.nprobe, "results": results}, f, indent=2)
+        print(f"[Bench] Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
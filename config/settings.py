@@ -11,4 +11,64 @@ os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
 os.environ["HF_HOME"] = MODEL_CACHE_DIR
 
 # The Model ID
-MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
\ No newline at end of file
+MODEL_ID = "meta-llama/Meta-Llama-3-8B-Instruct"
+
+# Graph storage backend: "networkx" (MultiDiGraph) or "columnar" (NumPy edge columns)
+# used by ingest.py, which loads thesis_graph.tga into it and keeps it through compactions
+# (main.py and serve.py always memory-map the snapshot as columns)
+GRAPH_BACKEND = "networkx"
+
+# Ingestion worker processes (1 = serial). Each worker loads its own spaCy/BART/VADER.
+INGEST_WORKERS = 1
+
+# Persistent NER / zero-shot result cache, so re-ingesting known reviews skips the models
+INGEST_CACHE_PATH = os.path.join(BASE_DIR, "cache", "ingest_cache.sqlite")
+INGEST_CACHE_MAX_MB = 2048
+
+# Topic classifier for ingestion: "zeroshot" (BART-large-MNLI) or "embedding" (sentence-transformers, much faster)
+TOPIC_CLASSIFIER = "zeroshot"
+EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Prompts per forward pass when agents generate in batches (SCCLlama.generate_batch)
+GENERATION_BATCH_SIZE = 4
+
+# Distinct static prompt prefixes whose KV state SCCLlama keeps (one per agent system block)
+PREFIX_CACHE_SIZE = 8
+
+# Greedy decoding instead of temperature sampling; enables the on-disk LLM response cache
+LLM_DETERMINISTIC = False
+LLM_RESPONSE_CACHE_PATH = os.path.join(BASE_DIR, "cache", "llm_responses.sqlite")
+LLM_RESPONSE_CACHE_MAX_MB = 512
+
+# Audit service (serve.py): concurrent audits share LLM batches of up to SERVICE_MAX_BATCH
+# prompts, dispatched at most SERVICE_MAX_WAIT_MS after the first one arrives
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_MAX_BATCH = 8
+SERVICE_MAX_WAIT_MS = 50
+
+# Agent prompt context: facts are ranked ("recency", "coverage" of topic x sentiment, or
+# "extremity" of the rating) and added until CONTEXT_TOKEN_BUDGET Llama-3 tokens are used
+CONTEXT_TOKEN_BUDGET = 2048
+CONTEXT_RANKING = "coverage"
+
+# main.py: print agent answers token by token (one year at a time) instead of batching both years
+STREAM_OUTPUT = False
+# Seconds a streamed answer may wait for its next chunk before the stream is abandoned
+STREAM_CHUNK_TIMEOUT_S = 120
+
+# Per-stage latency histograms and counters (src/utils/metrics.py); near-zero cost when off.
+# ingest.py / main.py write METRICS_DIR/<run>.json and .prom; serve.py also serves GET /metrics
+METRICS_ENABLED = False
+METRICS_DIR = os.path.join(BASE_DIR, "metrics")
+
+# Semantic review search (src/graph/vectors.py): ingest.py embeds new review texts with
+# EMBEDDING_MODEL_ID into VECTOR_INDEX_PATH, and an audit with a focus ("battery life") cites the
+# reviews most similar to it. Vectors are memory-mapped "int8" (half the size of "float16" and
+# ~5x faster to scan on CPU, same top-10 in benchmarks.vector_search). VECTOR_IVF_LISTS > 0 adds
+# a coarse clustering for large graphs (~sqrt(reviews) lists; VECTOR_IVF_PROBES searched per query)
+VECTOR_INDEX = False
+VECTOR_INDEX_PATH = os.path.join(BASE_DIR, "thesis_graph.vec")
+VECTOR_DTYPE = "int8"
+VECTOR_IVF_LISTS = 0
+VECTOR_IVF_PROBES = 16
@@ -0,0 +1,12 @@
+# convert_graph.py
+import sys
+from src.graph.storage import convert_pickle
+
+def run_conversion(src="thesis_graph.pkl", dst="thesis_graph.tga"):
+    """One-shot upgrade of a legacy pickled graph to the memory-mapped .tga format."""
+    print(f"[Convert] {src} -> {dst}")
+    edges = convert_pickle(src, dst)
+    print(f"[Convert] Done. Wrote {edges} edges. main.py will now load '{dst}'.")
+
+if __name__ == "__main__":
+    run_conversion(*sys.argv[1:3])
@@ -2,11 +2,13 @@
 import sys
 import os
 import pickle # <-- CRITICAL: Ensure pickle is imported here
+from config import settings
 from src.graph.engine import TemporalGraphEngine
 # Explicitly import all schema components the graph relies on:
 from src.graph.schema import Node, TemporalEdge, MarketingTopic, Sentiment 
+from src.graph.vectors import ReviewVectorIndex
 from src.utils.loader import UnsupervisedLoader
-from src.llm.wrapper import SCCLlama # We don't use it, but keeping the import path clean helps
+from src.utils.metrics import METRICS
 
 def run_ingestion():
     print("==================================================")
@@ -14,26 +16,46 @@ def run_ingestion():
     print("==================================================")
 
     # 1. Initialize ONLY the Graph (No Llama needed here)
-    graph = TemporalGraphEngine()
+    # Builds on the existing snapshot: new edges go to an append-only log next to it,
+    # so a crash keeps every committed file and old data is never rewritten.
+    graph = TemporalGraphEngine(backend=settings.GRAPH_BACKEND)
+    graph.open_with_wal("thesis_graph.tga")
     
     # Pass 'None' for LLM because we aren't generating text yet
     # We must pass None, not a dummy object, as the loader expects SCCLlama() or None
-    loader = UnsupervisedLoader(graph, llm_engine=None)
+    loader = UnsupervisedLoader(graph, llm_engine=None, workers=settings.INGEST_WORKERS,
+                                cache_path=settings.INGEST_CACHE_PATH,
+                                cache_max_mb=settings.INGEST_CACHE_MAX_MB,
+                                topic_mode=settings.TOPIC_CLASSIFIER,
+                                embedding_model=settings.EMBEDDING_MODEL_ID)
 
     # 2. Load Data
     data_folder = "/projectnb/cs599x1/students/akhilg/directed_study_v/brand_audit/data/amazon_data" # Use your path
     loader.load_directory(data_folder)
 
     # 3. Check & Save
-    if graph.graph.number_of_edges() == 0:
+    if graph.number_of_edges() == 0:
         print("[Error] Graph is empty. Ingestion failed.")
         sys.exit()
 
-    print(f"\n[System] Ingestion Success! Total Facts: {graph.graph.number_of_edges()}")
+    print(f"\n[System] Ingestion Success! Total Facts: {graph.number_of_edges()}")
     
-    # Save to disk
-    graph.save_to_disk("thesis_graph.pkl")
-    print("[System] Graph saved to 'thesis_graph.pkl'. You can now run main.py.")
+    # Save to disk (the log is folded into the snapshot periodically, or now if there is none yet)
+    graph.commit()
+    if not os.path.exists("thesis_graph.tga"):
+        graph.compact()
+    print("[System] Graph saved to 'thesis_graph.tga'. You can now run main.py.")
+
+    # 4. Semantic index: embed the reviews it does not have yet (audits with a focus search it)
+    if settings.VECTOR_INDEX:
+        if os.path.exists(settings.VECTOR_INDEX_PATH):
+            vectors = ReviewVectorIndex.open(settings.VECTOR_INDEX_PATH)
+        else:
+            vectors = ReviewVectorIndex(settings.EMBEDDING_MODEL_ID, settings.VECTOR_DTYPE)
+        vectors.update(graph, settings.VECTOR_INDEX_PATH, ivf_lists=settings.VECTOR_IVF_LISTS)
+
+    # Per-stage timings (NER, topics, VADER, add_data), when settings.METRICS_ENABLED
+    METRICS.export("ingest")
 
 if __name__ == "__main__":
     run_ingestion()
\ No newline at end of file
@@ -1,35 +1,71 @@
 import sys
 import os
-import torch
-import gc
-from datetime import datetime
 
+from config import settings
 from src.graph.engine import TemporalGraphEngine
-from src.llm.wrapper import SCCLlama
+from src.graph.cube import year_window, period_label
+from src.graph.vectors import ReviewVectorIndex
+from src.llm.lazy import LazyLLM
 from src.agents.historian import HistorianAgent
 from src.agents.critic import CriticAgent
+from src.utils.metrics import METRICS
+
+def enable_brand_completion(brand_lookup):
+    """TAB-completes brand names at the prompt (where readline is available)."""
+    try:
+        import readline
+    except ImportError:
+        return
+    matches = []
+
+    def complete(text, state):
+        if state == 0:
+            matches[:] = brand_lookup.complete(text, limit=50)
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer_delims("")  # Brand names contain spaces
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
+
+def print_stream(title, chunks):
+    """Prints a streamed answer as it arrives and returns the full text."""
+    print(f"\n{title}:")
+    text = ""
+    for chunk in chunks:
+        print(chunk, end="", flush=True)
+        text += chunk
+    print()
+    return text.strip()
 
 def main():
     print("==================================================")
     print("   PHASE 2: NEURO-SYMBOLIC AUDIT (INTERACTIVE)    ")
     print("==================================================")
 
-    # 1. Load the Brain (Llama 3)
-    print("\n[System] Loading Llama-3 Model...")
-    llm = SCCLlama()
+    # 1. Load the Brain (Llama 3) in the background; the graph and the brand prompt don't need it
+    print("\n[System] Loading Llama-3 Model (in the background)...")
+    llm = LazyLLM().warm_up()
 
     # 2. Load the Memory (The Graph)
     print("\n[System] Loading Knowledge Graph from Disk...")
     graph = TemporalGraphEngine()
-    success = graph.load_from_disk("thesis_graph.pkl")
+    # Prefer the memory-mapped format; fall back to the legacy pickle (see convert_graph.py)
+    graph_file = "thesis_graph.tga" if os.path.exists("thesis_graph.tga") else "thesis_graph.pkl"
+    success = graph.load_from_disk(graph_file)
 
     if not success:
         print("[Critical] Could not load graph. Did you run 'ingest.py' first?")
         sys.exit()
 
+    # Semantic index for focused audits (built by ingest.py when settings.VECTOR_INDEX is on)
+    if os.path.exists(settings.VECTOR_INDEX_PATH):
+        graph.vectors = ReviewVectorIndex.open(settings.VECTOR_INDEX_PATH)
+        print(f"[System] Vector index: {len(graph.vectors)} reviews ({graph.vectors.dtype}).")
+
     # 3. Agents
-    available_brands = [n for n, d in graph.graph.nodes(data=True) if d.get('type') == 'Brand']
-    print(f"\n[System] Ready! Available Brands: {available_brands[:10]}...")
+    brand_lookup = graph.brand_lookup
+    print(f"\n[System] Ready! {len(brand_lookup)} brands indexed, e.g. {brand_lookup.complete('', limit=10)}...")
+    enable_brand_completion(brand_lookup)
 
     historian = HistorianAgent(graph, llm)
     critic = CriticAgent(graph, llm)
@@ -40,10 +76,13 @@ def main():
         target_brand = input("\n>> Enter Brand Name (or 'q'): ").strip()
         if target_brand.lower() == 'q': break
         
-        # Fuzzy Match
-        matched_brand = next((b for b in available_brands if target_brand.lower() == b.lower()), None)
+        # Exact (case-insensitive) hit, else ranked fuzzy suggestions
+        matched_brand = brand_lookup.exact(target_brand)
         if not matched_brand:
             print("[Error] Brand not found in graph.")
+            suggestions = brand_lookup.suggest(target_brand)
+            if suggestions:
+                print("   Did you mean: " + ", ".join(name for name, _ in suggestions) + "?")
             continue
             
         print(f"\n[Selected] {matched_brand}")
@@ -51,41 +90,48 @@ def main():
         try:
             y1 = input(">> Baseline Year (e.g., 2016): ").strip()
             y2 = input(">> Comparison Year (e.g., 2018): ").strip()
-            d1 = datetime(int(y1), 1, 1)
-            d2 = datetime(int(y2), 1, 1)
+            # Audit each calendar year's own reviews: [Jan 1, next Jan 1)
+            p1 = year_window(int(y1))
+            p2 = year_window(int(y2))
         except:
             print("[Error] Invalid year.")
             continue
+        # Optional topic to pull the most relevant reviews for (needs the vector index)
+        focus = input(">> Focus (optional, e.g., battery life): ").strip() if graph.vectors is not None else ""
+        focus = focus or None
 
-        # 1. Historian generates the draft report
-        draft1 = historian.conduct_audit(matched_brand, d1)
-        print(f"\n[Historian's Draft {d1.year}]:")
-        print(draft1)
-        
-        # 2. CRITIC VERIFIES THE REPORT <-- ADDED
-        verify1 = critic.verify_audit(matched_brand, draft1, d1)
-        print(f"\n[Critic's Review {d1.year}]:")
-        print(verify1)
+        if settings.STREAM_OUTPUT:
+            # Token-by-token output: one year at a time, text appears as it is generated
+            drafts = [print_stream(f"[Historian's Draft {period_label(p)}]", historian.stream_audit(matched_brand, p, focus))
+                      for p in (p1, p2)]
+            for draft, p in zip(drafts, (p1, p2)):
+                print_stream(f"[Critic's Review {period_label(p)}]", critic.stream_verification(matched_brand, draft, p, focus))
+        else:
+            # 1. Historian drafts both years in one batched generation round
+            draft1, draft2 = historian.conduct_audits(matched_brand, [p1, p2], focus)
+            print(f"\n[Historian's Draft {period_label(p1)}]:")
+            print(draft1)
+            print(f"\n[Historian's Draft {period_label(p2)}]:")
+            print(draft2)
 
-        # GPU Cleanup (After the first full audit: Historian + Critic)
-        gc.collect()
-        torch.cuda.empty_cache()
+            # GPU Cleanup (between the two generation rounds)
+            llm.release_memory()
 
-        # --- AUDIT 2: COMPARISON ANALYSIS (d2) ---
-        print(f"\n--- [2/2] Analyzing Comparison ({d2.year}) ---")
-        
-        # 3. Historian generates the comparison draft
-        draft2 = historian.conduct_audit(matched_brand, d2)
-        print(f"\n[Historian's Draft {d2.year}]:")
-        print(draft2)
-
-        # 4. CRITIC VERIFIES THE REPORT <-- ADDED
-        verify2 = critic.verify_audit(matched_brand, draft2, d2)
-        print(f"\n[Critic's Review {d2.year}]:")
-        print(verify2)
-
-        gc.collect()
-        torch.cuda.empty_cache()
+            # 2. CRITIC VERIFIES BOTH REPORTS (second batched round)
+            verify1, verify2 = critic.verify_audits(matched_brand, [draft1, draft2], [p1, p2], focus)
+            print(f"\n[Critic's Review {period_label(p1)}]:")
+            print(verify1)
+            print(f"\n[Critic's Review {period_label(p2)}]:")
+            print(verify2)
+
+        stats = graph.snapshot_cache.stats()
+        print(f"\n[System] Snapshot cache: {stats['hits']} hits / {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate)")
+
+        llm.release_memory()
+
+    # Per-stage timings of the session (snapshots, prompts, prefill/decode), when enabled
+    METRICS.export("main")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
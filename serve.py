@@ -0,0 +1,181 @@
+"""
+Long-running audit service: one GPU process shared by several analysts.
+
+Serves JSON over HTTP (TCP or a Unix socket):
+    POST /audit   {"brand": "Nintendo", "years": [2016, 2018], "verify": true, "focus": "battery life"}
+    GET  /brands?q=nin        autocomplete
+    GET  /stats               batching and cache statistics
+    GET  /metrics             Prometheus text format (settings.METRICS_ENABLED)
+    GET  /health
+
+Each year is audited over its own reviews, from Jan 1 to the next Jan 1.
+
+Each audit runs the Historian (and Critic) in a worker thread, so graph lookups stay
+off the event loop; their generations go through a DynamicBatcher, which groups the
+prompts of concurrent audits into shared batches (up to --max-batch prompts or
+--max-wait-ms after the first one).
+
+Usage:
+    python serve.py --port 8765
+    python serve.py --socket /tmp/audit.sock
+    curl -s localhost:8765/audit -d '{"brand": "Nintendo", "years": [2016, 2018]}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from config import settings
+from src.graph.engine import TemporalGraphEngine
+from src.graph.cube import year_window
+from src.graph.vectors import ReviewVectorIndex
+from src.llm.lazy import LazyLLM
+from src.llm.batcher import DynamicBatcher
+from src.agents.historian import HistorianAgent
+from src.agents.critic import CriticAgent
+from src.utils.metrics import METRICS
+
+
+class AuditService:
+    def __init__(self, graph, batcher, workers=16):
+        self.graph = graph
+        self.batcher = batcher
+        llm = batcher.client()
+        self.historian = HistorianAgent(graph, llm)
+        self.critic = CriticAgent(graph, llm)
+        # Audits block on the batcher while waiting for their batch, so allow many in flight
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit")
+        self.audits = 0
+
+    # --- ENDPOINTS ---
+    async def audit(self, request):
+        brand = self.graph.brand_lookup.exact(str(request.get("brand", "")))
+        if not brand:
+            suggestions = self.graph.brand_lookup.suggest(str(request.get("brand", "")))
+            return HTTPStatus.NOT_FOUND, {"error": "Brand not found in graph.",
+                                          "suggestions": [name for name, _ in suggestions]}
+        try:
+            years = [int(year) for year in request["years"]]
+            periods = [year_window(year) for year in years]
+        except (KeyError, TypeError, ValueError):
+            return HTTPStatus.BAD_REQUEST, {"error": "'years' must be a list of years, e.g. [2016, 2018]."}
+
+        # Optional: cite the reviews most similar to this topic (needs the vector index)
+        focus = str(request["focus"]) if request.get("focus") else None
+
+        loop = asyncio.get_running_loop()
+        drafts = await loop.run_in_executor(self.executor, self.historian.conduct_audits, brand, periods, focus)
+        verdicts = [None] * len(periods)
+        if request.get("verify", True):
+            verdicts = await loop.run_in_executor(self.executor, self.critic.verify_audits, brand, drafts, periods,
+                                                  focus)
+        self.audits += 1
+        return HTTPStatus.OK, {"brand": brand, "focus": focus, "audits": [
+            {"year": year, "draft": draft, "verdict": verdict} for year, draft, verdict in zip(years, drafts, verdicts)]}
+
+    def brands(self, query):
+        prefix = query.get("q", [""])[0]
+        return HTTPStatus.OK, {"brands": self.graph.brand_lookup.complete(prefix, limit=20)}
+
+    def stats(self):
+        return HTTPStatus.OK, {"audits": self.audits, "batching": self.batcher.stats(),
+                               "snapshot_cache": self.graph.snapshot_cache.stats()}
+
+    # --- HTTP ---
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        if method == "POST" and url.path == "/audit":
+            return await self.audit(json.loads(body or b"{}"))
+        if method == "GET" and url.path == "/brands":
+            return self.brands(parse_qs(url.query))
+        if method == "GET" and url.path == "/stats":
+            return self.stats()
+        if method == "GET" and url.path == "/metrics":
+            return HTTPStatus.OK, METRICS.prometheus()
+        if method == "GET" and url.path == "/health":
+            return HTTPStatus.OK, {"status": "ok"}
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {url.path}"}
+
+    async def handle(self, reader, writer):
+        """Minimal HTTP/1.1: one JSON request per connection."""
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            status, payload = await self.dispatch(method, target, body)
+        except (ValueError, json.JSONDecodeError, asyncio.IncompleteReadError) as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            print(f"[Service] Request failed: {e}")
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        if isinstance(payload, str):
+            data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(args, service):
+    batching = asyncio.create_task(service.batcher.run())
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = await asyncio.start_unix_server(service.handle, path=args.socket)
+        print(f"[Service] Listening on unix:{args.socket}")
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        print(f"[Service] Listening on http://{args.host}:{args.port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), batching)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit service: shared LLM with dynamic batching.")
+    parser.add_argument("--host", default=settings.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVICE_PORT)
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--max-batch", type=int, default=settings.SERVICE_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.SERVICE_MAX_WAIT_MS)
+    parser.add_argument("--graph", default=None, help="Graph file (default: thesis_graph.tga, else .pkl)")
+    args = parser.parse_args()
+
+    # Loads while the graph does; audits wait for it, /brands and /health don't
+    print("\n[System] Loading Llama-3 Model (in the background)...")
+    llm = LazyLLM().warm_up()
+
+    print("\n[System] Loading Knowledge Graph from Disk...")
+    graph = TemporalGraphEngine()
+    graph_file = args.graph or ("thesis_graph.tga" if os.path.exists("thesis_graph.tga") else "thesis_graph.pkl")
+    if not graph.load_from_disk(graph_file):
+        print("[Critical] Could not load graph. Did you run 'ingest.py' first?")
+        sys.exit(1)
+    if os.path.exists(settings.VECTOR_INDEX_PATH):
+        graph.vectors = ReviewVectorIndex.open(settings.VECTOR_INDEX_PATH)
+
+    batcher = DynamicBatcher(llm, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    service = AuditService(graph, batcher)
+    try:
+        asyncio.run(serve(args, service))
+    except KeyboardInterrupt:
+        print("\n[Service] Shutting down.")
+    METRICS.export("serve")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,103 @@
-from datetime import datetime
+from typing import TYPE_CHECKING
+from config import settings
 from ..graph.engine import TemporalGraphEngine
-from ..llm.wrapper import SCCLlama
+from ..graph.cube import period_label
+from ..utils.metrics import METRICS
+
+if TYPE_CHECKING:  # Importing the wrapper pulls in torch/transformers
+    from ..llm.wrapper import SCCLlama
+
+# Static opening of every verification prompt; SCCLlama caches its KV state across calls
+SYSTEM_PREFIX = """<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+
+You are a Senior Editor. Check the DRAFT AUDIT against the GROUND TRUTH FACTS.
+
+"""
+
+# The verdict is complete once the Reasoning line has been written
+STOP_PATTERNS = [r"Reasoning:[^\n]*\S[^\n]*\n"]
 
 class CriticAgent:
-    def __init__(self, graph: TemporalGraphEngine, llm: SCCLlama):
+    def __init__(self, graph: TemporalGraphEngine, llm: "SCCLlama", brand_match: str = "exact"):
         self.graph = graph
         self.llm = llm
+        # "exact" reads only this brand's edges; "substring" keeps the old ID-contains filter
+        self.brand_match = brand_match
+
+    def verify_audit(self, brand: str, audit_draft: str, period, focus: str = None) -> str:
+        return self.verify_audits(brand, [audit_draft], [period], focus)[0]
+
+    def verify_audits(self, brand: str, audit_drafts: list, periods: list, focus: str = None) -> list:
+        """
+        Verifies several (draft, period) pairs for one brand with a single batched generation.
+        Periods are (start, end) windows or datetimes and `focus` selects the ground truth
+        reviews, as in HistorianAgent.conduct_audits.
+        """
+        verdicts = [None] * len(audit_drafts)
+        prompts, slots = [], []
+        for i, (audit_draft, period) in enumerate(zip(audit_drafts, periods)):
+            # 1. Check Inputs
+            if not audit_draft or len(audit_draft) < 10:
+                verdicts[i] = "[Critic Error] I cannot verify an empty draft."
+                continue
+            with METRICS.timer("agent_prompt_seconds", agent="critic"):
+                prompts.append(self._build_prompt(brand, audit_draft, period, focus))
+            slots.append(i)
+
+        # 4. Generate
+        try:
+            with METRICS.timer("agent_generate_seconds", agent="critic"):
+                responses = self.llm.generate_batch(prompts, prefix=SYSTEM_PREFIX, stop=STOP_PATTERNS)
+        except Exception as e:
+            print(f"[Critic] Generation failed: {e}", flush=True)
+            METRICS.inc("agent_errors_total", agent="critic")
+            for i in slots:
+                verdicts[i] = f"[Critic Error] System Exception: {str(e)}"
+            return verdicts
 
-    def verify_audit(self, brand: str, audit_draft: str, target_date: datetime) -> str:
-        # print(f"\n[DEBUG CRITIC] 1. Starting verification for {brand} in {target_date.year}...", flush=True)
-        
-        # 1. Check Inputs
+        for i, response in zip(slots, responses):
+            if not response or not response.strip():
+                verdicts[i] = "[Critic Error] The LLM returned an empty string. Attempting fallback..."
+            else:
+                verdicts[i] = response
+        return verdicts
+
+    def stream_verification(self, brand: str, audit_draft: str, period, focus: str = None):
+        """verify_audit, yielding the verdict in chunks as it is generated."""
         if not audit_draft or len(audit_draft) < 10:
-            # print("[DEBUG CRITIC] Error: Input draft was empty!", flush=True)
-            return "[Critic Error] I cannot verify an empty draft."
+            yield "[Critic Error] I cannot verify an empty draft."
+            return
+        prompt = self._build_prompt(brand, audit_draft, period, focus)
+        yield from self.llm.stream(prompt, prefix=SYSTEM_PREFIX, stop=STOP_PATTERNS)
 
+    def _build_prompt(self, brand: str, audit_draft: str, period, focus: str = None) -> str:
         # 2. Get Facts
-        context_facts = self.graph.get_snapshot(target_date, target_brand=brand)
-        # print(f"[DEBUG CRITIC] 2. Retrieved Context Facts (Length: {len(context_facts)} chars)", flush=True)
-        
-        # 3. Construct Prompt
-        prompt = f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+        # Best-ranked facts that fit the context token budget (measured with the LLM's tokenizer)
+        options = dict(match=self.brand_match, limit=None, token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                       count_tokens=self.llm.count_tokens, ranking=settings.CONTEXT_RANKING)
+        if focus and self.graph.vectors is not None:
+            # The same focus-relevant reviews the Historian was given
+            start, end = period if isinstance(period, tuple) else (None, period)
+            context_facts = self.graph.get_relevant(brand, focus, start, end, limit=None,
+                                                    token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                                                    count_tokens=self.llm.count_tokens,
+                                                    nprobe=settings.VECTOR_IVF_PROBES)
+        elif isinstance(period, tuple):
+            context_facts = self.graph.get_window(brand, *period, **options)
+        else:
+            context_facts = self.graph.get_snapshot(period, target_brand=brand, **options)
+        if isinstance(period, tuple):
+            trend_summary = self.graph.get_window_summary(brand, *period)
+        else:
+            trend_summary = self.graph.get_trend_summary(brand, period)
 
-You are a Senior Editor. Check the DRAFT AUDIT against the GROUND TRUTH FACTS.
-
-Ground Truth Facts:
+        # 3. Construct Prompt
+        prompt = SYSTEM_PREFIX + f"""Ground Truth Facts ({period_label(period)}):
 {context_facts}
 
+Exact Review Counts:
+{trend_summary}
+
 <|eot_id|><|start_header_id|>user<|end_header_id|>
 Draft Audit:
 "{audit_draft}"
@@ -41,20 +112,4 @@ Status: [PASS/FAIL]
 Reasoning: [1 sentence]
 <|eot_id|><|start_header_id|>assistant<|end_header_id|>
 """
-        # print("[DEBUG CRITIC] 3. Sending Prompt to LLM... (Please Wait)", flush=True)
-
-        # 4. Generate
-        try:
-            response = self.llm.generate_raw(prompt)
-            
-            # CRITICAL DEBUG: Print exactly what the LLM gave back, even if it's weird
-            print(f"[DEBUG CRITIC] 4. LLM Raw Output: '{response}'", flush=True)
-            
-            if not response or not response.strip():
-                return "[Critic Error] The LLM returned an empty string. Attempting fallback..."
-                
-            return response
-            
-        except Exception as e:
-            print(f"[DEBUG CRITIC] CRASHED: {e}", flush=True)
-            return f"[Critic Error] System Exception: {str(e)}"
\ No newline at end of file
+        return prompt
\ No newline at end of file
@@ -1,38 +1,120 @@
-from datetime import datetime
+from typing import TYPE_CHECKING
+from config import settings
 from ..graph.engine import TemporalGraphEngine
-from ..llm.wrapper import SCCLlama
+from ..graph.cube import period_label
+from ..utils.metrics import METRICS
+
+if TYPE_CHECKING:  # Importing the wrapper pulls in torch/transformers
+    from ..llm.wrapper import SCCLlama
+
+# Static opening of every evaluator prompt; SCCLlama caches its KV state across calls
+SYSTEM_PREFIX = """<|begin_of_text|><|start_header_id|>system<|end_header_id|>
+
+You are a Product Strategy Consultant. Your job is to analyze customer reviews and generate a Brand Health Report.
+
+"""
+
+# The report is complete once the Strategic Verdict paragraph has ended (blank line after it)
+STOP_PATTERNS = [r"Strategic Verdict:?\**:?[ \t]*\n?[^\n]*?\w[^\n]*\n[ \t]*\n"]
 
 class HistorianAgent:
-    def __init__(self, graph: TemporalGraphEngine, llm: SCCLlama):
+    def __init__(self, graph: TemporalGraphEngine, llm: "SCCLlama", brand_match: str = "exact"):
         self.graph = graph
         self.llm = llm
+        # "exact" reads only this brand's edges; "substring" keeps the old ID-contains filter
+        self.brand_match = brand_match
+
+    def conduct_audit(self, brand: str, period, focus: str = None) -> str:
+        return self.conduct_audits(brand, [period], focus)[0]
+
+    def conduct_audits(self, brand: str, periods: list, focus: str = None) -> list:
+        """
+        One report per period; all prompts go to the LLM together in a single batch.
+        A period is a (start, end) window (e.g. cube.year_window(2016): the reviews of 2016)
+        or a datetime (point in time: every review up to it).
+        With a `focus` (e.g. "battery life") and a vector index on the graph, the sample
+        reviews are the ones most similar to it instead of the ranked ones.
+        """
+        reports = [None] * len(periods)
+        prompts, slots = [], []
+        for i, period in enumerate(periods):
+            with METRICS.timer("agent_prompt_seconds", agent="historian"):
+                prompt = self._build_prompt(brand, period, focus)
+            if prompt is None:
+                reports[i] = f"Insufficient data to evaluate {brand} for {period_label(period)}."
+            else:
+                prompts.append(prompt)
+                slots.append(i)
+
+        # 3. GENERATE
+        try:
+            # Batched generate_raw: both years share one round of forward passes
+            with METRICS.timer("agent_generate_seconds", agent="historian"):
+                responses = self.llm.generate_batch(prompts, prefix=SYSTEM_PREFIX, stop=STOP_PATTERNS)
+            for i, response in zip(slots, responses):
+                reports[i] = response
+        except Exception as e:
+            METRICS.inc("agent_errors_total", agent="historian")
+            for i in slots:
+                reports[i] = f"[Error] Evaluation failed: {str(e)}"
+        return reports
+
+    def stream_audit(self, brand: str, period, focus: str = None):
+        """conduct_audit for one period, yielding the report in chunks as it is generated."""
+        prompt = self._build_prompt(brand, period, focus)
+        if prompt is None:
+            yield f"Insufficient data to evaluate {brand} for {period_label(period)}."
+            return
+        yield from self.llm.stream(prompt, prefix=SYSTEM_PREFIX, stop=STOP_PATTERNS)
 
-    def conduct_audit(self, brand: str, target_date: datetime) -> str:
-        print(f"   [Evaluator] Assessing brand health for '{brand}' in {target_date.year}...")
+    def _build_prompt(self, brand: str, period, focus: str = None):
+        """The evaluator prompt for one period, or None when the graph has no facts for it."""
+        label = period_label(period)
+        print(f"   [Evaluator] Assessing brand health for '{brand}' ({label})...")
         
         # 1. RETRIEVE DATA
-        context_facts = self.graph.get_snapshot(target_date, target_brand=brand)
+        # Best-ranked facts that fit the context token budget (measured with the LLM's tokenizer)
+        options = dict(match=self.brand_match, limit=None, token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                       count_tokens=self.llm.count_tokens, ranking=settings.CONTEXT_RANKING)
+        focus = focus if focus and self.graph.vectors is not None else None
+        if focus:
+            # The reviews most similar to the focus (semantic index, see src/graph/vectors.py)
+            start, end = period if isinstance(period, tuple) else (None, period)
+            context_facts = self.graph.get_relevant(brand, focus, start, end, limit=None,
+                                                    token_budget=settings.CONTEXT_TOKEN_BUDGET,
+                                                    count_tokens=self.llm.count_tokens,
+                                                    nprobe=settings.VECTOR_IVF_PROBES)
+        elif isinstance(period, tuple):
+            context_facts = self.graph.get_window(brand, *period, **options)
+        else:
+            context_facts = self.graph.get_snapshot(period, target_brand=brand, **options)
         
         if "No recorded events" in context_facts:
-            return f"Insufficient data to evaluate {brand} for {target_date.year}."
+            return None
+        # Exact distributions from the aggregate cube (the facts are a token-budgeted sample)
+        if isinstance(period, tuple):
+            trend_summary = self.graph.get_window_summary(brand, *period)
+        else:
+            trend_summary = self.graph.get_trend_summary(brand, period)
 
         # 2. THE NEW "EVALUATOR" PROMPT
         # We strip away the "Historian" role. 
         # We ask for a "Health Report" based on the VADER sentiment and Topics.
-        prompt = f"""<|begin_of_text|><|start_header_id|>system<|end_header_id|>
-
-You are a Product Strategy Consultant. Your job is to analyze customer reviews and generate a Brand Health Report.
-
-DATASET ({target_date.year}):
+        sample = f"{label}, reviews most relevant to \"{focus}\"" if focus else label
+        prompt = SYSTEM_PREFIX + f"""DATASET ({sample}):
 {context_facts}
 
+EXACT REVIEW COUNTS (every review of this brand, not just the sample above):
+{trend_summary}
+
 INSTRUCTIONS:
 1. Identify the top Product Flaws (Negative Sentiment + Quality/Performance).
 2. Identify the top Value Drivers (Positive Sentiment + Price/Usability).
 3. Do not hallucinate. Use only the reviews provided.
+4. Base any claim about volumes or trends on the exact counts.
 
 <|eot_id|><|start_header_id|>user<|end_header_id|>
-Audit the brand: {brand}
+Audit the brand: {brand}{f" (focus: {focus})" if focus else ""}
 
 Output Format:
 1. **Executive Summary:**
@@ -41,11 +123,4 @@ Output Format:
 4. **Strategic Verdict:**
 <|eot_id|><|start_header_id|>assistant<|end_header_id|>
 """
-        
-        # 3. GENERATE
-        try:
-            # We use generate_raw to get the direct output
-            response = self.llm.generate_raw(prompt)
-            return response
-        except Exception as e:
-            return f"[Error] Evaluation failed: {str(e)}"
\ No newline at end of file
+        return prompt
\ No newline at end of file
@@ -0,0 +1,537 @@
+import json
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from src.graph.schema import MarketingTopic, Sentiment
+
+# Sentinels: a missing start never matches (start <= t is always False),
+# a missing end never expires (end >= t is always True).
+NO_START = np.iinfo(np.int64).max
+NO_END = np.iinfo(np.int64).max
+
+EPOCH = datetime(1970, 1, 1)
+CHUNK_SIZE = 1 << 16  # Arrays grow in whole chunks of this many rows
+
+EDGE_COLUMNS = {
+    "src": np.int32,
+    "dst": np.int32,
+    "start": np.int64,
+    "end": np.int64,
+    "relation": np.int8,
+    "topic": np.int8,
+    "sentiment": np.int8,
+}
+
+HAS_TEXT = 1  # node_flags bit: the node has a 'text' property
+
+
+def to_epoch_us(date):
+    """datetime -> int64 microseconds since the Unix epoch (naive datetimes are taken as-is)."""
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return (date - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value):
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def fold(name):
+    return str(name).casefold()
+
+
+def brand_edge_lists(src, dst, brand_ptr, brand_members, n_nodes):
+    """
+    Per-brand edge lists as CSR over the brand table (brand_ptr / brand_members):
+    brand i's edges (those touching one of its member nodes) are keys[ptr[i]:ptr[i + 1]],
+    ascending. int32 keys while they fit.
+    """
+    n_brands = len(brand_ptr) - 1
+    brand_of = np.full(n_nodes, -1, dtype=np.int64)
+    brand_of[np.asarray(brand_members)] = np.repeat(np.arange(n_brands), np.diff(brand_ptr))
+    dtype = np.int32 if len(src) < np.iinfo(np.int32).max else np.int64
+    keys = np.arange(len(src), dtype=dtype)
+    a, b = brand_of[np.asarray(src)], brand_of[np.asarray(dst)]
+    other = b != a  # An edge between two nodes of one brand is listed once
+    owner = np.concatenate([a, b[other]])
+    edges = np.concatenate([keys, keys[other]])
+    listed = owner >= 0
+    owner, edges = owner[listed], edges[listed]
+    order = np.lexsort((edges, owner))
+    ptr = np.zeros(n_brands + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=n_brands), out=ptr[1:])
+    return ptr, edges[order]
+
+
+class Vocabulary:
+    """
+    Small string <-> int8 code table.
+    Seeded with the enum values so codes line up with MarketingTopic / Sentiment.
+    """
+
+    def __init__(self, seed=()):
+        self.values = []
+        self.codes = {}
+        for value in seed:
+            self.code(value)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) >= 127:
+                raise ValueError("Vocabulary is full (int8 codes)")
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+
+class StringTable:
+    """
+    Read-only UTF-8 string table: int64 offsets[n + 1] into one byte blob.
+    Strings are decoded on access, so a memory-mapped table costs nothing until read.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+    def __getitem__(self, i):
+        return self.raw(i).decode("utf-8")
+
+    def find(self, value, order=None):
+        """Binary search for `value` in a table sorted by UTF-8 bytes (or via a sorted `order` permutation)."""
+        target = value.encode("utf-8")
+        lo, hi = 0, len(self) if order is None else len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid if order is None else order[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def encode(strings):
+        """list[str] -> (offsets, blob) arrays ready to be written."""
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+class ColumnarEdgeStore:
+    """
+    Array-backed storage for the temporal graph.
+
+    Node IDs are interned to int32 row numbers; every edge is one row across
+    parallel NumPy columns (src, dst, start, end, relation, topic, sentiment).
+    The edge key is simply the row number.
+
+    A store opened from disk has a read-only, memory-mapped *base* segment
+    (see src/graph/storage.py). New nodes and edges go to an in-memory *tail*
+    that grows in chunks; queries run over both without copying the base.
+    """
+
+    def __init__(self, base=None, vocab=None):
+        vocab = vocab or {}
+        self.types = Vocabulary(vocab.get("types", ["Brand", "Review"]))
+        self._brand_code = self.types.code("Brand")
+        self.relations = Vocabulary(vocab.get("relations", ["REVIEWED_IN"]))
+        self.topics = Vocabulary(vocab.get("topics", [t.value for t in MarketingTopic]))
+        self.sentiments = Vocabulary(vocab.get("sentiments", [s.value for s in Sentiment]))
+
+        # Base segment (memory-mapped sections by name) or None
+        self.base = base
+        self.base_nodes = len(base["node_type"]) if base else 0
+        self.base_edges = len(base["src"]) if base else 0
+
+        # Tail nodes
+        self._new_ids = []          # string IDs of nodes added since the base was written
+        self._new_index = {}        # string ID -> int, for those nodes only
+        self._new_types = []
+        self._new_props = []
+        self._base_updates = {}     # int -> (type code, properties) for base nodes re-added in memory
+        self.brand_nodes = {}       # case-folded brand -> [int IDs] that became Brand in memory
+        # Brand node int ID -> keys of its edges that the base's brand_edges section lacks
+        # (tail edges, and every edge of a node that became a Brand in memory)
+        self._brand_edges = {}
+        self._base_brand_lists = None  # (ptr, keys) built from the columns for files without the section
+
+        # Tail edges
+        self.size = 0
+        for name, dtype in EDGE_COLUMNS.items():
+            setattr(self, name, np.empty(0, dtype=dtype))
+
+        # Segment offset -> (edges covered, row order by start), built on the first window query
+        self._start_orders = {}
+
+    def vocab(self):
+        return {"types": self.types.values, "relations": self.relations.values,
+                "topics": self.topics.values, "sentiments": self.sentiments.values}
+
+    def _grow(self, needed):
+        capacity = len(self.src)
+        if needed <= capacity:
+            return
+        # Grow geometrically, rounded up to whole chunks, so appends stay amortised O(1)
+        new_capacity = max(needed, capacity + capacity // 2)
+        new_capacity = -(-new_capacity // CHUNK_SIZE) * CHUNK_SIZE
+        for name in EDGE_COLUMNS:
+            old = getattr(self, name)
+            grown = np.empty(new_capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    # --- NODES ---
+    def number_of_nodes(self):
+        return self.base_nodes + len(self._new_ids)
+
+    def node_id(self, idx):
+        if idx < self.base_nodes:
+            return self.base["node_ids"][idx]
+        return self._new_ids[idx - self.base_nodes]
+
+    def iter_node_ids(self):
+        for idx in range(self.number_of_nodes()):
+            yield self.node_id(idx)
+
+    def lookup_node(self, node_id):
+        """String ID -> int ID (or None). O(1) for new nodes, O(log N) in the mapped base."""
+        idx = self._new_index.get(node_id)
+        if idx is None and self.base_nodes:
+            order = self.base["node_order"]
+            pos = self.base["node_ids"].find(node_id, order)
+            if pos < len(order) and self.base["node_ids"][order[pos]] == node_id:
+                idx = int(order[pos])
+        return idx
+
+    def node_type_code(self, idx):
+        if idx >= self.base_nodes:
+            return self._new_types[idx - self.base_nodes]
+        update = self._base_updates.get(idx)
+        if update is not None:
+            return update[0]
+        return int(self.base["node_type"][idx])
+
+    def node_type_codes(self):
+        """int8 type code of every node, as one array (base types with in-memory updates applied)."""
+        codes = np.empty(self.number_of_nodes(), dtype=np.int8)
+        if self.base_nodes:
+            codes[:self.base_nodes] = self.base["node_type"]
+            for idx, (type_code, _) in self._base_updates.items():
+                codes[idx] = type_code
+        codes[self.base_nodes:] = self._new_types
+        return codes
+
+    def node_type(self, idx):
+        return self.types[self.node_type_code(idx)]
+
+    def node_properties(self, idx):
+        if idx >= self.base_nodes:
+            return self._new_props[idx - self.base_nodes] or {}
+        update = self._base_updates.get(idx)
+        if update is not None:
+            return update[1] or {}
+        extra = self.base["node_extra"][idx]
+        props = json.loads(extra) if extra else {}
+        if self.base["node_flags"][idx] & HAS_TEXT:
+            props["text"] = self.base["node_text"][idx]
+        return props
+
+    def add_node(self, node_id, node_type, properties=None):
+        """Inserts or updates a node (same semantics as nx add_node) and returns its int ID."""
+        type_code = self.types.code(node_type)
+        idx = self.lookup_node(node_id)
+        if idx is None:
+            return self._append_node(node_id, type_code, properties)
+        previous = self.node_type_code(idx)
+        # Re-adding an unchanged node (e.g. the brand on every review) is a no-op
+        if previous == type_code and self.node_properties(idx) == (properties or {}):
+            return idx
+        if idx < self.base_nodes:
+            self._base_updates[idx] = (type_code, properties or None)
+        else:
+            self._new_types[idx - self.base_nodes] = type_code
+            self._new_props[idx - self.base_nodes] = properties or None
+
+        if type_code == self.types.code("Brand") and previous != type_code:
+            self.brand_nodes.setdefault(fold(node_id), []).append(idx)
+            # Its existing edges join its edge list (one pass over the columns; type changes are rare)
+            self._brand_edges[idx] = self._incident_keys(idx).tolist()
+        return idx
+
+    def _append_node(self, node_id, type_code, properties, brand_code=None):
+        idx = self._new_index[node_id] = self.base_nodes + len(self._new_ids)
+        self._new_ids.append(node_id)
+        self._new_types.append(type_code)
+        self._new_props.append(properties or None)
+        if type_code == (self.types.code("Brand") if brand_code is None else brand_code):
+            self.brand_nodes.setdefault(fold(node_id), []).append(idx)
+        return idx
+
+    def add_nodes(self, nodes):
+        """
+        add_node for (node_id, node_type, properties) triples with distinct IDs; returns their
+        int IDs, in order. New nodes are appended directly, existing ones go through add_node.
+        """
+        out = []
+        type_codes = {}
+        brand = self.types.code("Brand")
+        for node_id, node_type, properties in nodes:
+            idx = self.lookup_node(node_id)
+            if idx is None:
+                type_code = type_codes.get(node_type)
+                if type_code is None:
+                    type_code = type_codes[node_type] = self.types.code(node_type)
+                idx = self._append_node(node_id, type_code, properties, brand)
+            else:
+                idx = self.add_node(node_id, node_type, properties)
+            out.append(idx)
+        return out
+
+    def brand_node_ids(self, brand):
+        """Int IDs of Brand nodes whose case-folded ID equals fold(brand)."""
+        folded = fold(brand)
+        candidates = list(self.brand_nodes.get(folded, []))
+        if self.base_nodes:
+            keys = self.base["brand_keys"]
+            pos = keys.find(folded)
+            if pos < len(keys) and keys[pos] == folded:
+                ptr = self.base["brand_ptr"]
+                candidates.extend(int(i) for i in self.base["brand_members"][ptr[pos]:ptr[pos + 1]])
+        brand = self.types.code("Brand")
+        return sorted(i for i in set(candidates) if self.node_type_code(i) == brand)
+
+    def brand_edge_keys(self, brand):
+        """
+        Keys of the edges touching a Brand node whose case-folded ID equals fold(brand),
+        ascending. Read from the per-brand edge lists, so the cost is O(brand edges).
+        """
+        ids = self.brand_node_ids(brand)
+        parts = []
+        if ids and self.base_edges:
+            members, keys = self._base_brand_edges(fold(brand))
+            if len(keys) and not set(members.tolist()) <= set(ids):
+                # A node listed at save time is no longer a Brand: keep only the current nodes' edges
+                keys = keys[np.isin(self.base["src"][keys], ids) | np.isin(self.base["dst"][keys], ids)]
+            parts.append(np.asarray(keys, dtype=np.int64))
+        for idx in ids:
+            if self._brand_edges.get(idx):
+                parts.append(np.asarray(self._brand_edges[idx], dtype=np.int64))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def _base_brand_edges(self, folded):
+        """(member node IDs, edge keys) of one case-folded brand in the base segment."""
+        keys_table = self.base["brand_keys"]
+        pos = keys_table.find(folded)
+        if pos == len(keys_table) or keys_table[pos] != folded:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        ptr = self.base["brand_ptr"]
+        members = self.base["brand_members"][ptr[pos]:ptr[pos + 1]]
+        if "brand_edges" in self.base:
+            edge_ptr, edges = self.base["brand_edge_ptr"], self.base["brand_edges"]
+        else:
+            # Files written before the section existed: build the lists once per process
+            if self._base_brand_lists is None:
+                self._base_brand_lists = brand_edge_lists(self.base["src"], self.base["dst"], ptr,
+                                                          self.base["brand_members"], self.base_nodes)
+            edge_ptr, edges = self._base_brand_lists
+        return members, edges[edge_ptr[pos]:edge_ptr[pos + 1]]
+
+    def _incident_keys(self, idx):
+        """Keys of all edges touching node `idx` (a full pass over the columns)."""
+        keys = [np.flatnonzero((cols["src"] == idx) | (cols["dst"] == idx)) + offset
+                for offset, cols in self.segments()]
+        return np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+
+    def _list_brand_edges(self, src, dst, first_key):
+        """Appends new edges (rows first_key...) to the edge lists of their Brand endpoints."""
+        brands = {i for i in set(src) | set(dst) if self.node_type_code(i) == self._brand_code}
+        if not brands:
+            return
+        for key, (u, v) in enumerate(zip(src, dst), first_key):
+            if u in brands:
+                self._brand_edges.setdefault(u, []).append(key)
+            if v in brands and v != u:
+                self._brand_edges.setdefault(v, []).append(key)
+
+    def brand_ids(self):
+        """Int IDs of all Brand nodes, in insertion order."""
+        brand = self.types.code("Brand")
+        ids = set()
+        if self.base_nodes:
+            ids.update(np.flatnonzero(self.base["node_type"] == brand).tolist())
+        for members in self.brand_nodes.values():
+            ids.update(members)
+        return sorted(i for i in ids if self.node_type_code(i) == brand)
+
+    # --- EDGES ---
+    def add_edge(self, src, dst, relation, start, end, topic, sentiment):
+        row = self.size
+        self._grow(row + 1)
+        self.src[row] = src
+        self.dst[row] = dst
+        self.start[row] = NO_START if start is None else to_epoch_us(start)
+        self.end[row] = NO_END if end is None else to_epoch_us(end)
+        self.relation[row] = self.relations.code(relation)
+        self.topic[row] = self.topics.code(topic)
+        self.sentiment[row] = self.sentiments.code(sentiment)
+        self.size += 1
+        key = self.base_edges + row
+        if self.node_type_code(src) == self._brand_code:
+            self._brand_edges.setdefault(src, []).append(key)
+        if dst != src and self.node_type_code(dst) == self._brand_code:
+            self._brand_edges.setdefault(dst, []).append(key)
+        return key
+
+    def add_edges(self, src, dst, relations, starts, ends, topics, sentiments):
+        """add_edge for whole columns at once (one growth step, slice assignments); returns the first key."""
+        n = len(src)
+        row = self.size
+        self._grow(row + n)
+        rows = slice(row, row + n)
+        self.src[rows] = src
+        self.dst[rows] = dst
+        self.start[rows] = [NO_START if d is None else to_epoch_us(d) for d in starts]
+        self.end[rows] = [NO_END if d is None else to_epoch_us(d) for d in ends]
+        for name, vocab, values in (("relation", self.relations, relations), ("topic", self.topics, topics),
+                                    ("sentiment", self.sentiments, sentiments)):
+            codes = {value: vocab.code(value) for value in set(values)}
+            getattr(self, name)[rows] = [codes[value] for value in values]
+        self.size += n
+        self._list_brand_edges(src, dst, self.base_edges + row)
+        return self.base_edges + row
+
+    def number_of_edges(self):
+        return self.base_edges + self.size
+
+    def segments(self):
+        """Yields (first key, columns) for the mapped base and the in-memory tail."""
+        if self.base_edges:
+            yield 0, {name: self.base[name] for name in EDGE_COLUMNS}
+        if self.size:
+            yield self.base_edges, {name: getattr(self, name)[:self.size] for name in EDGE_COLUMNS}
+
+    def column(self, name, key):
+        if key < self.base_edges:
+            return self.base[name][key]
+        return getattr(self, name)[key - self.base_edges]
+
+    def gather(self, name, keys):
+        """One column's values for an array of keys (base and tail), vectorised."""
+        keys = np.asarray(keys, dtype=np.int64)
+        out = np.empty(len(keys), dtype=EDGE_COLUMNS[name])
+        in_base = keys < self.base_edges
+        if self.base_edges:
+            out[in_base] = self.base[name][keys[in_base]]
+        out[~in_base] = getattr(self, name)[keys[~in_base] - self.base_edges]
+        return out
+
+    def edge(self, key):
+        """Returns (src ID, dst ID, attribute dict) for one edge, decoded back to Python values."""
+        start, end = self.column("start", key), self.column("end", key)
+        data = {
+            'relation': self.relations[self.column("relation", key)],
+            'start': None if start == NO_START else from_epoch_us(start),
+            'end': None if end == NO_END else from_epoch_us(end),
+            'topic': self.topics[self.column("topic", key)],
+            'sentiment': self.sentiments[self.column("sentiment", key)],
+        }
+        return self.node_id(self.column("src", key)), self.node_id(self.column("dst", key)), data
+
+    def active_keys(self, date, node_filter=None, keys=None):
+        """
+        Vectorised point-in-time filter.
+        Returns keys valid at `date`, optionally restricted to edges touching one of
+        `node_filter` (int node IDs), ordered by source node then insertion order.
+        With `keys` (ascending, e.g. brand_edge_keys), only those edges are read.
+        """
+        ts = to_epoch_us(date)
+        if keys is not None:
+            hits = keys[(self.gather("start", keys) <= ts) & (self.gather("end", keys) >= ts)]
+            return hits[np.argsort(self.gather("src", hits), kind="stable")]
+        if node_filter is not None:
+            node_filter = np.asarray(node_filter, dtype=np.int32)
+        keys, srcs = [], []
+        for offset, cols in self.segments():
+            mask = (cols["start"] <= ts) & (cols["end"] >= ts)
+            if node_filter is not None:
+                mask &= np.isin(cols["src"], node_filter) | np.isin(cols["dst"], node_filter)
+            hits = np.flatnonzero(mask)
+            keys.append(hits + offset)
+            srcs.append(cols["src"][hits])
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        keys, srcs = np.concatenate(keys), np.concatenate(srcs)
+        return keys[np.argsort(srcs, kind="stable")]
+
+    # --- CONVERSION ---
+    @classmethod
+    def from_networkx(cls, graph):
+        """Builds a store from a MultiDiGraph, keeping node order and edge-key order."""
+        store = cls()
+        for node_id, attrs in graph.nodes(data=True):
+            store.add_node(node_id, attrs.get('type', 'Unknown'), attrs.get('properties'))
+        edges = sorted(graph.edges(keys=True, data=True), key=lambda e: (not isinstance(e[2], int), e[2]))
+        for u, v, _, data in edges:
+            store.add_edge(store.lookup_node(u), store.lookup_node(v), str(data.get('relation', 'RELATED')),
+                           data.get('start'), data.get('end'),
+                           data.get('topic', 'General'), data.get('sentiment', 'Neutral'))
+        return store
+
+    def to_networkx(self):
+        """The inverse of from_networkx: a MultiDiGraph with the same node order, edge key = row number."""
+        import networkx as nx
+        graph = nx.MultiDiGraph()
+        ids = list(self.iter_node_ids())
+        for idx, node_id in enumerate(ids):
+            graph.add_node(node_id, type=self.node_type(idx), properties=self.node_properties(idx))
+        for offset, cols in self.segments():
+            columns = zip(cols["src"].tolist(), cols["dst"].tolist(), cols["start"].tolist(), cols["end"].tolist(),
+                          cols["relation"].tolist(), cols["topic"].tolist(), cols["sentiment"].tolist())
+            for key, (u, v, start, end, relation, topic, sentiment) in enumerate(columns, offset):
+                graph.add_edge(ids[u], ids[v], key=key, relation=self.relations[relation],
+                               start=None if start == NO_START else from_epoch_us(start),
+                               end=None if end == NO_END else from_epoch_us(end),
+                               topic=self.topics[topic], sentiment=self.sentiments[sentiment])
+        return graph
+
+    def window_keys(self, start, end, node_filter=None, keys=None):
+        """
+        Keys of edges with start in [start, end), oldest first, optionally restricted to
+        edges touching one of `node_filter` (int node IDs). Binary search on a start-sorted
+        row order per segment (computed once for the base, again for the tail after appends),
+        so only the edges inside the window are read. With `keys`, only those edges are read.
+        """
+        lo_ts, hi_ts = to_epoch_us(start), to_epoch_us(end)
+        if keys is not None:
+            starts = self.gather("start", keys)
+            inside = (starts >= lo_ts) & (starts < hi_ts)
+            return keys[inside][np.argsort(starts[inside], kind="stable")]
+        if node_filter is not None:
+            node_filter = np.asarray(node_filter, dtype=np.int32)
+        keys = []
+        for offset, cols in self.segments():
+            order = self._start_order(offset, cols["start"])
+            lo, hi = np.searchsorted(cols["start"], [lo_ts, hi_ts], side="left", sorter=order)
+            hits = order[lo:hi]
+            if node_filter is not None:
+                hits = hits[np.isin(cols["src"][hits], node_filter) | np.isin(cols["dst"][hits], node_filter)]
+            keys.append(hits + offset)
+        return np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+
+    def _start_order(self, offset, starts):
+        cached = self._start_orders.get(offset)
+        if cached is None or cached[0] != len(starts):
+            cached = self._start_orders[offset] = (len(starts), np.argsort(starts, kind="stable"))
+        return cached[1]
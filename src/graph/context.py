@@ -0,0 +1,69 @@
+import heapq
+
+# How get_snapshot picks which facts make it into the prompt
+RANKINGS = ("recency", "coverage", "extremity")
+
+# Lower bound on the tokens one formatted fact costs ("- Review: '' (Topic: ..., Sentiment: ...)"),
+# so a budget of B tokens can never use more than B // MIN_FACT_TOKENS candidates
+MIN_FACT_TOKENS = 8
+
+
+def approx_tokens(text):
+    """Rough token count (~4 characters per token) for callers without a tokenizer."""
+    return len(text) // 4 + 1
+
+
+def top_k(rows, k, ranking="recency"):
+    """
+    Keys of the k best facts, best first, via heap selection (nothing is formatted).
+
+    rows: iterable of (key, start, cell, extremity), where cell is the (topic, sentiment)
+    pair and extremity a score in [0, 1].
+      recency    newest first
+      extremity  most one-sided reviews first (rating far from 3), newest among equals
+      coverage   newest of each topic x sentiment cell in turn, largest cells first
+    """
+    if ranking not in RANKINGS:
+        raise ValueError(f"Unknown context ranking: {ranking}")
+    if k <= 0:
+        return []
+    if ranking == "recency":
+        return [r[0] for r in heapq.nlargest(k, rows, key=lambda r: (r[1], r[0]))]
+    if ranking == "extremity":
+        return [r[0] for r in heapq.nlargest(k, rows, key=lambda r: (r[3], r[1], r[0]))]
+
+    def newest(row):
+        return row[1], row[0]
+
+    cells = {}
+    for row in rows:
+        cells.setdefault(row[2], []).append(row)
+    # Largest cells first; equal sizes by their newest fact, so the order is backend independent
+    ordered = sorted(cells.values(), key=lambda members: (len(members), max(map(newest, members))), reverse=True)
+    ranked = [heapq.nlargest(k, members, key=newest) for members in ordered]
+    keys = []
+    for depth in range(k):
+        for members in ranked:
+            if depth < len(members):
+                keys.append(members[depth][0])
+                if len(keys) == k:
+                    return keys
+    return keys
+
+
+def fill_budget(ranked, format_fact, count_tokens, budget):
+    """
+    Formats ranked keys in order and keeps each fact that still fits in `budget` tokens
+    (a long fact is skipped, a shorter one further down may fit). Returns [(key, fact)].
+    """
+    chosen, used = [], 0
+    for key in ranked:
+        fact = format_fact(key)
+        cost = count_tokens(fact) + (1 if chosen else 0)  # + the joining newline
+        if used + cost > budget:
+            continue
+        chosen.append((key, fact))
+        used += cost
+        if budget - used < MIN_FACT_TOKENS:
+            break
+    return chosen
@@ -0,0 +1,278 @@
+import numpy as np
+from datetime import datetime, timezone
+from src.graph.columnar import StringTable, NO_START, fold
+from src.graph.schema import MarketingTopic, Sentiment
+
+# Persisted as extra .tga sections (see TemporalGraphEngine.save_to_disk)
+SECTIONS = ("cube_keys_offsets", "cube_keys_blob", "cube_ptr", "cube_month", "cube_topic",
+            "cube_sentiment", "cube_count")
+
+
+def month_bucket(date):
+    """datetime -> months since year 0 (year * 12 + month - 1)."""
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date.year * 12 + date.month - 1
+
+
+def bucket_start(bucket):
+    return datetime(bucket // 12, bucket % 12 + 1, 1)
+
+
+def month_ceil(date):
+    """Month bucket of the first month starting at or after `date` (a date inside a month counts it in full)."""
+    bucket = month_bucket(date)
+    return bucket if date == bucket_start(bucket) else bucket + 1
+
+
+def year_window(year):
+    """[Jan 1 of `year`, Jan 1 of the next year), the audit period for a calendar year."""
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def month_windows(start, end, months=1, step=None):
+    """
+    (window start, window end) pairs of `months` whole months, `step` months apart
+    (default: back to back), from the month of `start` through `end` (rounded up to a month).
+    Only full windows are returned.
+    """
+    step = step or months
+    if months < 1 or step < 1:
+        raise ValueError("Window size and step must be at least one month")
+    first, last = month_bucket(start), month_ceil(end)
+    return [(bucket_start(b), bucket_start(b + months)) for b in range(first, last - months + 1, step)]
+
+
+def period_label(period):
+    """
+    Human-readable audit period: '2016' for a calendar-year window, '2016-03 to 2016-05' for
+    other whole-month windows (end month included), 'up to 2016-01-01' for a point in time.
+    """
+    if not isinstance(period, tuple):
+        return f"up to {period:%Y-%m-%d}"
+    start, end = period
+    if (start, end) == year_window(start.year):
+        return str(start.year)
+    if start == bucket_start(month_bucket(start)) and end == bucket_start(month_bucket(end)):
+        last = bucket_start(month_bucket(end) - 1)
+        return f"{start:%Y-%m}" if last == start else f"{start:%Y-%m} to {last:%Y-%m}"
+    return f"{start:%Y-%m-%d} to {end:%Y-%m-%d} (exclusive)"
+
+
+class AggregateCube:
+    """
+    Review counts per brand x topic x sentiment x calendar month.
+
+    Each brand holds a dense int32 array (months, topics, sentiments) covering the
+    months it has reviews in, so a range query is one slice sum (O(buckets)) and a
+    point update is O(1). Brands are keyed case-folded, like the brand index.
+
+    A cube loaded from disk keeps its brands in the memory-mapped sections and only
+    materialises a brand's array the first time it is queried or updated.
+    """
+
+    def __init__(self, topics=None, sentiments=None, base=None):
+        self.topics = list(topics or [t.value for t in MarketingTopic])
+        self.sentiments = list(sentiments or [s.value for s in Sentiment])
+        self._topic_codes = {t: i for i, t in enumerate(self.topics)}
+        self._sentiment_codes = {s: i for i, s in enumerate(self.sentiments)}
+        self._brands = {}  # folded brand -> [first month bucket, counts array]
+        self.base = base   # Memory-mapped sections by name, or None
+
+    def _code(self, value, values, codes):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    # --- UPDATES ---
+    def add(self, brand, topic, sentiment, date, count=1):
+        if date is None:
+            return  # Undated edges never show up in a time query
+        t = self._code(topic, self.topics, self._topic_codes)
+        s = self._code(sentiment, self.sentiments, self._sentiment_codes)
+        bucket = month_bucket(date)
+        entry = self._entry(fold(brand), create=True)
+        first, counts = entry
+        if bucket < first or bucket >= first + len(counts) or t >= counts.shape[1] or s >= counts.shape[2]:
+            first, counts = self._resize(entry, bucket, t, s)
+        counts[bucket - first, t, s] += count
+
+    def add_many(self, brand, cells):
+        """add for one brand's {(topic, sentiment, month bucket): count} cells (one brand lookup)."""
+        if not cells:
+            return
+        entry = self._entry(fold(brand), create=True)
+        first, counts = entry
+        for (topic, sentiment, bucket), count in cells.items():
+            t = self._topic_codes.get(topic)
+            if t is None:
+                t = self._code(topic, self.topics, self._topic_codes)
+            s = self._sentiment_codes.get(sentiment)
+            if s is None:
+                s = self._code(sentiment, self.sentiments, self._sentiment_codes)
+            if bucket < first or bucket >= first + len(counts) or t >= counts.shape[1] or s >= counts.shape[2]:
+                first, counts = self._resize(entry, bucket, t, s)
+            counts[bucket - first, t, s] += count
+
+    def _resize(self, entry, bucket, t, s):
+        # Exact span: most brands only have a handful of months, and a brand spans at
+        # most a few hundred, so re-allocating on a new month stays cheap
+        first, counts = entry
+        if not len(counts):
+            first = bucket
+        lo, hi = min(first, bucket), max(first + len(counts), bucket + 1)
+        grown = np.zeros((hi - lo, max(len(self.topics), t + 1), max(len(self.sentiments), s + 1)), dtype=np.int32)
+        grown[first - lo:first - lo + len(counts), :counts.shape[1], :counts.shape[2]] = counts
+        entry[0], entry[1] = lo, grown
+        return lo, grown
+
+    # --- QUERIES ---
+    def _entry(self, folded, create=False):
+        entry = self._brands.get(folded)
+        if entry is None:
+            entry = self._load_base(folded)
+            if entry is None:
+                if not create:
+                    return None
+                entry = [0, np.zeros((0, len(self.topics), len(self.sentiments)), dtype=np.int32)]
+            self._brands[folded] = entry
+        return entry
+
+    def _load_base(self, folded):
+        if self.base is None:
+            return None
+        keys = self.base["cube_keys"]
+        pos = keys.find(folded)
+        if pos >= len(keys) or keys[pos] != folded:
+            return None
+        lo, hi = self.base["cube_ptr"][pos], self.base["cube_ptr"][pos + 1]
+        months = np.asarray(self.base["cube_month"][lo:hi])
+        first = int(months.min())
+        counts = np.zeros((int(months.max()) - first + 1, len(self.topics), len(self.sentiments)), dtype=np.int32)
+        counts[months - first, self.base["cube_topic"][lo:hi], self.base["cube_sentiment"][lo:hi]] = \
+            self.base["cube_count"][lo:hi]
+        return [first, counts]
+
+    def __contains__(self, brand):
+        return self._entry(fold(brand)) is not None
+
+    def counts(self, brand, start=None, end=None):
+        """(topics x sentiments) totals for months in [start, end) (open-ended when None)."""
+        entry = self._entry(fold(brand))
+        if entry is None:
+            return np.zeros((len(self.topics), len(self.sentiments)), dtype=np.int64)
+        first, counts = entry
+        lo = 0 if start is None else max(0, month_bucket(start) - first)
+        hi = len(counts) if end is None else max(0, min(len(counts), month_bucket(end) - first))
+        totals = np.zeros((len(self.topics), len(self.sentiments)), dtype=np.int64)
+        totals[:counts.shape[1], :counts.shape[2]] = counts[lo:hi].sum(axis=0)
+        return totals
+
+    def distribution(self, brand, start=None, end=None):
+        """{topic: {sentiment: count}} for months in [start, end), zero rows dropped."""
+        totals = self.counts(brand, start, end)
+        return {self.topics[t]: {self.sentiments[s]: int(totals[t, s]) for s in range(len(self.sentiments))}
+                for t in range(len(self.topics)) if totals[t].any()}
+
+    def total(self, brand, start=None, end=None, topic=None, sentiment=None):
+        totals = self.counts(brand, start, end)
+        return int(totals[self._slice(topic, self._topic_codes), self._slice(sentiment, self._sentiment_codes)].sum())
+
+    def series(self, brand, start=None, end=None, topic=None, sentiment=None):
+        """[(month start datetime, count)] for every month in [start, end) the brand spans."""
+        entry = self._entry(fold(brand))
+        if entry is None:
+            return []
+        first, counts = entry
+        t = self._slice(topic, self._topic_codes)
+        s = self._slice(sentiment, self._sentiment_codes)
+        lo = 0 if start is None else max(0, month_bucket(start) - first)
+        hi = len(counts) if end is None else max(lo, min(len(counts), month_bucket(end) - first))
+        per_month = counts[lo:hi, t, s].sum(axis=(1, 2))
+        return [(bucket_start(first + lo + i), int(n)) for i, n in enumerate(per_month)]
+
+    @staticmethod
+    def _slice(value, codes):
+        if value is None:
+            return slice(None)
+        code = codes.get(value, -1)
+        return slice(code, code + 1) if code >= 0 else slice(0, 0)
+
+    def year_over_year(self, brand, year, topic=None, sentiment=None):
+        """Calendar-year count vs the previous year: {"year", "count", "previous", "delta", "pct_change"}."""
+        current = self.total(brand, datetime(year, 1, 1), datetime(year + 1, 1, 1), topic, sentiment)
+        previous = self.total(brand, datetime(year - 1, 1, 1), datetime(year, 1, 1), topic, sentiment)
+        return {"year": year, "count": current, "previous": previous, "delta": current - previous,
+                "pct_change": (current - previous) / previous * 100.0 if previous else None}
+
+    # --- PERSISTENCE ---
+    def to_sections(self):
+        """Sparse (brand-sorted) arrays for storage.write_graph, plus the header it needs."""
+        for key in self._base_keys():
+            self._entry(key)  # Pull every base brand in before rewriting
+        keys = sorted(self._brands, key=lambda k: k.encode("utf-8"))
+        ptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        months, topics, sentiments, counts = [], [], [], []
+        for i, key in enumerate(keys):
+            first, dense = self._brands[key]
+            m, t, s = np.nonzero(dense)
+            months.append((m + first).astype(np.int32))
+            topics.append(t.astype(np.int8))
+            sentiments.append(s.astype(np.int8))
+            counts.append(dense[m, t, s])
+            ptr[i + 1] = ptr[i] + len(m)
+        offsets, blob = StringTable.encode(keys)
+
+        def cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.empty(0, dtype=dtype)
+
+        sections = {
+            "cube_keys_offsets": offsets, "cube_keys_blob": blob, "cube_ptr": ptr,
+            "cube_month": cat(months, np.int32), "cube_topic": cat(topics, np.int8),
+            "cube_sentiment": cat(sentiments, np.int8), "cube_count": cat(counts, np.int32),
+        }
+        return sections, {"topics": self.topics, "sentiments": self.sentiments}
+
+    def _base_keys(self):
+        if self.base is None:
+            return []
+        keys = self.base["cube_keys"]
+        return [keys[i] for i in range(len(keys))]
+
+    @classmethod
+    def from_sections(cls, sections, header):
+        """Cube over memory-mapped sections (None if the file predates the cube)."""
+        if header is None or any(name not in sections for name in SECTIONS):
+            return None
+        base = {name: sections[name] for name in SECTIONS}
+        base["cube_keys"] = StringTable(base.pop("cube_keys_offsets"), base.pop("cube_keys_blob"))
+        return cls(header["topics"], header["sentiments"], base=base)
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds the cube from a ColumnarEdgeStore's columns (files written before the cube existed)."""
+        cube = cls(store.topics.values, store.sentiments.values)
+        brand = store.types.code("Brand")
+        node_types = store.node_type_codes()
+        for _, cols in store.segments():
+            dated = cols["start"] != NO_START
+            src, dst = cols["src"][dated], cols["dst"][dated]
+            months = (cols["start"][dated].astype("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+                      + 1970 * 12)
+            topics, sentiments = cols["topic"][dated], cols["sentiment"][dated]
+            # Same rule as the brand index: each distinct Brand endpoint gets the edge
+            src_brand, dst_brand = node_types[src] == brand, node_types[dst] == brand
+            for mask, nodes in ((src_brand, src), (dst_brand & ~(src_brand & (src == dst)), dst)):
+                cube._add_coded(store, nodes[mask], months[mask], topics[mask], sentiments[mask])
+        return cube
+
+    def _add_coded(self, store, nodes, months, topics, sentiments):
+        if not len(nodes):
+            return
+        rows, counts = np.unique(np.stack([nodes.astype(np.int64), months, topics.astype(np.int64),
+                                           sentiments.astype(np.int64)]), axis=1, return_counts=True)
+        for (node, month, topic, sentiment), n in zip(rows.T, counts):
+            self.add(store.node_id(int(node)), store.topics[int(topic)], store.sentiments[int(sentiment)],
+                     bucket_start(int(month)), int(n))
@@ -1,108 +1,710 @@
 import networkx as nx
 import pickle
 import os
+import time
+import numpy as np
 from datetime import datetime
 from src.graph.schema import Node, TemporalEdge, MarketingTopic, Sentiment # Ensure all enums are imported
+from src.graph.index import TimeIndex, BrandIndex
+from src.graph.columnar import ColumnarEdgeStore
+from src.graph.cube import AggregateCube, month_bucket, month_ceil, month_windows, bucket_start
+from src.graph.lookup import BrandLookup
+from src.graph.context import MIN_FACT_TOKENS, approx_tokens, fill_budget, top_k
+from src.graph import storage
+from src.graph.wal import WriteAheadLog
+from src.utils.cache import LRUCache
+from src.utils.metrics import METRICS, COUNT_BUCKETS
+
+BACKENDS = ("networkx", "columnar")
 
 class TemporalGraphEngine:
-    def __init__(self):
-        self.graph = nx.MultiDiGraph()
+    def __init__(self, backend: str = "networkx"):
+        """
+        backend="networkx" keeps the MultiDiGraph in self.graph (attribute dict per edge).
+        backend="columnar" keeps edges in NumPy columns in self.store (~30 bytes per edge).
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown graph backend: {backend}")
+        self.backend = backend
+        self.graph = nx.MultiDiGraph() if backend == "networkx" else None
+        self.store = ColumnarEdgeStore() if backend == "columnar" else None
         self.edge_count = 0
+        self.meta = {}       # Persisted with the snapshot (WAL generation, ingest checkpoints, ...)
+        self.wal = None
+        # Review counts per brand x topic x sentiment x month, kept in step with add_data / add_batch
+        self.cube = AggregateCube()
+        # Brand name resolution (exact / autocomplete / fuzzy) for the interactive CLI
+        self.brand_lookup = BrandLookup()
+        # Bumped on every mutation; snapshot cache keys include it, so stale entries never match
+        self.version = 0
+        self.snapshot_cache = LRUCache(max_entries=256)
+        self._cached_version = 0
+        # Optional semantic index over review texts (src/graph/vectors.py), used by get_relevant
+        self.vectors = None
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        # Side indexes kept next to the MultiDiGraph so queries never walk every edge
+        self.time_index = TimeIndex()
+        self.brand_index = BrandIndex()
+        self._edges = {}      # edge key -> (u, v, attribute dict held by the graph)
+
+    def _index_edge(self, u, v, key, data):
+        self._edges[key] = (u, v, data)
+        self.time_index.add(key, data.get('start'), data.get('end'))
+
+        # Index the edge under each (distinct) Brand endpoint
+        brands = {BrandIndex.fold(n) for n in (u, v) if self.graph.nodes[n].get('type') == 'Brand'}
+        for brand in brands:
+            self.brand_index.add(brand, key, data.get('start'), data.get('end'))
 
     # --- CRITICAL MISSING FUNCTION: RESTORED ---
     def add_data(self, node_a: Node, node_b: Node, edge: TemporalEdge):
         """
         Adds a semantic connection (edge) and its endpoints (nodes) to the graph.
         """
+        started = time.perf_counter() if METRICS.enabled else None
+
+        # 0. Log first, so the operation survives a crash (no-op unless a WAL is attached)
+        if self.wal is not None:
+            self.wal.append(node_a, node_b, edge)
+
         # 1. Cast IDs to Strings (Crucial for NetworkX stability)
         src_id = str(node_a.id)
         tgt_id = str(node_b.id)
 
-        # 2. Add Nodes with properties
-        # Note: NetworkX stores the dataclass fields (id, type, properties) as node attributes
-        self.graph.add_node(src_id, type=node_a.type, properties=node_a.properties)
-        self.graph.add_node(tgt_id, type=node_b.type, properties=node_b.properties)
-        
-        # 3. Handle Enums Safely
+        # 2. Handle Enums Safely
         # Ensures that Topic and Sentiment are stored as simple strings in the graph
         topic_val = edge.topic.value if hasattr(edge.topic, 'value') else str(edge.topic)
         sentiment_val = edge.sentiment.value if hasattr(edge.sentiment, 'value') else str(edge.sentiment)
 
-        # 4. Add Edge
-        self.graph.add_edge(
-            src_id, 
-            tgt_id, 
-            key=self.edge_count, 
-            relation=str(edge.relation), 
-            start=edge.start_date, 
-            end=edge.end_date,
-            topic=topic_val,
-            sentiment=sentiment_val
-        )
+        if self.store is not None:
+            # 3a. Columnar backend: interned node IDs + one row per edge
+            src_idx = self.store.add_node(src_id, node_a.type, node_a.properties)
+            tgt_idx = self.store.add_node(tgt_id, node_b.type, node_b.properties)
+            self.store.add_edge(src_idx, tgt_idx, str(edge.relation), edge.start_date, edge.end_date,
+                                topic_val, sentiment_val)
+        else:
+            # 3. Add Nodes with properties
+            # Note: NetworkX stores the dataclass fields (id, type, properties) as node attributes
+            self.graph.add_node(src_id, type=node_a.type, properties=node_a.properties)
+            self.graph.add_node(tgt_id, type=node_b.type, properties=node_b.properties)
+
+            # 4. Add Edge
+            self.graph.add_edge(
+                src_id, 
+                tgt_id, 
+                key=self.edge_count, 
+                relation=str(edge.relation), 
+                start=edge.start_date, 
+                end=edge.end_date,
+                topic=topic_val,
+                sentiment=sentiment_val
+            )
+            self._index_edge(src_id, tgt_id, self.edge_count, self.graph[src_id][tgt_id][self.edge_count])
+
+        # 5. Aggregates: count the edge once under each (distinct) Brand endpoint
+        brands = {BrandIndex.fold(n.id): str(n.id) for n in (node_a, node_b) if n.type == 'Brand'}
+        for brand in brands.values():
+            self.cube.add(brand, topic_val, sentiment_val, edge.start_date)
+            self.brand_lookup.add(brand)
         
         self.edge_count += 1
-        
-        # Optionally print for debugging ingestion (you can comment this out later)
-        if self.edge_count % 1000 == 0:
-             print(f"[Engine] Edge #{self.edge_count} added.")
+        self.version += 1
+        if started is not None:
+            METRICS.observe("engine_add_data_seconds", time.perf_counter() - started)
+
+    def add_batch(self, records) -> int:
+        """
+        Bulk add_data for (node_a, node_b, edge) records, e.g. one loader batch.
+
+        The result is the graph add_data would build record by record: a node repeated in
+        the batch ends up with the attributes of its last record, and edge keys are the ones
+        add_data would have assigned. Each distinct node is written once, and the side
+        indexes, aggregate cube and brand lookup are updated once per batch.
+        Returns the number of edges added.
+        """
+        records = list(records)
+        if not records:
+            return 0
+        started = time.perf_counter() if METRICS.enabled else None
+        if self.wal is not None:
+            self.wal.append_many(records)
+
+        topics = [e.topic.value if hasattr(e.topic, 'value') else str(e.topic) for _, _, e in records]
+        sentiments = [e.sentiment.value if hasattr(e.sentiment, 'value') else str(e.sentiment) for _, _, e in records]
+        # Brand endpoints of each record (folded name -> name), from the record's own node types
+        # as in add_data; folded once per distinct node ID
+        folded = {}
+        record_brands = []
+        for node_a, node_b, _ in records:
+            brands = {}
+            for node in (node_a, node_b):
+                if node.type == 'Brand':
+                    name = str(node.id)
+                    key = folded.get(name)
+                    if key is None:
+                        key = folded[name] = BrandIndex.fold(name)
+                    brands[key] = name
+            record_brands.append(brands)
+
+        if self.store is not None:
+            self._add_batch_columnar(records, topics, sentiments)
+        else:
+            self._add_batch_networkx(records, topics, sentiments, record_brands)
+
+        # Aggregates: one cube update and one lookup insert per brand in the batch
+        cells = {}  # brand -> {(topic, sentiment, month bucket): count}, brands in first-seen order
+        for (_, _, edge), topic, sentiment, brands in zip(records, topics, sentiments, record_brands):
+            if not brands:
+                continue
+            bucket = month_bucket(edge.start_date) if edge.start_date is not None else None
+            for brand in brands.values():
+                brand_cells = cells.setdefault(brand, {})
+                if bucket is not None:  # Undated edges never show up in a time query
+                    cell = (topic, sentiment, bucket)
+                    brand_cells[cell] = brand_cells.get(cell, 0) + 1
+        for brand, brand_cells in cells.items():
+            self.cube.add_many(brand, brand_cells)
+            self.brand_lookup.add(brand)
+
+        self.edge_count += len(records)
+        self.version += 1
+        if started is not None:
+            METRICS.observe("engine_add_batch_seconds", time.perf_counter() - started)
+            METRICS.inc("engine_batch_edges_total", len(records))
+        return len(records)
+
+    @staticmethod
+    def _latest_nodes(records):
+        """node ID -> the Node of its last record in the batch (add_data overwrites as it goes)."""
+        latest = {}
+        for node_a, node_b, _ in records:
+            latest[str(node_a.id)] = node_a
+            latest[str(node_b.id)] = node_b
+        return latest
+
+    def _add_batch_columnar(self, records, topics, sentiments):
+        latest = self._latest_nodes(records)
+        ids = dict(zip(latest, self.store.add_nodes((node_id, node.type, node.properties)
+                                                    for node_id, node in latest.items())))
+        src = [ids[str(a.id)] for a, _, _ in records]
+        dst = [ids[str(b.id)] for _, b, _ in records]
+        edges = [e for _, _, e in records]
+        self.store.add_edges(src, dst, [str(e.relation) for e in edges],
+                             [e.start_date for e in edges], [e.end_date for e in edges], topics, sentiments)
+
+    def _add_batch_networkx(self, records, topics, sentiments, record_brands):
+        graph = self.graph
+        graph.add_nodes_from((node_id, {"type": node.type, "properties": node.properties})
+                             for node_id, node in self._latest_nodes(records).items())
+
+        # One add_edge per edge, as add_data does (add_edges_from goes through add_edge too and
+        # then updates each edge's attributes a second time); the attribute dict the graph holds
+        # is read back from its adjacency dicts rather than through the G[u][v] views
+        add_edge, succ = graph.add_edge, graph._succ
+        edges = self._edges
+        timed, by_brand = [], {}
+        key = self.edge_count
+        for (node_a, node_b, e), topic, sentiment, brands in zip(records, topics, sentiments, record_brands):
+            u, v = str(node_a.id), str(node_b.id)
+            add_edge(u, v, key=key, relation=str(e.relation), start=e.start_date, end=e.end_date,
+                     topic=topic, sentiment=sentiment)
+            edges[key] = (u, v, succ[u][v][key])
+            item = (key, e.start_date, e.end_date)
+            timed.append(item)
+            for brand in brands:
+                by_brand.setdefault(brand, []).append(item)
+            key += 1
+        # Side indexes, grouped so each brand's time index is extended once
+        self.time_index.add_many(timed)
+        for brand, items in by_brand.items():
+            self.brand_index.add_many(brand, items)
 
     # --- EXISTING SNAPSHOT LOGIC ---
-    def get_snapshot(self, date: datetime, target_brand: str = None) -> str:
+    def get_snapshot(self, date: datetime, target_brand: str = None, match: str = "exact",
+                     limit: int = 50, token_budget: int = None, count_tokens=None,
+                     ranking: str = "recency") -> str:
         """
         Returns facts enriched with actual review text.
+
+        match="exact" looks the brand up case-insensitively in the brand index.
+        match="substring" is the legacy behaviour: any edge whose endpoint IDs contain the brand.
+
+        The `limit` best facts by `ranking` (see src/graph/context.py) are selected with a
+        heap, so only those are formatted. With `token_budget`, facts are added in rank order
+        while they fit, measured with `count_tokens` (pass the LLM tokenizer's; a ~4 chars/token
+        estimate otherwise). The selected facts are listed oldest first.
+        Results are cached until the graph changes (see snapshot_cache.stats()).
+
+        Reviews never get an end date, so "valid at `date`" means every review up to it;
+        use get_window for the reviews of one period.
         """
-        facts = []
-        for u, v, data in self.graph.edges(data=True):
-            start = data.get('start')
-            end = data.get('end')
-            
-            # 1. TIME FILTER
-            if start and start <= date and (end is None or end >= date):
-                
-                # 2. BRAND FILTER
-                if target_brand:
-                    if target_brand.lower() not in u.lower() and target_brand.lower() not in v.lower():
-                        continue
-                
-                # 3. RETRIEVE TEXT CONTENT (The Fix!)
-                # v is the Review ID. We need to look up the node properties to get the text.
-                try:
-                    node_props = self.graph.nodes[v].get('properties', {})
-                    review_text = node_props.get('text', 'No text available')
-                    # Truncate text to save tokens
-                    snippet = review_text[:100] + "..." if len(review_text) > 100 else review_text
-                except:
-                    snippet = "(Text missing)"
-
-                rel = data.get('relation', 'RELATED')
-                topic = data.get('topic', 'General')
-                sentiment = data.get('sentiment', 'Neutral')
-                
-                # We now include the snippet in the fact string
-                facts.append(f"- Review: '{snippet}' (Topic: {topic}, Sentiment: {sentiment})")
-        
+        return self._render_facts(("snapshot", date), target_brand, match,
+                                  lambda: self._match_keys(date, target_brand, match),
+                                  limit, token_budget, count_tokens, ranking, "engine_snapshot_seconds")
+
+    def get_window(self, brand: str, start: datetime, end: datetime, match: str = "exact",
+                   limit: int = 50, token_budget: int = None, count_tokens=None,
+                   ranking: str = "recency") -> str:
+        """
+        Facts for the edges of `brand` that start in [start, end), e.g. the reviews written
+        in 2016 for year_window(2016). Selection, formatting and caching as in get_snapshot.
+        The keys come from a binary search on start-sorted arrays: O(log E + edges in window).
+        """
+        if start >= end:
+            raise ValueError("Window start must be before its end")
+        return self._render_facts(("window", start, end), brand, match,
+                                  lambda: self._match_keys(start, brand, match, until=end),
+                                  limit, token_budget, count_tokens, ranking, "engine_window_seconds")
+
+    def sliding_windows(self, brand: str, start: datetime, end: datetime, months: int = 1,
+                        step: int = None, facts: bool = False, **fact_options):
+        """
+        Yields one dict per window of `months` whole months, `step` months apart (default:
+        back to back), over [start, end) (see cube.month_windows):
+            {"start", "end", "total", "counts": {topic: {sentiment: n}}}
+        plus "facts" (the get_window text, `fact_options` passed through) with facts=True.
+        Counts come from the aggregate cube in O(months) per window; nothing is rescanned.
+        """
+        for window_start, window_end in month_windows(start, end, months, step):
+            window = {"start": window_start, "end": window_end,
+                      "total": self.cube.total(brand, window_start, window_end),
+                      "counts": self.cube.distribution(brand, window_start, window_end)}
+            if facts:
+                window["facts"] = self.get_window(brand, window_start, window_end, **fact_options)
+            yield window
+
+    def _render_facts(self, query, target_brand, match, find_keys, limit, token_budget, count_tokens,
+                      ranking, metric):
+        """Ranks, formats and caches the facts for the keys `find_keys()` returns (get_snapshot / get_window)."""
+        if match not in ("exact", "substring"):
+            raise ValueError(f"Unknown brand match mode: {match}")
+        started = time.perf_counter() if METRICS.enabled else None
+
+        brand_key = None
+        if target_brand:
+            brand_key = BrandIndex.fold(target_brand) if match == "exact" else target_brand.lower()
+        cache_key = (self.version, brand_key, query, match, limit, token_budget, ranking)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            if started is not None:
+                METRICS.observe(metric, time.perf_counter() - started, cache="hit")
+            return cached
+
+        keys = find_keys()
+        k = len(keys) if limit is None else limit
+        if token_budget is not None:
+            k = min(k, token_budget // MIN_FACT_TOKENS)
+        ranked = top_k(self._fact_rows(keys, ranking), k, ranking)
+
+        def format_fact(key):
+            u, v, data = self._edge(key)
+            return self._format_fact(v, data)
+
+        chosen = self._choose(ranked, format_fact, token_budget, count_tokens)
+        facts = [fact for key, fact in sorted(chosen, key=lambda item: self._chronological(item[0]))]
+        snapshot = self._join_facts(facts)
+        self.snapshot_cache.put(cache_key, snapshot)
+        if started is not None:
+            METRICS.observe(metric, time.perf_counter() - started, cache="miss")
+            METRICS.observe("engine_snapshot_facts", len(facts), buckets=COUNT_BUCKETS)
+        return snapshot
+
+    def get_relevant(self, brand: str, query: str, start: datetime = None, end: datetime = None,
+                     limit: int = 50, token_budget: int = None, count_tokens=None, nprobe: int = 16) -> str:
+        """
+        Facts for the reviews of `brand` starting in [start, end) (either bound may be None)
+        that are most similar to `query`, e.g. "battery life", from the semantic index in
+        self.vectors (see src/graph/vectors.py). Most similar first for `limit` and
+        `token_budget`; listed oldest first and cached, as in get_snapshot.
+        Reviews ingested after the index was last updated are not searched.
+        """
+        if self.vectors is None:
+            raise ValueError("No vector index attached (engine.vectors); see src/graph/vectors.py")
+        started = time.perf_counter() if METRICS.enabled else None
+
+        cache_key = (self.version, BrandIndex.fold(brand), ("relevant", query, start, end, nprobe),
+                     id(self.vectors), len(self.vectors), limit, token_budget)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            if started is not None:
+                METRICS.observe("engine_relevant_seconds", time.perf_counter() - started, cache="hit")
+            return cached
+
+        k = len(self.vectors) if limit is None else limit
+        if token_budget is not None:
+            k = min(k, token_budget // MIN_FACT_TOKENS)
+        ranked = [row for row, _ in self.vectors.search(query, brand, start, end, k=k, nprobe=nprobe)] if k else []
+
+        def format_fact(row):
+            review_id, topic, sentiment, _ = self.vectors.fact(row)
+            return self._format_fact(review_id, {'topic': topic, 'sentiment': sentiment})
+
+        def chronological(item):
+            review_start = self.vectors.fact(item[0])[3]
+            return review_start or datetime.min, item[0]
+
+        facts = [fact for row, fact in sorted(self._choose(ranked, format_fact, token_budget, count_tokens),
+                                              key=chronological)]
+        snapshot = self._join_facts(facts)
+        self.snapshot_cache.put(cache_key, snapshot)
+        if started is not None:
+            METRICS.observe("engine_relevant_seconds", time.perf_counter() - started, cache="miss")
+        return snapshot
+
+    def _cached(self, cache_key):
+        if self._cached_version != self.version:
+            self.snapshot_cache.clear()  # Free entries the last mutation made unreachable
+            self._cached_version = self.version
+        return self.snapshot_cache.get(cache_key)
+
+    @staticmethod
+    def _choose(ranked, format_fact, token_budget, count_tokens):
+        """[(key, fact)] for the ranked keys: all of them, or those that fit `token_budget`."""
+        if token_budget is None:
+            return [(key, format_fact(key)) for key in ranked]
+        count_tokens = count_tokens or approx_tokens
+        chosen = fill_budget(ranked, format_fact, count_tokens, token_budget)
+        # Facts were measured one by one; re-measure the joined text and trim to be exact
+        while chosen and count_tokens("\n".join(fact for _, fact in chosen)) > token_budget:
+            chosen.pop()
+        return chosen
+
+    @staticmethod
+    def _join_facts(facts):
         if not facts:
             return "No recorded events found for this brand in this period."
-            
-        # Limit to 50 facts
-        return "\n".join(facts[-50:])
-        
+        return "\n".join(facts)
+
+    def _fact_rows(self, keys, ranking):
+        """(key, start, (topic, sentiment), extremity) per edge key, for ranking without formatting."""
+        if self.store is not None:
+            keys = [int(k) for k in keys]
+            starts = self.store.gather("start", keys).tolist()
+            cells = list(zip(self.store.gather("topic", keys).tolist(), self.store.gather("sentiment", keys).tolist()))
+            if ranking == "extremity":
+                dsts = self.store.gather("dst", keys).tolist()
+                extremity = [self._extremity(self.store.node_properties(d), self.store.sentiments[c[1]])
+                             for d, c in zip(dsts, cells)]
+            else:
+                extremity = [0.0] * len(keys)
+            return zip(keys, starts, cells, extremity)
+
+        def rows():
+            for key in keys:
+                u, v, data = self._edges[key]
+                extremity = self._extremity(self._node_properties(v), data.get('sentiment')) \
+                    if ranking == "extremity" else 0.0
+                # Edges without a start date rank as the oldest
+                yield key, data.get('start') or datetime.min, (data.get('topic'), data.get('sentiment')), extremity
+        return rows()
+
+    @staticmethod
+    def _extremity(review_props, sentiment):
+        """How one-sided a review is: |rating - 3| / 2 when the rating was kept, else by sentiment."""
+        rating = review_props.get('rating')
+        if rating is not None:
+            return min(abs(float(rating) - 3.0) / 2.0, 1.0)
+        return 0.5 if sentiment in (Sentiment.POSITIVE.value, Sentiment.NEGATIVE.value) else 0.0
+
+    def _chronological(self, key):
+        if self.store is not None:
+            return self.store.column("start", key), key
+        return self._edges[key][2].get('start') or datetime.min, key
+
+    def _match_keys(self, date, target_brand, match, until=None):
+        """
+        Edge keys valid at `date` for the brand, or with `until`, the keys of edges that
+        start in [date, until) (in no particular order; callers rank them).
+        """
+        if self.store is not None:
+            # Columnar backend: an exact brand reads only its own edge list; otherwise one
+            # vectorised mask over the edge columns (windows: binary search)
+            if target_brand and match == "exact":
+                keys = self.store.brand_edge_keys(target_brand)
+                if until is not None:
+                    return self.store.window_keys(date, until, keys=keys)
+                return self.store.active_keys(date, keys=keys)
+            node_filter = None
+            if target_brand:
+                needle = target_brand.lower()
+                node_filter = [i for i, n in enumerate(self.store.iter_node_ids()) if needle in n.lower()]
+            if until is not None:
+                return self.store.window_keys(date, until, node_filter)
+            return self.store.active_keys(date, node_filter)
+
+        # 1. TIME + BRAND FILTER (binary search on the per-brand / global time index)
+        if target_brand and match == "exact":
+            if until is not None:
+                return self.brand_index.window(target_brand, date, until)
+            return self.brand_index.query(target_brand, date)
+
+        keys = self.time_index.window(date, until) if until is not None else self.time_index.query(date)
+        # 2. LEGACY SUBSTRING FILTER (opt-in)
+        if target_brand:
+            needle = target_brand.lower()
+            keys = [k for k in keys
+                    if needle in self._edges[k][0].lower() or needle in self._edges[k][1].lower()]
+        return keys
+
+    def _edge(self, key):
+        if self.store is not None:
+            return self.store.edge(key)
+        return self._edges[key]
+
+    def _node_properties(self, node_id):
+        if self.store is not None:
+            return self.store.node_properties(self.store.lookup_node(node_id))
+        return self.graph.nodes[node_id].get('properties', {})
+
+    def _format_fact(self, v, data):
+        # RETRIEVE TEXT CONTENT (The Fix!)
+        # v is the Review ID. We need to look up the node properties to get the text.
+        try:
+            node_props = self._node_properties(v)
+            review_text = node_props.get('text', 'No text available')
+            # Truncate text to save tokens
+            snippet = review_text[:100] + "..." if len(review_text) > 100 else review_text
+        except:
+            snippet = "(Text missing)"
+
+        topic = data.get('topic', 'General')
+        sentiment = data.get('sentiment', 'Neutral')
+
+        # We now include the snippet in the fact string
+        return f"- Review: '{snippet}' (Topic: {topic}, Sentiment: {sentiment})"
+
+    # --- AGGREGATES (exact counts from the cube, independent of the 50-fact cut) ---
+    def get_trend_summary(self, brand: str, date: datetime) -> str:
+        """
+        Exact review counts for `brand` up to `date`: topic x sentiment totals, and the
+        last 12 months against the 12 before. Costs O(months) regardless of graph size.
+        Only complete months count, so nothing after `date` does: for a date inside a month,
+        the counts stop at the start of that month (the first line names the cutoff).
+        """
+        if brand not in self.cube:
+            return "No aggregate counts recorded for this brand."
+        end = month_bucket(date)
+        end_date = bucket_start(end)
+
+        totals = self.cube.counts(brand, end=end_date)
+        cutoff = "" if end_date == date else f" (complete months up to {date:%Y-%m-%d})"
+        lines = [f"All reviews before {end_date:%Y-%m}{cutoff}: {int(totals.sum())}"]
+        lines.extend(self._topic_lines(totals))
+        lines.append(f"Last 12 months vs the 12 before ({bucket_start(end - 12):%Y-%m} to {end_date:%Y-%m} vs "
+                     f"{bucket_start(end - 24):%Y-%m} to {bucket_start(end - 12):%Y-%m}):")
+        lines.extend(self._comparison_lines(brand, end - 12, end))
+        return "\n".join(lines)
+
+    def get_window_summary(self, brand: str, start: datetime, end: datetime) -> str:
+        """
+        Exact review counts for `brand` over the whole months inside [start, end): topic x
+        sentiment totals, and those months against as many months just before them. O(months).
+        For a month-aligned window such as year_window(2016) that is the whole window, so the
+        counts match the get_window facts; partial months at either end are left out, and the
+        summary names the months it counted.
+        """
+        if brand not in self.cube:
+            return "No aggregate counts recorded for this brand."
+        first, last = month_ceil(start), month_bucket(end)
+        if last <= first:
+            return "No whole month in this window, so no aggregate counts."
+        months = last - first
+        start_date, end_date = bucket_start(first), bucket_start(last)
+        aligned = (start_date, end_date) == (start, end)
+
+        totals = self.cube.counts(brand, start_date, end_date)
+        scope, subject = ("All reviews", "This window") if aligned else \
+            ("Reviews in the whole months of this window", "These months")
+        lines = [f"{scope} from {start_date:%Y-%m} to {end_date:%Y-%m} (end exclusive): {int(totals.sum())}"]
+        lines.extend(self._topic_lines(totals))
+        lines.append(f"{subject} vs the {months} months before ({bucket_start(first - months):%Y-%m} "
+                     f"to {start_date:%Y-%m}):")
+        lines.extend(self._comparison_lines(brand, first, last))
+        return "\n".join(lines)
+
+    def _topic_lines(self, totals):
+        lines = []
+        for t in sorted(range(len(self.cube.topics)), key=lambda t: -totals[t].sum()):
+            if not totals[t].any():
+                continue
+            split = ", ".join(f"{s} {int(totals[t, i])}" for i, s in enumerate(self.cube.sentiments))
+            lines.append(f"- {self.cube.topics[t]}: {int(totals[t].sum())} ({split})")
+        return lines
+
+    def _comparison_lines(self, brand, first, last):
+        """Counts in month buckets [first, last) vs the same number of months before, per sentiment."""
+        recent = self.cube.counts(brand, bucket_start(first), bucket_start(last))
+        previous = self.cube.counts(brand, bucket_start(2 * first - last), bucket_start(first))
+        lines = [f"- All topics: {int(recent.sum())} vs {int(previous.sum())}"]
+        for i, s in enumerate(self.cube.sentiments):
+            lines.append(f"- {s}: {int(recent[:, i].sum())} vs {int(previous[:, i].sum())}")
+        return lines
+
+    # --- GRAPH-LEVEL ACCESSORS (backend independent) ---
+    def number_of_edges(self) -> int:
+        if self.store is not None:
+            return self.store.number_of_edges()
+        return self.graph.number_of_edges()
+
+    def review_edges(self, exclude=()):
+        """
+        (brand ID, review ID, start, topic, sentiment, review text) for every edge out of a
+        Brand node whose target is not in `exclude`, in edge key order. Texts are only read
+        for the edges yielded (used to bring the semantic index up to date).
+        """
+        if self.store is not None:
+            types = self.store.node_type_codes()
+            brand = self.store.types.code("Brand")
+            for offset, cols in self.store.segments():
+                rows = np.flatnonzero(types[cols["src"]] == brand)
+                for key, dst in zip((rows + offset).tolist(), cols["dst"][rows].tolist()):
+                    if self.store.node_id(dst) in exclude:
+                        continue
+                    u, v, data = self.store.edge(key)
+                    yield u, v, data['start'], data['topic'], data['sentiment'], \
+                        self.store.node_properties(dst).get('text', '')
+            return
+        for u, v, data in self._edges.values():
+            if v not in exclude and self.graph.nodes[u].get('type') == 'Brand':
+                yield u, v, data.get('start'), data.get('topic', 'General'), data.get('sentiment', 'Neutral'), \
+                    self._node_properties(v).get('text', '')
+
+    def brands(self) -> list:
+        """All Brand node IDs, in insertion order."""
+        if self.store is not None:
+            return [self.store.node_id(i) for i in self.store.brand_ids()]
+        return [n for n, d in self.graph.nodes(data=True) if d.get('type') == 'Brand']
+
+    def _rebuild_indexes(self):
+        """Recomputes the side indexes from self.graph (e.g. after unpickling)."""
+        self._reset_indexes()
+        self.cube = AggregateCube()
+        self.brand_lookup = BrandLookup.from_names(
+            n for n, d in self.graph.nodes(data=True) if d.get('type') == 'Brand')
+        max_key = -1
+        for u, v, key, data in self.graph.edges(keys=True, data=True):
+            self._index_edge(u, v, key, data)
+            brands = {BrandIndex.fold(n): n for n in (u, v) if self.graph.nodes[n].get('type') == 'Brand'}
+            for brand in brands.values():
+                self.cube.add(brand, data.get('topic', 'General'), data.get('sentiment', 'Neutral'), data.get('start'))
+            if isinstance(key, int):
+                max_key = max(max_key, key)
+        # Keep new edge keys unique after a reload
+        self.edge_count = max(self.edge_count, max_key + 1)
+
     # --- EXISTING PERSISTENCE LOGIC ---
-    def save_to_disk(self, filename="graph_state.pkl"):
-        """Saves the NetworkX graph object to disk."""
-        print(f"[Engine] Saving graph with {self.graph.number_of_edges()} edges to {filename}...")
-        with open(filename, 'wb') as f:
-            pickle.dump(self.graph, f)
+    def save_to_disk(self, filename="graph_state.tga"):
+        """
+        Saves the graph in the memory-mappable .tga format (see src/graph/storage.py).
+        Either backend can be saved; a networkx graph is converted to columns on the way out.
+        The aggregate cube and the brand lookup index are stored alongside as extra
+        sections (see src/graph/cube.py and src/graph/lookup.py).
+        """
+        print(f"[Engine] Saving graph with {self.number_of_edges()} edges to {filename}...")
+        store = self.store if self.store is not None else ColumnarEdgeStore.from_networkx(self.graph)
+        sections, cube_header = self.cube.to_sections()
+        sections.update(self.brand_lookup.to_sections())
+        storage.write_graph(filename, store, meta={**self.meta, "cube": cube_header}, extra_sections=sections)
         print("[Engine] Save complete.")
 
-    def load_from_disk(self, filename="graph_state.pkl"):
-        """Loads the NetworkX graph object from disk."""
+    def load_from_disk(self, filename="graph_state.tga", backend: str = None):
+        """
+        Loads a graph from disk.
+        .tga files are memory-mapped (columnar backend, pages are read on demand);
+        legacy pickled MultiDiGraphs such as thesis_graph.pkl load into the networkx backend.
+        backend="networkx" reads a .tga file into a MultiDiGraph instead (the whole file is decoded).
+        """
         if not os.path.exists(filename):
             print(f"[Engine] Error: File {filename} not found.")
             return False
         
         print(f"[Engine] Loading graph from {filename}...")
-        with open(filename, 'rb') as f:
-            self.graph = pickle.load(f)
-        print(f"[Engine] Graph loaded! Contains {self.graph.number_of_edges()} edges.")
-        return True
\ No newline at end of file
+        self.version += 1
+        if storage.is_graph_file(filename) and backend == "networkx":
+            store, self.meta = storage.open_graph(filename)
+            self.meta.pop("cube", None)
+            self.backend, self.store, self.graph = "networkx", None, store.to_networkx()
+            self._rebuild_indexes()
+        elif storage.is_graph_file(filename):
+            self.store, self.meta = storage.open_graph(filename)
+            self.backend, self.graph = "columnar", None
+            self._reset_indexes()
+            # Files written before the cube existed get it rebuilt from the edge columns
+            self.cube = (AggregateCube.from_sections(self.store.base, self.meta.pop("cube", None))
+                         or AggregateCube.from_store(self.store))
+            self.brand_lookup = (BrandLookup.from_sections(self.store.base)
+                                 or BrandLookup.from_names(self.brands()))
+            self.edge_count = self.store.number_of_edges()
+        else:
+            with open(filename, 'rb') as f:
+                self.graph = pickle.load(f)
+            self.backend, self.store, self.meta = "networkx", None, {}
+            self._rebuild_indexes()
+        self._replay_wal(filename)
+        print(f"[Engine] Graph loaded! Contains {self.number_of_edges()} edges.")
+        return True
+
+    # --- WRITE-AHEAD LOG ---
+    def open_with_wal(self, filename="graph_state.tga", compact_every=100_000):
+        """
+        Opens `filename` for incremental writes: loads the snapshot (if any) into this
+        engine's backend, replays `filename`.wal on top of it, then appends every later
+        add_data / add_batch to that log. Ingest cost is proportional to the new data;
+        compact() folds the log into the snapshot once it holds `compact_every` committed edges.
+        """
+        if os.path.exists(filename):
+            self.load_from_disk(filename, backend=self.backend)
+        else:
+            self._replay_wal(filename)
+        self.snapshot_file = filename
+        self.compact_every = compact_every
+        self.wal = WriteAheadLog(filename + ".wal")
+        self.wal.open(self.meta.get("wal_generation", 0))
+
+    def commit(self, meta=None):
+        """Makes all add_data / add_batch calls since the last commit durable. No-op without a WAL."""
+        if meta:
+            self.meta.update(meta)
+        if self.wal is None:
+            return
+        self.wal.commit(meta)
+        if self.wal.committed >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the snapshot with everything in memory and starts a fresh, empty log."""
+        generation = self.meta.get("wal_generation", 0) + 1
+        self.meta["wal_generation"] = generation
+        wal, self.wal = self.wal, None
+        wal.commit()
+        self.save_to_disk(self.snapshot_file)
+        wal.reset(generation)
+        if self.store is not None:
+            # Re-open the new snapshot so the in-memory tail is released (a networkx graph
+            # already is the snapshot, and stays the backend)
+            self.load_from_disk(self.snapshot_file)
+        self.wal = wal
+
+    def _replay_wal(self, filename):
+        log = WriteAheadLog(filename + ".wal")
+        # A log from an older generation was already folded into this snapshot
+        if log.read_generation() != self.meta.get("wal_generation", 0):
+            return
+        wal, self.wal = self.wal, None  # Replayed records must not be logged again
+        replayed = 0
+        batch = []
+        for op, payload in log.replay():
+            if op == "add":
+                batch.append(payload)
+                continue
+            # Each committed batch goes back in with one add_batch; it builds the graph add_data
+            # would, so logs written by either path replay to the same graph
+            replayed += self.add_batch(batch)
+            batch = []
+            if payload:
+                self.meta.update(payload)
+        self.wal = wal
+        if replayed:
+            print(f"[Engine] Replayed {replayed} logged edges from {log.path}.")
\ No newline at end of file
@@ -0,0 +1,113 @@
+from bisect import bisect_left, bisect_right
+
+
+class TimeIndex:
+    """
+    Sorted start/end arrays over edge keys.
+    Answers "which edges are valid at date t" in O(log E + k) instead of a full edge scan.
+    """
+
+    def __init__(self):
+        self.starts = []    # Sorted start dates
+        self.keys = []      # Edge keys, aligned with self.starts
+        self.ends = []      # Sorted end dates (only edges that have one)
+        self.end_keys = []  # Edge keys, aligned with self.ends
+        self._pending = []
+        self._pending_ends = []
+
+    def __len__(self):
+        return len(self.keys) + len(self._pending)
+
+    def add(self, key, start, end=None):
+        # Edges without a start date never show up in a snapshot, so they are not indexed
+        if start is None:
+            return
+        self._pending.append((start, key))
+        if end is not None:
+            self._pending_ends.append((end, key))
+
+    def add_many(self, items):
+        """add for (key, start, end) triples."""
+        for key, start, end in items:
+            if start is None:
+                continue
+            self._pending.append((start, key))
+            if end is not None:
+                self._pending_ends.append((end, key))
+
+    def _flush(self):
+        # Inserts are buffered and merged on the next query, so bulk ingestion
+        # sorts once instead of paying an O(E) list insert per edge.
+        if self._pending:
+            self.starts, self.keys = self._merge(self.starts, self.keys, self._pending)
+            self._pending = []
+        if self._pending_ends:
+            self.ends, self.end_keys = self._merge(self.ends, self.end_keys, self._pending_ends)
+            self._pending_ends = []
+
+    @staticmethod
+    def _merge(dates, keys, pending):
+        pairs = list(zip(dates, keys))
+        pairs.extend(pending)
+        pairs.sort()  # Timsort: existing run is already sorted, so this is ~O(E + p log p)
+        return [p[0] for p in pairs], [p[1] for p in pairs]
+
+    def window(self, start, end):
+        """Returns keys of edges with start in [start, end), oldest first."""
+        self._flush()
+        return self.keys[bisect_left(self.starts, start):bisect_left(self.starts, end)]
+
+    def query(self, date):
+        """Returns keys of edges with start <= date and (end is None or end >= date)."""
+        self._flush()
+        hits = self.keys[:bisect_right(self.starts, date)]
+
+        # Edges that already closed before `date`
+        closed = self.end_keys[:bisect_left(self.ends, date)]
+        if closed:
+            closed = set(closed)
+            hits = [k for k in hits if k not in closed]
+        return hits
+
+
+class BrandIndex:
+    """
+    Case-folded brand name -> TimeIndex over that brand's edges.
+    Lets a brand query touch only the edges of that brand.
+    """
+
+    def __init__(self):
+        self._by_brand = {}
+
+    @staticmethod
+    def fold(name):
+        return str(name).casefold()
+
+    def __contains__(self, brand):
+        return self.fold(brand) in self._by_brand
+
+    def __len__(self):
+        return len(self._by_brand)
+
+    def add(self, brand, key, start, end=None):
+        folded = self.fold(brand)
+        index = self._by_brand.get(folded)
+        if index is None:
+            index = self._by_brand[folded] = TimeIndex()
+        index.add(key, start, end)
+
+    def add_many(self, brand, items):
+        """add for one brand's (key, start, end) triples."""
+        folded = self.fold(brand)
+        index = self._by_brand.get(folded)
+        if index is None:
+            index = self._by_brand[folded] = TimeIndex()
+        index.add_many(items)
+
+    def query(self, brand, date):
+        index = self._by_brand.get(self.fold(brand))
+        return index.query(date) if index is not None else []
+
+    def window(self, brand, start, end):
+        index = self._by_brand.get(self.fold(brand))
+        return index.window(start, end) if index is not None else []
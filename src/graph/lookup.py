@@ -0,0 +1,192 @@
+import hashlib
+import numpy as np
+from bisect import bisect_left
+from src.graph.columnar import StringTable, fold
+
+# Persisted as extra .tga sections (see TemporalGraphEngine.save_to_disk)
+SECTIONS = ("lookup_keys_offsets", "lookup_keys_blob", "lookup_names_offsets", "lookup_names_blob",
+            "lookup_grams", "lookup_trigrams", "lookup_ptr", "lookup_members")
+
+
+def trigrams(folded):
+    """Character trigrams of a case-folded name, padded like pg_trgm ("  ab " -> "  a", " ab", "ab ")."""
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_hash(gram):
+    """Stable signed 64-bit hash of a trigram, so the on-disk table is one sorted int64 array."""
+    return int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class BrandLookup:
+    """
+    Brand name resolution for interactive use.
+
+      exact(q)     case-folded hash/binary-search hit                      O(1) / O(log B)
+      complete(p)  autocomplete over the sorted folded names               O(log B + k)
+      suggest(q)   fuzzy candidates ranked by trigram Dice similarity      O(postings of q's trigrams)
+
+    A lookup loaded from disk answers from memory-mapped sections (sorted names,
+    trigram posting lists); brands added afterwards go to a small in-memory overlay.
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self.base_size = len(base["lookup_keys"]) if base else 0
+        self._names = {}       # overlay: folded -> display name
+        self._keys = []        # overlay: folded names, in insertion order
+        self._sorted = []      # ... and sorted, refreshed on demand
+        self._unsorted = False
+        self._postings = {}    # overlay: trigram -> [overlay positions]
+        self._grams = []       # overlay: trigram count per position
+        self._known = set()    # folded names already confirmed present in the base
+
+    def __len__(self):
+        return self.base_size + len(self._names)
+
+    # --- BUILDING ---
+    def add(self, name):
+        folded = fold(name)
+        if folded in self._names or folded in self._known:
+            return
+        if self._base_find(folded) is not None:
+            self._known.add(folded)
+            return
+        position = len(self._keys)
+        self._names[folded] = str(name)
+        self._keys.append(folded)
+        self._unsorted = True
+        grams = trigrams(folded)
+        self._grams.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(position)
+
+    @classmethod
+    def from_names(cls, names):
+        lookup = cls()
+        for name in names:
+            lookup.add(name)
+        return lookup
+
+    def _base_find(self, folded):
+        if not self.base_size:
+            return None
+        keys = self.base["lookup_keys"]
+        pos = keys.find(folded)
+        return pos if pos < len(keys) and keys[pos] == folded else None
+
+    def _sorted_keys(self):
+        # Overlay positions index self._grams, so sort a copy instead of the list itself
+        if self._unsorted:
+            self._sorted = sorted(self._keys)
+            self._unsorted = False
+        return self._sorted
+
+    # --- QUERIES ---
+    def exact(self, query):
+        """Display name of the brand whose case-folded name equals the query's, or None."""
+        folded = fold(query.strip())
+        if folded in self._names:
+            return self._names[folded]
+        pos = self._base_find(folded)
+        return self.base["lookup_names"][pos] if pos is not None else None
+
+    def complete(self, prefix, limit=10):
+        """Up to `limit` brand names starting with `prefix` (case-insensitive), alphabetically."""
+        folded = fold(prefix)
+        hits = []
+        if self.base_size:
+            keys = self.base["lookup_keys"]
+            pos = keys.find(folded)
+            while pos < len(keys) and len(hits) < limit:
+                key = keys[pos]
+                if not key.startswith(folded):
+                    break
+                hits.append((key, self.base["lookup_names"][pos]))
+                pos += 1
+        overlay = self._sorted_keys()
+        pos = bisect_left(overlay, folded)
+        for key in overlay[pos:pos + limit]:
+            if not key.startswith(folded):
+                break
+            hits.append((key, self._names[key]))
+        return [name for _, name in sorted(hits)[:limit]]
+
+    def suggest(self, query, limit=5, min_score=0.3):
+        """[(name, score)] of the most similar brands by trigram Dice coefficient, best first."""
+        grams = trigrams(fold(query.strip()))
+        if not grams:
+            return []
+        scored = []
+
+        if self.base_size:
+            table, ptr, members = self.base["lookup_trigrams"], self.base["lookup_ptr"], self.base["lookup_members"]
+            hashes = np.array([trigram_hash(g) for g in grams], dtype=np.int64)
+            positions = np.searchsorted(table, hashes)
+            postings = [members[ptr[pos]:ptr[pos + 1]] for pos, h in zip(positions, hashes)
+                        if pos < len(table) and table[pos] == h]
+            if postings:
+                counts = np.bincount(np.concatenate(postings), minlength=self.base_size)
+                # Dice >= min_score needs at least min_score * (|q| + 1) / 2 shared trigrams
+                candidates = np.flatnonzero(counts >= min_score * (len(grams) + 1) / 2)
+                scores = 2.0 * counts[candidates] / (len(grams) + self.base["lookup_grams"][candidates])
+                keep = scores >= min_score
+                candidates, scores = candidates[keep], scores[keep]
+                if len(candidates) > limit:
+                    top = np.argpartition(-scores, limit)[:limit]
+                    candidates, scores = candidates[top], scores[top]
+                scored.extend((float(s), self.base["lookup_names"][int(c)]) for c, s in zip(candidates, scores))
+
+        shared = {}
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        for position, n in shared.items():
+            score = 2.0 * n / (len(grams) + self._grams[position])
+            if score >= min_score:
+                scored.append((score, self._names[self._keys[position]]))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(name, round(score, 3)) for score, name in scored[:limit]]
+
+    # --- PERSISTENCE ---
+    def _items(self):
+        """(folded, display name) for every brand, base and overlay."""
+        items = dict(self._names)
+        if self.base_size:
+            keys, names = self.base["lookup_keys"], self.base["lookup_names"]
+            for i in range(self.base_size):
+                items[keys[i]] = names[i]
+        return items
+
+    def to_sections(self):
+        items = self._items()
+        keys = sorted(items, key=lambda k: k.encode("utf-8"))
+        postings = {}
+        grams = np.empty(len(keys), dtype=np.int16)
+        for i, key in enumerate(keys):
+            key_grams = trigrams(key)
+            grams[i] = min(len(key_grams), np.iinfo(np.int16).max)
+            for gram in key_grams:
+                postings.setdefault(gram, []).append(i)
+        hashed = sorted((trigram_hash(g), g) for g in postings)
+        ptr = np.zeros(len(hashed) + 1, dtype=np.int64)
+        np.cumsum([len(postings[g]) for _, g in hashed], out=ptr[1:])
+        members = np.array([i for _, g in hashed for i in postings[g]], dtype=np.int32)
+
+        sections = {"lookup_grams": grams, "lookup_trigrams": np.array([h for h, _ in hashed], dtype=np.int64),
+                    "lookup_ptr": ptr, "lookup_members": members}
+        for name, strings in (("lookup_keys", keys), ("lookup_names", [items[k] for k in keys])):
+            sections[name + "_offsets"], sections[name + "_blob"] = StringTable.encode(strings)
+        return sections
+
+    @classmethod
+    def from_sections(cls, sections):
+        """Lookup over memory-mapped sections (None if the file predates the lookup index)."""
+        if any(name not in sections for name in SECTIONS):
+            return None
+        base = {name: sections[name] for name in SECTIONS}
+        for name in ("lookup_keys", "lookup_names"):
+            base[name] = StringTable(base.pop(name + "_offsets"), base.pop(name + "_blob"))
+        return cls(base=base)
@@ -0,0 +1,145 @@
+"""
+Versioned, memory-mappable on-disk format for the temporal graph (".tga").
+
+Layout:
+    8 bytes   magic b"TGAGRAPH"
+    4 bytes   format version (uint32, little endian)
+    4 bytes   header length (uint32)
+    header    UTF-8 JSON: vocabularies, section table, free-form metadata
+    sections  raw little-endian arrays, each aligned to 64 bytes
+
+Sections are the edge columns, the node type/flag columns, string tables
+(offsets + blob) for node IDs, review text and extra node properties, a sorted
+permutation for O(log N) node-ID lookup, and the case-folded brand table with
+each brand's edge keys (so a brand query reads only its own edges).
+Opening a file maps it read-only; nothing is decoded until a query touches it.
+"""
+import json
+import os
+import pickle
+import struct
+import numpy as np
+from src.graph.columnar import ColumnarEdgeStore, StringTable, EDGE_COLUMNS, HAS_TEXT, fold, brand_edge_lists
+
+MAGIC = b"TGAGRAPH"
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREFIX = struct.Struct("<8sII")
+
+STRING_TABLES = ("node_ids", "node_text", "node_extra", "brand_keys")
+
+
+def is_graph_file(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def _node_sections(store):
+    n = store.number_of_nodes()
+    ids, texts, extras = [], [], []
+    node_type = np.empty(n, dtype=np.int8)
+    node_flags = np.zeros(n, dtype=np.uint8)
+    for idx in range(n):
+        ids.append(store.node_id(idx))
+        node_type[idx] = store.node_type_code(idx)
+        props = dict(store.node_properties(idx))
+        text = props.pop("text", None)
+        if text is not None:
+            node_flags[idx] |= HAS_TEXT
+        texts.append("" if text is None else str(text))
+        extras.append(json.dumps(props, default=str) if props else "")
+
+    encoded = [s.encode("utf-8") for s in ids]
+    node_order = np.array(sorted(range(n), key=encoded.__getitem__), dtype=np.int32)
+
+    # Case-folded brand name -> Brand node IDs, sorted so lookups can binary search
+    members = {}
+    for idx in store.brand_ids():
+        members.setdefault(fold(store.node_id(idx)), []).append(idx)
+    brand_keys = sorted(members, key=lambda k: k.encode("utf-8"))
+    brand_ptr = np.zeros(len(brand_keys) + 1, dtype=np.int64)
+    np.cumsum([len(members[k]) for k in brand_keys], out=brand_ptr[1:])
+    brand_members = np.array([i for k in brand_keys for i in members[k]], dtype=np.int32)
+
+    return {
+        "node_type": node_type,
+        "node_flags": node_flags,
+        "node_order": node_order,
+        "brand_ptr": brand_ptr,
+        "brand_members": brand_members,
+    }, {"node_ids": ids, "node_text": texts, "node_extra": extras, "brand_keys": brand_keys}
+
+
+def write_graph(filename, store, meta=None, extra_sections=None):
+    """Writes `store` (plus optional extra named arrays) to `filename` atomically."""
+    arrays = {}
+    for name, dtype in EDGE_COLUMNS.items():
+        parts = [cols[name] for _, cols in store.segments()]
+        arrays[name] = np.concatenate(parts).astype(dtype, copy=False) if parts else np.empty(0, dtype=dtype)
+
+    node_arrays, tables = _node_sections(store)
+    arrays.update(node_arrays)
+    arrays["brand_edge_ptr"], arrays["brand_edges"] = brand_edge_lists(
+        arrays["src"], arrays["dst"], node_arrays["brand_ptr"], node_arrays["brand_members"],
+        store.number_of_nodes())
+    for name, strings in tables.items():
+        arrays[name + "_offsets"], arrays[name + "_blob"] = StringTable.encode(strings)
+    arrays.update(extra_sections or {})
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+
+    # Lay out sections after the header (the header embeds the offsets, so iterate until it fits)
+    sections, header = {}, b""
+    while True:
+        data_start = -(-(_PREFIX.size + len(header)) // ALIGN) * ALIGN
+        offset = data_start
+        for name, arr in arrays.items():
+            sections[name] = [offset, arr.dtype.str, int(arr.size)]
+            offset = -(-(offset + arr.nbytes) // ALIGN) * ALIGN
+        header = json.dumps({
+            "version": FORMAT_VERSION,
+            "vocab": store.vocab(),
+            "sections": sections,
+            "meta": meta or {},
+        }).encode("utf-8")
+        if _PREFIX.size + len(header) <= data_start:
+            break
+
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(sections[name][0])
+            f.write(arr.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, filename)
+
+
+def open_graph(filename):
+    """Memory-maps a .tga file. Returns (ColumnarEdgeStore, metadata dict)."""
+    buf = np.memmap(filename, dtype=np.uint8, mode="r")
+    magic, version, header_len = _PREFIX.unpack(bytes(buf[:_PREFIX.size]))
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a TGA graph file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"{filename} uses format v{version}; this build reads up to v{FORMAT_VERSION}")
+    header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + header_len]))
+
+    base = {}
+    for name, (offset, dtype, size) in header["sections"].items():
+        dtype = np.dtype(dtype)
+        base[name] = buf[offset:offset + size * dtype.itemsize].view(dtype)
+    for name in STRING_TABLES:
+        base[name] = StringTable(base.pop(name + "_offsets"), base.pop(name + "_blob"))
+
+    return ColumnarEdgeStore(base=base, vocab=header["vocab"]), header["meta"]
+
+
+def convert_pickle(src, dst):
+    """One-shot conversion of a legacy pickled MultiDiGraph into the .tga format."""
+    with open(src, "rb") as f:
+        graph = pickle.load(f)
+    store = ColumnarEdgeStore.from_networkx(graph)
+    write_graph(dst, store)
+    return store.number_of_edges()
@@ -0,0 +1,376 @@
+"""
+Semantic search over review texts: one sentence embedding per Brand -> Review edge.
+
+An index is a directory (e.g. thesis_graph.vec/) of .npy files that is memory-mapped on open:
+    index.json          model ID, storage dtype, brand keys, topic/sentiment vocabularies, IVF state
+    vectors.npy         (rows, dim) float16, or int8 with per-row float32 scales in scales.npy
+    start.npy           int64 review timestamps (epoch us, NO_START when undated)
+    brand_ptr.npy       rows are sorted by (brand, start): brand i owns rows brand_ptr[i]:brand_ptr[i + 1]
+    topic.npy, sentiment.npy          int8 codes, so facts are formatted without an edge lookup
+    ids_offsets.npy, ids_blob.npy     review node ID of each row (a StringTable)
+    ivf_lists.npy, ivf_centroids.npy  optional coarse clustering (IVF)
+
+Rows are keyed by review node ID rather than edge key, so the index stays valid when a
+networkx graph is saved and reopened as columns. A query is filtered before anything is
+scored: the brand is one slice, the time window a binary search inside it. The rows left
+are scored in blocks, one matrix product per block for all queries at once, with a running
+top-k. With IVF, large candidate sets are first cut to the clusters nearest each query.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from src.graph.columnar import StringTable, NO_START, to_epoch_us, from_epoch_us, fold
+from src.utils.metrics import METRICS, COUNT_BUCKETS
+
+DTYPES = ("float16", "int8")
+
+# Rows scored per matrix product: the float32 copy of a block (4096 x 384 dims = 6 MB) stays
+# in cache, which matters more than BLAS call overhead since widening float16 dominates a scan
+BLOCK_ROWS = 4096
+# Rows copied per step while rewriting an index
+WRITE_ROWS = 65536
+# Texts embedded per encoder call while indexing
+ENCODE_CHUNK = 4096
+# Candidate sets smaller than this are scored exactly, even when the index has IVF lists
+IVF_MIN_CANDIDATES = 50000
+# k-means: training sample per list, Lloyd iterations, and retraining once the index doubles
+IVF_SAMPLES_PER_LIST = 64
+IVF_ITERATIONS = 10
+
+
+class ReviewEncoder:
+    """sentence-transformers model, loaded on first use; encode() returns L2-normalised float32 rows."""
+
+    def __init__(self, model_id):
+        self.model_id = model_id
+        self._model = None
+        self._lock = threading.Lock()  # The audit service searches from several threads
+
+    def encode(self, texts, batch_size=256):
+        with self._lock:
+            if self._model is None:
+                print(f"[Vectors] Loading embedding model {self.model_id}...")
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_id, device="cpu")
+        vectors = self._model.encode(list(texts), batch_size=batch_size, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def quantize(vectors, dtype):
+    """float32 rows -> (stored rows, per-row scales or None). int8 is symmetric per row."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def kmeans(sample, n_lists, iterations=IVF_ITERATIONS, seed=0):
+    """Spherical k-means (cosine) on float32 rows; returns L2-normalised centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        # An empty list restarts from a random sample row
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+class ReviewVectorIndex:
+    """
+    Memory-mapped review embeddings with brand/time filters and optional IVF.
+
+    ReviewVectorIndex.open(path) maps an existing index; update(graph, path) embeds the
+    reviews the index does not have yet and rewrites it. search() returns row numbers,
+    which fact(row) turns into (review ID, topic, sentiment, start).
+    """
+
+    def __init__(self, model_id, dtype="float16", encoder=None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype: {dtype}")
+        self.model_id = model_id
+        self.dtype = dtype
+        self.encoder = encoder or ReviewEncoder(model_id)
+        self.brands, self.topics, self.sentiments = [], [], []
+        self.vectors = None
+        self.scales = None
+        self.start = np.empty(0, dtype=np.int64)
+        self.brand_ptr = np.zeros(1, dtype=np.int64)
+        self.topic = np.empty(0, dtype=np.int8)
+        self.sentiment = np.empty(0, dtype=np.int8)
+        self.ids = StringTable(*StringTable.encode([]))
+        self.ivf_lists = None
+        self.centroids = None
+        self.ivf_trained_rows = 0
+        self._brand_codes = {}
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def dim(self):
+        return None if self.vectors is None else self.vectors.shape[1]
+
+    # --- PERSISTENCE ---
+    @classmethod
+    def open(cls, path, encoder=None):
+        """Maps the index at `path`; queries are encoded with the model it was built with."""
+        with open(os.path.join(path, "index.json")) as f:
+            header = json.load(f)
+        index = cls(header["model_id"], header["dtype"], encoder)
+        index.brands, index.topics, index.sentiments = header["brands"], header["topics"], header["sentiments"]
+        index.ivf_trained_rows = header.get("ivf_trained_rows", 0)
+        index._brand_codes = {b: i for i, b in enumerate(index.brands)}
+
+        def load(name):
+            filename = os.path.join(path, name + ".npy")
+            return np.load(filename, mmap_mode="r") if os.path.exists(filename) else None
+
+        index.vectors, index.scales = load("vectors"), load("scales")
+        index.start, index.brand_ptr = load("start"), load("brand_ptr")
+        index.topic, index.sentiment = load("topic"), load("sentiment")
+        index.ids = StringTable(load("ids_offsets"), load("ids_blob"))
+        index.ivf_lists, index.centroids = load("ivf_lists"), load("ivf_centroids")
+        return index
+
+    def update(self, graph, path, ivf_lists=0):
+        """
+        Embeds every review of `graph` (edges out of a Brand node) whose ID is not indexed
+        yet, then rewrites the index at `path` and maps it again. A review linked to several
+        brands is indexed under the first. ivf_lists > 0 keeps an IVF with that many lists
+        (retrained whenever the index has doubled since the last training). Returns rows added.
+        """
+        known = {self.ids[i] for i in range(len(self.ids))}
+        new = []
+        for brand, review_id, start, topic, sentiment, text in graph.review_edges(exclude=known):
+            if review_id in known:
+                continue
+            known.add(review_id)
+            new.append((fold(brand), review_id, start, topic, sentiment, text))
+
+        n_lists = min(ivf_lists, len(self) + len(new))
+        rebuild_ivf = bool(n_lists) and (self.centroids is None or len(self.centroids) != n_lists
+                                         or len(self) + len(new) >= 2 * self.ivf_trained_rows)
+        if not new and not rebuild_ivf and bool(n_lists) == (self.centroids is not None):
+            return 0
+
+        if new:
+            print(f"[Vectors] Embedding {len(new)} new reviews ({len(self)} already indexed)...")
+        started = time.perf_counter()
+        parts, scale_parts = [], []
+        for i in range(0, len(new), ENCODE_CHUNK):
+            stored, scales = quantize(self.encoder.encode([row[5] for row in new[i:i + ENCODE_CHUNK]]), self.dtype)
+            parts.append(stored)
+            scale_parts.append(scales)
+        if parts:
+            fresh = np.concatenate(parts)
+            fresh_scales = np.concatenate(scale_parts) if self.dtype == "int8" else None
+        else:
+            fresh, fresh_scales = np.empty((0, self.dim or 0), dtype=self.dtype), None
+        if METRICS.enabled and new:
+            METRICS.observe("vector_embed_seconds", time.perf_counter() - started)
+            METRICS.inc("vector_embedded_total", len(new))
+
+        self._write(path, new, fresh, fresh_scales, n_lists, rebuild_ivf)
+        fresh_index = ReviewVectorIndex.open(path, self.encoder)
+        self.__dict__.update(fresh_index.__dict__)
+        print(f"[Vectors] Index saved to {path} ({len(self)} reviews).")
+        return len(new)
+
+    def _write(self, path, new, fresh, fresh_scales, ivf_lists, rebuild_ivf):
+        """Merges the existing rows with `new`, sorts by (brand, start) and writes a fresh directory."""
+        old_n, n = len(self), len(self) + len(new)
+        dim = fresh.shape[1] if len(fresh) else self.dim
+
+        brands = sorted(set(self.brands) | {row[0] for row in new})
+        codes = {b: i for i, b in enumerate(brands)}
+        topics, sentiments = list(self.topics), list(self.sentiments)
+        for row in new:
+            for vocab, value in ((topics, row[3]), (sentiments, row[4])):
+                if value not in vocab:
+                    vocab.append(value)
+
+        # Per-row columns, existing rows first (old brand codes remapped to the merged table)
+        old_brand = np.repeat(np.array([codes[b] for b in self.brands], dtype=np.int64),
+                              np.diff(np.asarray(self.brand_ptr)))
+        brand = np.concatenate([old_brand, np.array([codes[r[0]] for r in new], dtype=np.int64)])
+        start = np.concatenate([np.asarray(self.start),
+                                np.array([NO_START if r[2] is None else to_epoch_us(r[2]) for r in new], dtype=np.int64)])
+        topic = np.concatenate([np.asarray(self.topic), np.array([topics.index(r[3]) for r in new], dtype=np.int8)])
+        sentiment = np.concatenate([np.asarray(self.sentiment),
+                                    np.array([sentiments.index(r[4]) for r in new], dtype=np.int8)])
+        ids = [self.ids[i] for i in range(old_n)] + [r[1] for r in new]
+        order = np.lexsort((start, brand))
+
+        tmp = path + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        def save(name, array):
+            np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(array))
+
+        # Vectors go straight into the new file in row blocks, so the old matrix is never loaded whole
+        vectors = np.lib.format.open_memmap(os.path.join(tmp, "vectors.npy"), mode="w+",
+                                            dtype=self.dtype, shape=(n, dim or 0))
+        scales = np.empty(n, dtype=np.float32) if self.dtype == "int8" else None
+        for i in range(0, n, WRITE_ROWS):
+            rows = order[i:i + WRITE_ROWS]
+            is_old = rows < old_n
+            if is_old.any():
+                vectors[i:i + len(rows)][is_old] = self.vectors[rows[is_old]]
+            if not is_old.all():
+                vectors[i:i + len(rows)][~is_old] = fresh[rows[~is_old] - old_n]
+            if scales is not None:
+                if is_old.any():
+                    scales[i:i + len(rows)][is_old] = self.scales[rows[is_old]]
+                if not is_old.all():
+                    scales[i:i + len(rows)][~is_old] = fresh_scales[rows[~is_old] - old_n]
+        vectors.flush()
+        if scales is not None:
+            save("scales", scales)
+
+        brand = brand[order]
+        save("start", start[order])
+        save("brand_ptr", np.searchsorted(brand, np.arange(len(brands) + 1)).astype(np.int64))
+        save("topic", topic[order])
+        save("sentiment", sentiment[order])
+        offsets, blob = StringTable.encode([ids[i] for i in order])
+        save("ids_offsets", offsets)
+        save("ids_blob", blob)
+
+        trained_rows = self.ivf_trained_rows
+        if ivf_lists and n:
+            matrix = ReviewVectorIndex._matrix_reader(vectors, scales)
+            if rebuild_ivf:
+                rng = np.random.default_rng(0)
+                sample_rows = np.sort(rng.choice(n, size=min(n, ivf_lists * IVF_SAMPLES_PER_LIST), replace=False))
+                centroids = kmeans(matrix(sample_rows), ivf_lists)
+                trained_rows = n
+            else:
+                centroids = np.asarray(self.centroids)
+            # Existing assignments stay valid until the next retraining; only new rows are assigned
+            lists = np.empty(n, dtype=np.int32)
+            for i in range(0, n, WRITE_ROWS):
+                rows = order[i:i + WRITE_ROWS]
+                block = np.arange(i, i + len(rows))
+                if rebuild_ivf or self.ivf_lists is None:
+                    lists[block] = np.argmax(matrix(block) @ centroids.T, axis=1)
+                    continue
+                is_old = rows < old_n
+                lists[block[is_old]] = self.ivf_lists[rows[is_old]]
+                if not is_old.all():
+                    lists[block[~is_old]] = np.argmax(matrix(block[~is_old]) @ centroids.T, axis=1)
+            save("ivf_lists", lists)
+            save("ivf_centroids", centroids)
+        del vectors
+
+        with open(os.path.join(tmp, "index.json"), "w") as f:
+            json.dump({"model_id": self.model_id, "dtype": self.dtype, "dim": dim, "rows": n,
+                       "brands": brands, "topics": topics, "sentiments": sentiments,
+                       "ivf_trained_rows": trained_rows if ivf_lists else 0}, f)
+
+        # Swap directories (the old one may still be mapped; unlinked files stay readable)
+        if os.path.exists(path):
+            old = path + ".old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, path)
+
+    @staticmethod
+    def _matrix_reader(vectors, scales):
+        """rows -> float32 (len(rows), dim); a contiguous run of rows is read as one slice."""
+        def read(rows):
+            if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                block = vectors[rows[0]:rows[-1] + 1].astype(np.float32)
+                return block * scales[rows[0]:rows[-1] + 1, None] if scales is not None else block
+            block = vectors[rows].astype(np.float32)
+            return block * scales[rows, None] if scales is not None else block
+        return read
+
+    # --- SEARCH ---
+    def candidates(self, brand=None, start=None, end=None):
+        """Rows of `brand` (case-insensitive; None = all brands) whose review starts in [start, end)."""
+        lo_ts = None if start is None else to_epoch_us(start)
+        hi_ts = None if end is None else to_epoch_us(end)
+        if brand is None:
+            mask = np.ones(len(self), dtype=bool)
+            if lo_ts is not None:
+                mask &= self.start >= lo_ts
+            if hi_ts is not None:
+                mask &= self.start < hi_ts
+            return np.flatnonzero(mask)
+        code = self._brand_codes.get(fold(brand))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        lo, hi = int(self.brand_ptr[code]), int(self.brand_ptr[code + 1])
+        starts = self.start[lo:hi]  # Sorted within the brand
+        first = 0 if lo_ts is None else int(np.searchsorted(starts, lo_ts, side="left"))
+        last = hi - lo if hi_ts is None else int(np.searchsorted(starts, hi_ts, side="left"))
+        return np.arange(lo + first, lo + max(first, last), dtype=np.int64)
+
+    def search(self, queries, brand=None, start=None, end=None, k=10, nprobe=16):
+        """
+        The `k` rows most similar to each query, among the reviews of `brand` that start in
+        [start, end). `queries` is a string, a list of strings, or already-encoded float32 rows.
+        Returns [(row, cosine similarity)] best first per query (one list for a single string).
+        With IVF lists and a large candidate set, only rows in the `nprobe` lists nearest
+        each query are scored.
+        """
+        started = time.perf_counter() if METRICS.enabled else None
+        single = isinstance(queries, str)
+        if single or (len(queries) and isinstance(queries[0], str)):
+            queries = self.encoder.encode([queries] if single else queries)
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_queries = len(queries)
+
+        rows = self.candidates(brand, start, end)
+        if self.ivf_lists is not None and len(rows) > IVF_MIN_CANDIDATES:
+            nearest = np.argsort(-(queries @ np.asarray(self.centroids).T), axis=1)[:, :nprobe]
+            rows = rows[np.isin(self.ivf_lists[rows], np.unique(nearest))]
+
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        buffer = np.empty((min(BLOCK_ROWS, len(rows)), self.dim or 0), dtype=np.float32)
+        for i in range(0, len(rows), BLOCK_ROWS):
+            block = rows[i:i + BLOCK_ROWS]
+            matrix = buffer[:len(block)]
+            # Widen into the reused buffer; a contiguous run (the usual brand slice) is one read
+            if block[-1] - block[0] + 1 == len(block):
+                matrix[...] = self.vectors[block[0]:block[-1] + 1]
+            else:
+                matrix[...] = self.vectors[block]
+            block_scores = queries @ matrix.T
+            if self.scales is not None:
+                block_scores *= self.scales[block]
+            scores = np.concatenate([best_scores, block_scores], axis=1)
+            ids = np.concatenate([best_rows, np.broadcast_to(block, (n_queries, len(block)))], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores, ids = np.take_along_axis(scores, top, axis=1), np.take_along_axis(ids, top, axis=1)
+            best_scores, best_rows = scores, ids
+
+        # Best first; equal scores by row, so results do not depend on partition order
+        results = []
+        for q in range(n_queries):
+            order = np.lexsort((best_rows[q], -best_scores[q]))
+            results.append([(int(best_rows[q][j]), float(best_scores[q][j])) for j in order])
+        if started is not None:
+            METRICS.observe("vector_search_seconds", time.perf_counter() - started)
+            METRICS.observe("vector_search_candidates", len(rows), buckets=COUNT_BUCKETS)
+        return results[0] if single else results
+
+    def fact(self, row):
+        """(review ID, topic, sentiment, start datetime or None) of one row."""
+        start = int(self.start[row])
+        return (self.ids[row], self.topics[self.topic[row]], self.sentiments[self.sentiment[row]],
+                None if start == NO_START else from_epoch_us(start))
@@ -0,0 +1,163 @@
+import json
+import os
+from datetime import datetime
+from src.graph.schema import Node, TemporalEdge, MarketingTopic, Sentiment
+
+
+def _enum_or_str(enum_cls, value):
+    try:
+        return enum_cls(value)
+    except ValueError:
+        return value
+
+
+class WriteAheadLog:
+    """
+    Append-only log of add_data / add_batch operations (one JSON object per line).
+
+    Records only count once a "commit" line follows them, so a crash mid-batch
+    (or a torn final line) replays cleanly up to the last commit. Each log
+    carries a generation number; compaction folds the log into a new snapshot,
+    stamps the snapshot with generation g + 1 and restarts the log at g + 1,
+    so a log that was already folded in is never replayed twice.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self.pending = 0    # Records appended since the last commit
+        self.committed = 0  # Committed records in the current log
+        self._file = None
+
+    # --- WRITING ---
+    def open(self, generation):
+        """Opens the log for appending, starting a fresh one if it belongs to another generation."""
+        if self.read_generation() != generation:
+            self.reset(generation)
+            return
+        # Drop any uncommitted / torn tail so new records follow the last commit
+        end, committed = self._scan()
+        with open(self.path, "r+b") as f:
+            f.truncate(end)
+        self.generation = generation
+        self.pending, self.committed = 0, committed
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def reset(self, generation):
+        self.close()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "header", "generation": generation}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.generation = generation
+        self.pending = self.committed = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def append(self, node_a: Node, node_b: Node, edge: TemporalEdge):
+        self._file.write(self._encode(node_a, node_b, edge))
+        self.pending += 1
+
+    def append_many(self, records):
+        """append for (node_a, node_b, edge) records, as one write."""
+        self._file.write("".join(self._encode(*record) for record in records))
+        self.pending += len(records)
+
+    @staticmethod
+    def _encode(node_a, node_b, edge):
+        record = {
+            "op": "add",
+            "a": [str(node_a.id), node_a.type, node_a.properties or None],
+            "b": [str(node_b.id), node_b.type, node_b.properties or None],
+            "e": [
+                str(edge.relation),
+                edge.topic.value if hasattr(edge.topic, 'value') else str(edge.topic),
+                edge.sentiment.value if hasattr(edge.sentiment, 'value') else str(edge.sentiment),
+                edge.start_date.isoformat() if edge.start_date else None,
+                edge.end_date.isoformat() if edge.end_date else None,
+            ],
+        }
+        return json.dumps(record, default=str) + "\n"
+
+    def commit(self, meta=None):
+        """Marks everything appended so far as durable (flush + fsync)."""
+        if not self.pending and meta is None:
+            return
+        self._file.write(json.dumps({"op": "commit", "n": self.pending, "meta": meta}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.committed += self.pending
+        self.pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    # --- READING ---
+    def read_generation(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return None
+        return header.get("generation") if header.get("op") == "header" else None
+
+    def _scan(self):
+        """Returns (byte offset just past the last commit, committed record count)."""
+        end = committed = batch = 0
+        with open(self.path, "rb") as f:
+            offset = len(f.readline())
+            end = offset
+            for line in f:
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    op = json.loads(line)["op"]
+                except ValueError:
+                    break
+                if op == "add":
+                    batch += 1
+                elif op == "commit":
+                    end, committed, batch = offset, committed + batch, 0
+        return end, committed
+
+    def replay(self):
+        """
+        Yields ("add", (Node, Node, TemporalEdge)) and ("commit", meta) for every
+        committed batch, in order. Uncommitted or torn trailing records are dropped.
+        """
+        batch = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.readline()  # Header
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Torn write at the tail
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if record["op"] == "add":
+                    batch.append(self._decode(record))
+                elif record["op"] == "commit":
+                    for item in batch:
+                        yield "add", item
+                    batch = []
+                    yield "commit", record.get("meta")
+
+    @staticmethod
+    def _decode(record):
+        (a_id, a_type, a_props), (b_id, b_type, b_props) = record["a"], record["b"]
+        relation, topic, sentiment, start, end = record["e"]
+        edge = TemporalEdge(
+            a_id, b_id, relation,
+            _enum_or_str(MarketingTopic, topic),
+            _enum_or_str(Sentiment, sentiment),
+            datetime.fromisoformat(start) if start else None,
+            datetime.fromisoformat(end) if end else None,
+        )
+        return Node(a_id, a_type, a_props or {}), Node(b_id, b_type, b_props or {}), edge
@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DynamicBatcher:
+    """
+    Groups generation requests from concurrent callers into shared batches.
+
+    Requests are queued; the batching loop takes the first pending request, keeps
+    collecting until `max_batch_size` prompts or `max_wait_ms` after that first one,
+    then runs the whole batch through SCCLlama.generate_batch on a single GPU thread.
+    Prompts with different prefixes (or max_new_tokens, stop patterns) in one batch are
+    split into one generate_batch call per group, so the prefix KV cache still applies.
+    """
+
+    def __init__(self, llm, max_batch_size=8, max_wait_ms=50):
+        self.llm = llm
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.loop = None
+        self.batches = self.prompts = 0
+        self._gpu = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+
+    async def run(self):
+        """The batching loop; start it as a task on the serving event loop."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = self.loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._run_batch(batch)
+
+    async def _run_batch(self, batch):
+        self.batches += 1
+        self.prompts += len(batch)
+        groups = {}
+        for prompt, prefix, max_new_tokens, stop, future in batch:
+            groups.setdefault((prefix, max_new_tokens, stop), []).append((prompt, future))
+        for (prefix, max_new_tokens, stop), items in groups.items():
+            prompts = [prompt for prompt, _ in items]
+            try:
+                responses = await self.loop.run_in_executor(
+                    self._gpu, lambda: self.llm.generate_batch(prompts, batch_size=len(prompts), prefix=prefix,
+                                                               max_new_tokens=max_new_tokens,
+                                                               stop=list(stop) if stop else None))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), response in zip(items, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def generate_many(self, prompts, prefix=None, max_new_tokens=None, stop=None):
+        stop = tuple(stop) if stop else None  # Part of the batch grouping key
+        futures = []
+        for prompt in prompts:
+            future = self.loop.create_future()
+            await self.queue.put((prompt, prefix, max_new_tokens, stop, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    def client(self):
+        """An SCCLlama stand-in for agents running in worker threads (blocks until the batch completes)."""
+        return BatchedLLM(self)
+
+    def stats(self):
+        return {"batches": self.batches, "prompts": self.prompts, "queued": self.queue.qsize() if self.queue else 0,
+                "mean_batch_size": self.prompts / self.batches if self.batches else 0.0}
+
+
+class BatchedLLM:
+    """generate_raw / generate_batch that submit to a DynamicBatcher from another thread."""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    def generate_batch(self, prompts, batch_size=None, prefix=None, max_new_tokens=None, stop=None):
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        request = self.batcher.generate_many(prompts, prefix, max_new_tokens, stop)
+        return asyncio.run_coroutine_threadsafe(request, self.batcher.loop).result()
+
+    def generate_raw(self, full_prompt, prefix=None, max_new_tokens=None, stop=None):
+        return self.generate_batch([full_prompt], prefix=prefix, max_new_tokens=max_new_tokens, stop=stop)[0]
+
+    def count_tokens(self, text):
+        return self.batcher.llm.count_tokens(text)
@@ -0,0 +1,57 @@
+import threading
+
+
+def _load_llama(**kwargs):
+    # torch/transformers are only imported here, so importing this module stays cheap
+    from src.llm.wrapper import SCCLlama
+    return SCCLlama(**kwargs)
+
+
+class LazyLLM:
+    """
+    Stands in for SCCLlama until the model is needed.
+
+    warm_up() starts importing torch/transformers and loading the model in a background
+    thread (e.g. while the user types a brand); the first attribute access (generate_batch,
+    stream, ...) waits for that load, or does it on the spot if warm_up was never called.
+    """
+
+    def __init__(self, factory=_load_llama, **kwargs):
+        self._factory = factory
+        self._kwargs = kwargs
+        self._llm = None
+        self._error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        with self._lock:
+            if self._thread is None and self._llm is None:
+                self._thread = threading.Thread(target=self._load, name="llm-warm-up", daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            self._llm = self._factory(**self._kwargs)
+        except BaseException as e:
+            self._error = e
+
+    @property
+    def ready(self):
+        return self._llm is not None
+
+    def get(self):
+        """The loaded model (blocks until it is)."""
+        if self._llm is None:
+            self.warm_up()
+            self._thread.join()
+            if self._error is not None:
+                raise RuntimeError(f"LLM failed to load: {self._error}") from self._error
+        return self._llm
+
+    def __getattr__(self, name):
+        # Only called for attributes LazyLLM itself lacks, i.e. the SCCLlama API
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
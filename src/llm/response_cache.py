@@ -0,0 +1,42 @@
+import json
+from src.utils.cache import DiskCache
+
+
+class ResponseCache:
+    """
+    Persistent prompt -> completion cache for deterministic (greedy) generation.
+
+    Keys hash the model ID, the generation parameters and the prompt, so changing
+    any of them misses instead of returning a stale answer. Storage is a size-bounded
+    DiskCache (LRU eviction). Model-agnostic: generate() wraps any function that maps
+    a list of prompts to a list of completions, which is what makes it easy to stub.
+    """
+
+    def __init__(self, path, model_id, generation_kwargs, max_bytes=512 << 20):
+        self.store = DiskCache(path, max_bytes=max_bytes)
+        self.signature = json.dumps({"model": model_id, **generation_kwargs}, sort_keys=True)
+
+    def key(self, prompt, max_new_tokens=None, stop=None):
+        return DiskCache.make_key("llm", self.signature, max_new_tokens, json.dumps(list(stop or ())), prompt)
+
+    def get(self, prompt, max_new_tokens=None, stop=None):
+        return self.store.get(self.key(prompt, max_new_tokens, stop), namespace="llm")
+
+    def put(self, prompt, response, max_new_tokens=None, stop=None):
+        self.store.put(self.key(prompt, max_new_tokens, stop), response)
+
+    def generate(self, prompts, generate_fn, max_new_tokens=None, stop=None):
+        """Answers cached prompts from disk and sends only the rest (in order) to generate_fn."""
+        keys = [self.key(p, max_new_tokens, stop) for p in prompts]
+        found = self.store.get_many(keys, namespace="llm")
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            # generate_fn raises on failure, so errors are never cached
+            responses = generate_fn([prompts[i] for i in missing])
+            fresh = {keys[i]: response for i, response in zip(missing, responses)}
+            self.store.put_many(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def stats(self):
+        return self.store.stats().get("llm", {"hits": 0, "misses": 0})
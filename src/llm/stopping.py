@@ -0,0 +1,31 @@
+import re
+import torch
+from transformers import StoppingCriteria
+
+
+def compile_stops(stop):
+    """Stop patterns (regex strings) -> compiled regexes."""
+    return [re.compile(pattern) for pattern in stop or ()]
+
+
+def truncate(text, patterns):
+    """Cuts `text` right after the earliest stop-pattern match (the match itself is kept)."""
+    ends = [m.end() for m in (p.search(text) for p in patterns) if m]
+    return text[:min(ends)] if ends else text
+
+
+class StopOnPatterns(StoppingCriteria):
+    """
+    Ends generation for each sequence once its completion matches one of `patterns`,
+    e.g. a finished "Reasoning:" line. Checked on the decoded text after every token.
+    """
+
+    def __init__(self, tokenizer, prompt_length, patterns):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.patterns = patterns
+
+    def __call__(self, input_ids, scores, **kwargs):
+        texts = self.tokenizer.batch_decode(input_ids[:, self.prompt_length:], skip_special_tokens=True)
+        done = [any(p.search(text) for p in self.patterns) for text in texts]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
@@ -1,10 +1,57 @@
+import copy
+import gc
+import queue
+import threading
+import time
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteriaList, TextIteratorStreamer, pipeline
+from transformers.generation.streamers import BaseStreamer
 from config import settings
+from src.utils.cache import LRUCache
+from src.utils.metrics import METRICS, COUNT_BUCKETS
+from src.llm.response_cache import ResponseCache
+from src.llm.stopping import StopOnPatterns, compile_stops, truncate
+
+class _GenerationClock(BaseStreamer):
+    """
+    Streamer that only takes timestamps, for METRICS. generate() hands it the prompt IDs,
+    then each step's new tokens: prompt in -> first token is the prefill, the rest decoding.
+    """
+
+    def __init__(self, pad_token_id, path):
+        self.pad_token_id, self.path = pad_token_id, path
+        self.started = None
+
+    def put(self, value):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started, self.first_token, self.generated = now, None, 0
+            for n in (value != self.pad_token_id).reshape(-1, value.shape[-1]).sum(dim=-1).tolist():
+                METRICS.observe("llm_prompt_tokens", n, buckets=COUNT_BUCKETS)
+            return
+        if self.first_token is None:
+            self.first_token = now
+        self.generated += int((value != self.pad_token_id).sum())  # Finished rows get padding
+
+    def end(self):
+        now = time.perf_counter()
+        if self.started is None:
+            return
+        if self.first_token is not None:
+            METRICS.observe("llm_prefill_seconds", self.first_token - self.started, path=self.path)
+            METRICS.observe("llm_decode_seconds", now - self.first_token, path=self.path)
+        METRICS.observe("llm_generation_seconds", now - self.started, path=self.path)
+        METRICS.inc("llm_generated_tokens_total", self.generated)
+        self.started = None  # The pipeline calls generate once per batch
+
 
 class SCCLlama:
-    def __init__(self):
+    def __init__(self, batch_size: int = None, deterministic: bool = None):
         print(f"Loading {settings.MODEL_ID} to SCC GPU...")
+        # Prompts per forward pass in generate_batch
+        self.batch_size = batch_size or settings.GENERATION_BATCH_SIZE
+        # Greedy decoding: same prompt -> same answer, so answers can be cached on disk
+        self.deterministic = settings.LLM_DETERMINISTIC if deterministic is None else deterministic
         
         # 1. Load Tokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(
@@ -13,6 +60,8 @@ class SCCLlama:
         )
         # Fix for Llama 3 padding issues
         self.tokenizer.pad_token_id = self.tokenizer.eos_token_id
+        # Decoder-only models must be padded on the left so every prompt ends where generation starts
+        self.tokenizer.padding_side = "left"
         
         # 2. Load Model (4-bit for efficiency)
         self.model = AutoModelForCausalLM.from_pretrained(
@@ -24,29 +73,198 @@ class SCCLlama:
         )
         
         # 3. Create Pipeline
+        if self.deterministic:
+            # temperature/top_p set to None so the model's sampling defaults don't apply (or warn)
+            self.generation_kwargs = {"max_new_tokens": 512, "do_sample": False, "temperature": None, "top_p": None}
+        else:
+            self.generation_kwargs = {"max_new_tokens": 512, "temperature": 0.1, "do_sample": True}
         self.pipe = pipeline(
             "text-generation",
             model=self.model,
             tokenizer=self.tokenizer,
-            max_new_tokens=512,
-            temperature=0.1,
-            do_sample=True,
+            **self.generation_kwargs,
             # CRITICAL: This prevents the model from repeating your long prompt in the output
             return_full_text=False 
         )
 
-    def generate_raw(self, full_prompt: str) -> str:
+        # 4. Prefix KV cache: static prompt prefix -> (token IDs, past_key_values)
+        self.prefix_cache = LRUCache(max_entries=settings.PREFIX_CACHE_SIZE)
+
+        # Separate tokenizer for count_tokens, so agent threads never share one with generation
+        self._count_tokenizer = None
+        self._count_lock = threading.Lock()
+
+        # 5. Response cache (deterministic mode only; sampled answers are not reproducible)
+        self.response_cache = None
+        if self.deterministic and settings.LLM_RESPONSE_CACHE_PATH:
+            self.response_cache = ResponseCache(settings.LLM_RESPONSE_CACHE_PATH, settings.MODEL_ID,
+                                                self.generation_kwargs,
+                                                max_bytes=settings.LLM_RESPONSE_CACHE_MAX_MB << 20)
+
+    def generate_raw(self, full_prompt: str, prefix: str = None, max_new_tokens: int = None,
+                     stop: list = None) -> str:
         """
         Takes a fully formatted prompt (with special tokens) and returns ONLY the new text.
         Used by Agents (Historian/Critic) who need precise control over the prompt structure.
+
+        `prefix`: a static opening the prompt starts with (e.g. the agent's system block).
+        Its KV state is computed once and reused, so only the rest of the prompt is prefilled.
+        `stop`: regex patterns; generation ends as soon as the answer matches one (the answer
+        is cut right after the match), instead of running to max_new_tokens.
+        In deterministic mode, answers to prompts seen before come from the response cache.
         """
-        # The pipeline automatically handles the generation
-        # return_full_text=False in __init__ ensures we only get the answer
+        return self.generate_batch([full_prompt], prefix=prefix, max_new_tokens=max_new_tokens, stop=stop)[0]
+
+    def generate_batch(self, prompts: list, batch_size: int = None, prefix: str = None,
+                       max_new_tokens: int = None, stop: list = None) -> list:
+        """
+        Like generate_raw for several prompts at once: they are left-padded and run
+        together, `batch_size` per forward pass. Returns one string per prompt, in order.
+        A sequence that hits a stop pattern finishes early; the batch runs until all have.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
         try:
-            output = self.pipe(full_prompt)
-            return output[0]['generated_text'].strip()
+            def generate(todo):
+                return self._generate(todo, batch_size or self.batch_size, prefix, max_new_tokens, stop)
+            if self.response_cache is None:
+                return generate(prompts)
+            return self.response_cache.generate(prompts, generate, max_new_tokens, stop)
         except Exception as e:
-            return f"Error generating text: {str(e)}"
+            return [f"Error generating text: {str(e)}"] * len(prompts)
+
+    def stream(self, full_prompt: str, prefix: str = None, max_new_tokens: int = None, stop: list = None):
+        """
+        generate_raw as a generator: yields the answer in text chunks as tokens are decoded,
+        so the first words show up after one forward pass instead of after the whole answer.
+        """
+        if self.response_cache is not None:
+            cached = self.response_cache.get(full_prompt, max_new_tokens, stop)
+            if cached is not None:
+                yield cached
+                return
+        patterns = compile_stops(stop)
+        text = ""
+        started = time.perf_counter()
+        try:
+            # The timeout bounds the wait for each chunk, in case generate() hangs
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                            timeout=settings.STREAM_CHUNK_TIMEOUT_S)
+            kwargs = self._generate_inputs([full_prompt], prefix, max_new_tokens, patterns)
+            failure = []
+
+            def generate():
+                try:
+                    self.model.generate(**kwargs, streamer=streamer)
+                except Exception as e:
+                    # Ends the stream so the loop below stops; the error is raised after it
+                    failure.append(e)
+                    streamer.end()
+
+            worker = threading.Thread(target=generate, daemon=True)
+            worker.start()
+            for chunk in streamer:
+                if not text:
+                    chunk = chunk.lstrip()
+                cut = truncate(text + chunk, patterns)
+                chunk = cut[len(text):]
+                text = cut
+                if chunk:
+                    if text == chunk:
+                        METRICS.observe("llm_first_chunk_seconds", time.perf_counter() - started)
+                    yield chunk
+            worker.join()
+            if failure:
+                raise failure[0]
+            METRICS.observe("llm_generation_seconds", time.perf_counter() - started, path="stream")
+        except queue.Empty:  # The streamer's timeout
+            yield f"Error generating text: no output for {settings.STREAM_CHUNK_TIMEOUT_S} s"
+            return
+        except Exception as e:
+            yield f"Error generating text: {str(e)}"
+            return
+        if self.response_cache is not None:
+            self.response_cache.put(full_prompt, text.strip(), max_new_tokens, stop)
+
+    def _generate(self, prompts, batch_size, prefix=None, max_new_tokens=None, stop=None):
+        prefixed = bool(prefix) and all(p.startswith(prefix) for p in prompts)
+        if prefixed or stop:
+            patterns = compile_stops(stop)
+            outputs = []
+            for i in range(0, len(prompts), batch_size):
+                outputs.extend(self._generate_direct(prompts[i:i + batch_size], prefix if prefixed else None,
+                                                     max_new_tokens, patterns))
+            return outputs
+        # The pipeline automatically handles the generation
+        # return_full_text=False in __init__ ensures we only get the answer
+        outputs = self.pipe(prompts, batch_size=batch_size, **self._overrides(max_new_tokens),
+                            **self._clock("pipeline"))
+        return [output[0]['generated_text'].strip() for output in outputs]
+
+    def count_tokens(self, text: str) -> int:
+        """Prompt tokens `text` costs (no special tokens). Thread-safe: uses its own tokenizer copy."""
+        with self._count_lock:
+            if self._count_tokenizer is None:
+                self._count_tokenizer = copy.deepcopy(self.tokenizer)
+            return len(self._count_tokenizer(text, add_special_tokens=False).input_ids)
+
+    @staticmethod
+    def release_memory():
+        """Returns freed GPU memory to the allocator pool (e.g. between generation rounds)."""
+        gc.collect()
+        torch.cuda.empty_cache()
+
+    def _overrides(self, max_new_tokens):
+        return {} if max_new_tokens is None else {"max_new_tokens": max_new_tokens}
+
+    def _clock(self, path):
+        """generate() kwargs that time prefill and decoding, when metrics are on."""
+        return {"streamer": _GenerationClock(self.tokenizer.pad_token_id, path)} if METRICS.enabled else {}
+
+    # --- DIRECT GENERATION (prefix KV cache, stop patterns, streaming) ---
+    def _prefix_state(self, prefix):
+        state = self.prefix_cache.get(prefix)
+        if state is None:
+            # Tokenized on its own (with BOS, as the pipeline would); prefixes should end on a
+            # newline so this matches how the full prompt tokenizes
+            ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+            with torch.no_grad():
+                state = (ids, self.model(ids, use_cache=True).past_key_values)
+            self.prefix_cache.put(prefix, state)
+        return state
+
+    def _generate_inputs(self, prompts, prefix=None, max_new_tokens=None, patterns=None):
+        """model.generate kwargs for left-padded prompts, continuing from the cached prefix state if given."""
+        kwargs = {**self.generation_kwargs, **self._overrides(max_new_tokens),
+                  "pad_token_id": self.tokenizer.pad_token_id}
+        if prefix is None:
+            inputs = self.tokenizer(prompts, padding=True, return_tensors="pt").to(self.model.device)
+            input_ids, attention_mask = inputs.input_ids, inputs.attention_mask
+        else:
+            prefix_ids, past = self._prefix_state(prefix)
+            n = len(prompts)
+            suffixes = self.tokenizer([p[len(prefix):] for p in prompts], add_special_tokens=False,
+                                      padding=True, return_tensors="pt").to(self.model.device)
+            # [prefix][left padding][suffix]: the mask hides the padding, so positions stay contiguous
+            input_ids = torch.cat([prefix_ids.expand(n, -1), suffixes.input_ids], dim=1)
+            attention_mask = torch.cat([torch.ones_like(prefix_ids).expand(n, -1), suffixes.attention_mask], dim=1)
+            past = copy.deepcopy(past)  # generate() appends to the cache in place
+            if n > 1:
+                past.batch_repeat_interleave(n)
+            kwargs["past_key_values"] = past
+        if patterns:
+            kwargs["stopping_criteria"] = StoppingCriteriaList(
+                [StopOnPatterns(self.tokenizer, input_ids.shape[1], patterns)])
+        return {"input_ids": input_ids, "attention_mask": attention_mask, **kwargs}
+
+    def _generate_direct(self, prompts, prefix=None, max_new_tokens=None, patterns=None):
+        """Generates with model.generate directly; `prefix` (if given) must start every prompt."""
+        kwargs = self._generate_inputs(prompts, prefix, max_new_tokens, patterns)
+        with torch.no_grad():
+            output = self.model.generate(**kwargs, **self._clock("direct" if prefix is None else "prefix"))
+        texts = self.tokenizer.batch_decode(output[:, kwargs["input_ids"].shape[1]:], skip_special_tokens=True)
+        return [truncate(text, patterns or []).strip() for text in texts]
 
     def analyze(self, context: str, query: str) -> str:
         """
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Whitespace-insensitive form of a text, used for cache keys."""
+    return " ".join(str(text).split())
+
+
+class DiskCache:
+    """
+    Persistent, content-addressed key -> JSON value cache (SQLite).
+
+    Keys are SHA-256 digests of everything that determines the value (see make_key),
+    so entries never need invalidating. Total payload size is bounded: once it
+    exceeds max_bytes the least recently used entries are evicted. Safe to share
+    between threads and between processes (SQLite file locking).
+    """
+
+    def __init__(self, path, max_bytes=1 << 30):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime)")
+        self._db.commit()
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_many(self, keys, namespace="default"):
+        """Returns {key: value} for the keys that are cached, and counts hits/misses."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique), 500):  # SQLite host-parameter limit
+                chunk = unique[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(f"SELECT key, value FROM cache WHERE key IN ({marks})", chunk)
+                found.update((k, json.loads(v)) for k, v in rows)
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE cache SET atime = ? WHERE key = ?", [(now, k) for k in found])
+                self._db.commit()
+        hits = sum(1 for k in keys if k in found)
+        self.hits[namespace] = self.hits.get(namespace, 0) + hits
+        self.misses[namespace] = self.misses.get(namespace, 0) + len(keys) - hits
+        return found
+
+    def get(self, key, namespace="default"):
+        return self.get_many([key], namespace).get(key)
+
+    def put_many(self, items):
+        """Stores {key: JSON-serialisable value}."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            payload = json.dumps(value)
+            rows.append((key, payload, len(payload), now))
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO cache (key, value, size, atime) VALUES (?, ?, ?, ?)", rows)
+            self._total += sum(r[2] for r in rows)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def _evict(self):
+        # Drop least recently used entries down to 90% of the budget
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM cache ORDER BY atime"):
+            if self._total <= target:
+                break
+            victims.append((key,))
+            self._total -= size
+        self._db.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+    def stats(self):
+        """{namespace: {"hits": n, "misses": n}}"""
+        names = set(self.hits) | set(self.misses)
+        return {n: {"hits": self.hits.get(n, 0), "misses": self.misses.get(n, 0)} for n in sorted(names)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LRUCache:
+    """
+    Bounded in-memory LRU map with hit/miss counters, safe to share between threads.
+    Callers make keys self-invalidating (e.g. include a version number) instead of deleting entries.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._data), "hit_rate": self.hits / lookups if lookups else 0.0}
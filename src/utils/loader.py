@@ -1,47 +1,142 @@
+import copy
 import csv
 import glob
+import hashlib
 import os
-import spacy
 import json
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline 
+from importlib import metadata
 from src.graph.schema import Node, TemporalEdge, MarketingTopic, Sentiment
+from src.utils.cache import DiskCache, normalize_text
+from src.utils.metrics import METRICS
+from src.utils.topics import load_topic_classifier, topic_model_id, DEFAULT_EMBEDDING_MODEL
+
+# spaCy pipeline used for brand NER
+NER_MODEL = "en_core_web_sm"
+
+# NDJSON files larger than this are split into byte ranges for parallel mode
+SHARD_BYTES = 64 * 1024 * 1024
+
+# Pipeline end-of-stream marker, and the wrapper a failing stage sends downstream
+_DONE = object()
+
+
+class _StageFailure:
+    def __init__(self, error):
+        self.error = error
+
+
+# Per-process loader used by pool workers (models are loaded once per worker)
+_worker_loader = None
+
+
+def _init_worker(options, threads):
+    global _worker_loader
+    import torch
+    torch.set_num_threads(threads)  # Avoid N workers x all-core BLAS oversubscription
+    _worker_loader = UnsupervisedLoader(None, None, **options)
+
+
+def _run_shard(shard):
+    """Pool task: returns the (brand, review, edge) triples of one shard, plus the shard's cache counts and metrics."""
+    triples = []
+    cache = _worker_loader.cache
+    before = cache.stats() if cache else {}
+    _worker_loader._process_file(*shard, sink=triples.extend)
+    after = cache.stats() if cache else {}
+    counts = {name: {k: v - before.get(name, {}).get(k, 0) for k, v in c.items()} for name, c in after.items()}
+    return triples, counts, METRICS.drain()
+
 
 class UnsupervisedLoader:
-    def __init__(self, graph_engine, llm_engine):
+    def __init__(self, graph_engine, llm_engine, workers: int = 1,
+                 batch_size: int = None, ner_batch_size: int = 64, queue_depth: int = 4,
+                 cache_path: str = None, cache_max_mb: int = 2048,
+                 topic_mode: str = "zeroshot", embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+                 checkpoint_every: int = 5000, models: dict = None):
         self.graph = graph_engine
         self.llm = llm_engine
-        
+        # workers > 1 spreads files (and byte ranges of big NDJSON files) over a process pool
+        self.workers = workers
+        # Rows between checkpoint commits within a file (parallel mode checkpoints per shard)
+        self.checkpoint_every = checkpoint_every
+        # Topic classifier: "zeroshot" (BART NLI, one pass per label) or "embedding" (one cosine matmul)
+        self.topic_mode = topic_mode
+        self.embedding_model = embedding_model
+        # Pipeline sizing: classifier batch, nlp.pipe batch, and max batches queued between stages
+        if batch_size is None:
+            batch_size = 256 if topic_mode == "embedding" else 16
+        self.batch_size = batch_size
+        self.ner_batch_size = ner_batch_size
+        self.queue_depth = queue_depth
+        # Persistent NER / topic result cache (None = always run the models)
+        self.cache_path = cache_path
+        self.cache_max_mb = cache_max_mb
+        self.cache = DiskCache(cache_path, max_bytes=cache_max_mb << 20) if cache_path else None
+
+        # Models are loaded on first use (see the properties below): a parallel-mode parent
+        # never needs them, and a run answered entirely from the cache never loads them.
+        # Their IDs (part of the cache keys) come from package metadata instead.
+        # `models` presets any of "nlp", "vader", "classifier" (e.g. stand-ins for benchmarks;
+        # serial mode only, pool workers load the real ones).
+        models = models or {}
+        self._nlp, self._vader, self._classifier = models.get("nlp"), models.get("vader"), models.get("classifier")
+        if self._nlp is not None:
+            self.ner_model_id = f"{self._nlp.meta['name']}-{self._nlp.meta['version']}"
+        else:
+            # spaCy names a pipeline "<name>" in meta.json and packages it as "<lang>_<name>"
+            try:
+                self.ner_model_id = f"{NER_MODEL.partition('_')[2]}-{metadata.version(NER_MODEL)}"
+            except metadata.PackageNotFoundError:
+                print("[ERROR] SpaCy model not found.")
+                raise
+        if self._classifier is not None:
+            self.classifier_model_id = getattr(self._classifier, "model_id", type(self._classifier).__name__)
+        else:
+            self.classifier_model_id = topic_model_id(topic_mode, embedding_model)
+
+        self.topic_labels = [t.value for t in MarketingTopic] 
+        self.topic_map = {t.value: t for t in MarketingTopic}
+
+    # --- MODELS (loaded on first use) ---
+    @property
+    def nlp(self):
         # 1. NER
-        print("[LOADER] Initializing SpaCy...")
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except:
-            print("[ERROR] SpaCy model not found.")
-            raise
+        if self._nlp is None:
+            print("[LOADER] Initializing SpaCy...")
+            import spacy
+            try:
+                nlp = spacy.load(NER_MODEL)
+            except:
+                print("[ERROR] SpaCy model not found.")
+                raise
+            # Only doc.ents is used: run the NER component alone (it has its own tok2vec)
+            nlp.select_pipes(enable=["ner"])
+            self._nlp = nlp
+        return self._nlp
 
+    @property
+    def vader(self):
         # 2. VADER
-        print("[LOADER] Initializing VADER...")
-        self.vader = SentimentIntensityAnalyzer()
+        if self._vader is None:
+            print("[LOADER] Initializing VADER...")
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            self._vader = SentimentIntensityAnalyzer()
+        return self._vader
 
+    @property
+    def classifier(self):
         # 3. TOPIC CLASSIFIER (CPU MODE)
-        # CRITICAL FIX: We set device=-1 to run on CPU. 
+        # CRITICAL FIX: We run on CPU. 
         # This saves GPU memory for Llama-3.
-        print("[LOADER] Initializing Zero-Shot Classifier (CPU Mode)...")
-        
-        # Check for local model first (from your download step)
-        local_model = "/projectnb/cs599x1/students/akhilg/directed_study_v/brand_audit/models/bart-large-mnli"
-        
-        if os.path.exists(local_model):
-            print(f"   -> Loading from local: {local_model}")
-            self.classifier = pipeline("zero-shot-classification", model=local_model, device=-1)
-        else:
-            print("   -> Loading from Hub (Requires Internet on Login Node)")
-            self.classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli", device=-1)
-
-        self.topic_labels = [t.value for t in MarketingTopic] 
-        self.topic_map = {t.value: t for t in MarketingTopic}
+        if self._classifier is None:
+            print(f"[LOADER] Initializing Topic Classifier ({self.topic_mode}, CPU Mode)...")
+            self._classifier, _ = load_topic_classifier(self.topic_mode, self.embedding_model)
+        return self._classifier
 
     def load_directory(self, data_dir: str):
         print(f"\n[LOADER] Scanning: {data_dir}")
@@ -53,17 +148,184 @@ class UnsupervisedLoader:
 
         print(f"[LOADER] Found {len(files)} files. Starting Ingestion...")
         
-        total_edges = 0
+        # Per-file checkpoints, committed together with the graph (see _checkpoint):
+        # finished files are skipped and partial ones resume after their last committed batch
+        progress = copy.deepcopy(self.graph.meta.get("ingest_progress", {}))
+        legacy = self.graph.meta.get("ingested_files", {})
+        todo = []
         for file_path in files:
-            try:
-                edges = self._process_file(file_path)
-                total_edges += edges
-            except Exception as e:
-                print(f"   [Error] {os.path.basename(file_path)}: {e}")
+            filename = os.path.basename(file_path)
+            entry = progress[filename] = self._file_entry(file_path, progress.get(filename), legacy.get(filename))
+            if entry["done"]:
+                print(f" -> Skipping {filename} (already ingested)")
+                continue
+            if entry["rows"]:
+                print(f" -> Resuming {filename} at row {entry['rows']}")
+            todo.append(file_path)
+
+        if self.workers > 1:
+            total_edges = self._load_parallel(todo, progress)
+        else:
+            total_edges = 0
+            for file_path in todo:
+                filename = os.path.basename(file_path)
+                entry = progress[filename]
+                pending = [entry["rows"]]  # Row count at the last commit
+
+                def advance(next_row):
+                    entry["rows"] = next_row
+                    if next_row - pending[0] >= self.checkpoint_every:
+                        self._checkpoint(progress)
+                        pending[0] = next_row
+
+                try:
+                    edges = self._process_file(file_path, resume_row=entry["rows"], sink=self._insert,
+                                               on_progress=advance)
+                    total_edges += edges
+                    entry["done"] = True
+                except Exception as e:
+                    print(f"   [Error] {filename}: {e}")
+                # Edges so far + where to resume (no-op unless the engine has a write-ahead log)
+                self._checkpoint(progress)
 
         print(f"\n[LOADER] Ingestion Complete. Total Data Points: {total_edges}")
+        self._report_cache()
+
+    def _checkpoint(self, progress):
+        """Commits the edges inserted so far together with the per-file progress that produced them."""
+        self.graph.commit({"ingest_progress": copy.deepcopy(progress)})
+
+    def _file_entry(self, file_path, entry, legacy_fingerprint=None):
+        """
+        Checkpoint entry for one file: content hash, size/mtime, rows done and a done flag.
+        The hash is only recomputed when size or mtime changed; a file whose content
+        changed since its checkpoint starts over.
+        """
+        stat = os.stat(file_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+        digest = self._file_digest(file_path)
+        if entry and entry["sha256"] == digest:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)  # Touched, not modified
+            return entry
+        if entry:
+            print(f" -> {os.path.basename(file_path)} changed since it was checkpointed; ingesting it again")
+        # Graphs written before checkpoints existed only recorded finished files as "size:mtime"
+        done = legacy_fingerprint == f"{stat.st_size}:{stat.st_mtime_ns}"
+        return {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": 0, "done": done}
+
+    @staticmethod
+    def _file_digest(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _report_cache(self):
+        if self.cache is None:
+            return
+        for name, counts in self.cache.stats().items():
+            lookups = counts["hits"] + counts["misses"]
+            rate = 100.0 * counts["hits"] / lookups if lookups else 0.0
+            print(f"[LOADER] Cache ({name}): {counts['hits']} hits / {counts['misses']} misses ({rate:.1f}% hit rate)")
+
+    def _load_parallel(self, todo, progress):
+        """
+        Runs shards on a process pool and merges them in file/shard order, so the
+        graph gets exactly the edges (and edge keys) a serial run would produce.
+        Progress is checkpointed after every merged shard.
+        """
+        shards = []
+        for file_path in todo:
+            resume_row = progress[os.path.basename(file_path)]["rows"]
+            shards.extend(self._plan_shards(file_path, resume_row))
+        print(f"[LOADER] Parallel mode: {len(shards)} shards on {self.workers} workers.")
+
+        total_edges = 0
+        failed = set()
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn: each worker starts clean and loads its own spaCy/BART/VADER once
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(self._worker_options(), threads)) as pool:
+            futures = [pool.submit(_run_shard, shard) for shard, _ in shards]
+            for future, (shard, end_row) in zip(futures, shards):
+                filename = os.path.basename(shard[0])
+                try:
+                    triples, counts, shard_metrics = future.result()
+                    self._merge_cache_counts(counts)
+                    METRICS.merge(shard_metrics)
+                    if filename not in failed:
+                        self._insert(triples)
+                        total_edges += len(triples)
+                        if end_row is None:
+                            progress[filename]["done"] = True
+                        else:
+                            progress[filename]["rows"] = end_row
+                except Exception as e:
+                    print(f"   [Error] {filename}: {e}")
+                    failed.add(filename)
+                self._checkpoint(progress)
+        return total_edges
 
-    def _process_file(self, file_path):
+    def _worker_options(self):
+        return {"batch_size": self.batch_size, "ner_batch_size": self.ner_batch_size,
+                "queue_depth": self.queue_depth,
+                "topic_mode": self.topic_mode, "embedding_model": self.embedding_model,
+                "cache_path": self.cache_path, "cache_max_mb": self.cache_max_mb}
+
+    def _merge_cache_counts(self, counts):
+        # Workers do the lookups; fold their counts in so the end-of-run report covers them
+        if self.cache is None:
+            return
+        for name, c in counts.items():
+            self.cache.hits[name] = self.cache.hits.get(name, 0) + c.get("hits", 0)
+            self.cache.misses[name] = self.cache.misses.get(name, 0) + c.get("misses", 0)
+
+    def _plan_shards(self, file_path, resume_row=0):
+        """
+        Splits a file into ((path, start byte, end byte, first row, resume row), end row) shards,
+        end row being None for the last one. CSV files stay whole; NDJSON files are cut on
+        line boundaries every SHARD_BYTES. Shards that end before `resume_row` are dropped.
+        """
+        size = os.path.getsize(file_path)
+        if not file_path.endswith('.json') or size <= SHARD_BYTES:
+            return [((file_path, None, None, 0, resume_row), None)]
+
+        boundaries = [0]
+        with open(file_path, 'rb') as f:
+            while boundaries[-1] + SHARD_BYTES < size:
+                f.seek(boundaries[-1] + SHARD_BYTES)
+                f.readline()  # Move to the start of the next line
+                if f.tell() >= size:
+                    break
+                boundaries.append(f.tell())
+
+            # Row number of each shard's first line (keeps review IDs identical to a serial run)
+            first_rows, rows = [0], 0
+            f.seek(0)
+            for start, end in zip(boundaries, boundaries[1:]):
+                remaining = end - start
+                while remaining:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    rows += chunk.count(b"\n")
+                    remaining -= len(chunk)
+                first_rows.append(rows)
+
+        ends = boundaries[1:] + [size]
+        end_rows = first_rows[1:] + [None]
+        return [((file_path, s, e, r, resume_row), end_row)
+                for s, e, r, end_row in zip(boundaries, ends, first_rows, end_rows)
+                if end_row is None or end_row > resume_row]
+
+    def _process_file(self, file_path, start=None, end=None, first_row=0, resume_row=0,
+                      sink=None, on_progress=None):
+        """
+        Mines rows [max(first_row, resume_row), ...) of a file (or of the byte range
+        start..end of an NDJSON file whose first line is row `first_row`).
+        """
         filename = os.path.basename(file_path)
         print(f" -> Mining {filename}...", end=" ")
         
@@ -71,24 +333,132 @@ class UnsupervisedLoader:
         is_json = file_path.endswith('.json')
         
         if is_json:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                iterator = (json.loads(line) for line in f)
-                return self._process_stream(iterator, filename)
+            if start is None:
+                start, end = 0, os.path.getsize(file_path)
+            if resume_row > first_row:
+                # Seek straight past the finished rows (newline count only, no JSON parsing)
+                start = self._skip_lines(file_path, start, resume_row - first_row)
+                first_row = resume_row
+            return self._process_stream(self._iter_ndjson_range(file_path, start, end), filename,
+                                        sink, first_row, on_progress=on_progress)
         else:
             with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
                 reader = csv.DictReader(f)
                 if not reader.fieldnames: return 0
-                return self._process_stream(reader, filename)
+                return self._process_stream(reader, filename, sink, resume_row=resume_row,
+                                            on_progress=on_progress)
+
+    @staticmethod
+    def _skip_lines(file_path, start, n):
+        """Byte offset just past `n` lines from `start`."""
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            while n:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                count = chunk.count(b"\n")
+                if count < n:
+                    n -= count
+                    offset += len(chunk)
+                    continue
+                pos = -1
+                for _ in range(n):
+                    pos = chunk.index(b"\n", pos + 1)
+                return offset + pos + 1
+            return offset
+
+    @staticmethod
+    def _iter_ndjson_range(file_path, start, end):
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                yield json.loads(line)
+
+    def _insert(self, triples):
+        self.graph.add_batch(triples)
+
+    def _process_stream(self, iterator, filename, sink, first_row=0, resume_row=0, on_progress=None):
+        """
+        Streaming pipeline with one thread per stage and bounded queues in between:
+
+            parse rows -> batched NER (nlp.pipe) -> batched topic classifier + VADER -> sink (this thread)
+
+        Each stage works on its next batch while the following stage runs, and at most
+        `queue_depth` batches wait between two stages, so memory stays flat on any input.
+        Batches reach the classifier in the same order and sizes as a serial pass.
+        After each batch is handed to `sink`, on_progress(next row) reports how far the
+        file is done; rows before `resume_row` are skipped.
+        """
+        stop = threading.Event()
+        parsed, tagged, classified = (queue.Queue(self.queue_depth) for _ in range(3))
+        stages = [
+            (self._parse_stage(iterator, filename, first_row, resume_row), parsed),
+            (self._ner_stage(self._drain(parsed, stop)), tagged),
+            (self._classify_stage(self._drain(tagged, stop)), classified),
+        ]
+        for produce, outbox in stages:
+            threading.Thread(target=self._run_stage, args=(produce, outbox, stop), daemon=True).start()
 
-    def _process_stream(self, iterator, filename):
-        batch_data = []
         valid_count = 0
-        
-        # Reduce batch size to prevent RAM crashes
-        BATCH_SIZE = 16 
-        
-        for i, row in enumerate(iterator):
-            if i > 200: break # Keep limit small for testing
+        try:
+            # 4. Graph insertion stays on the caller's thread (the engine is not thread-safe)
+            for triples, next_row in self._drain(classified, stop):
+                if triples:
+                    sink(triples)
+                    valid_count += len(triples)
+                if on_progress is not None:
+                    on_progress(next_row)
+        finally:
+            stop.set()  # Unblocks the stage threads if we bail out early
+
+        print(f" -> Extracted {valid_count} reviews.")
+        return valid_count
+
+    # --- PIPELINE PLUMBING ---
+    @staticmethod
+    def _run_stage(produce, outbox, stop):
+        try:
+            for item in produce:
+                if not UnsupervisedLoader._put(outbox, item, stop):
+                    return
+        except Exception as e:
+            UnsupervisedLoader._put(outbox, _StageFailure(e), stop)
+        UnsupervisedLoader._put(outbox, _DONE, stop)
+
+    @staticmethod
+    def _put(outbox, item, stop):
+        while not stop.is_set():
+            try:
+                outbox.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _drain(inbox, stop):
+        while not stop.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.error
+            yield item
+
+    # --- PIPELINE STAGES ---
+    def _parse_stage(self, iterator, filename, first_row, resume_row=0):
+        """1. Rows -> candidate reviews, in chunks of ner_batch_size."""
+        chunk = []
+        for i, row in enumerate(iterator, first_row):
+            if i < resume_row: continue  # Already ingested (checkpointed)
             
             # Normalize
             row_lower = {k.lower(): v for k, v in row.items()}
@@ -106,44 +476,105 @@ class UnsupervisedLoader:
 
             if len(full_text) < 15: continue
 
-            # NER Check
-            doc = self.nlp(full_text)
-            brands = [e.text for e in doc.ents if e.label_ == "ORG" and len(e.text) > 2]
-            valid_brands = [b for b in brands if b.lower() not in ["amazon", "seller", "usa", "china"]]
-            
-            if not valid_brands: continue
-            
-            # Add to Batch
-            batch_data.append({
-                'brand': valid_brands[0],
+            chunk.append({
                 'text': full_text,
                 'rating': rating,
                 'date': raw_date,
-                'id': f"Rev_{filename}_{i}"
+                'id': f"Rev_{filename}_{i}",
+                'row': i
             })
-            
-            # Process Batch when full
-            if len(batch_data) >= BATCH_SIZE:
-                valid_count += self._process_batch(batch_data)
-                batch_data = []
+            if len(chunk) >= self.ner_batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
+    def _ner_stage(self, chunks):
+        """2. Batched NER; re-chunks the reviews that name a brand into classifier batches."""
+        batch_data = []
+        for chunk in chunks:
+            orgs = self._extract_orgs([item['text'] for item in chunk])
+            for item, entities in zip(chunk, orgs):
+                brands = [e for e in entities if len(e) > 2]
+                valid_brands = [b for b in brands if b.lower() not in ["amazon", "seller", "usa", "china"]]
+                
+                if not valid_brands: continue
+                
+                item['brand'] = valid_brands[0]
+                batch_data.append(item)
+                if len(batch_data) >= self.batch_size:
+                    yield batch_data
+                    batch_data = []
         # Process remaining
         if batch_data:
-            valid_count += self._process_batch(batch_data)
-            
-        print(f" -> Extracted {valid_count} reviews.")
-        return valid_count
+            yield batch_data
+
+    def _extract_orgs(self, texts):
+        """ORG entity texts per text; spaCy only runs on the cache misses."""
+        if self.cache is None:
+            return self._run_ner(texts)
+
+        keys = [DiskCache.make_key("ner", self.ner_model_id, normalize_text(t)) for t in texts]
+        found = self.cache.get_many(keys, namespace="ner")
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            fresh = dict(zip((keys[i] for i in missing), self._run_ner([texts[i] for i in missing])))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def _run_ner(self, texts):
+        nlp = self.nlp  # Loaded outside the timer
+        with METRICS.timer("loader_ner_seconds"):
+            docs = nlp.pipe(texts, batch_size=self.ner_batch_size)
+            orgs = [[e.text for e in doc.ents if e.label_ == "ORG"] for doc in docs]
+        METRICS.inc("loader_ner_texts_total", len(texts))
+        return orgs
+
+    def _classify_topics(self, texts):
+        """Topic {'labels', 'scores'} per text; the classifier only runs on the cache misses."""
+        if self.cache is None:
+            return self._run_classifier(texts)
+
+        keys = [DiskCache.make_key("topic", self.classifier_model_id, json.dumps(self.topic_labels),
+                                   normalize_text(t)) for t in texts]
+        found = self.cache.get_many(keys, namespace="topic")
+        missing = [i for i, k in enumerate(keys) if k not in found]
+        if missing:
+            results = self._run_classifier([texts[i] for i in missing])
+            fresh = {keys[i]: {'labels': r['labels'], 'scores': [float(s) for s in r['scores']]}
+                     for i, r in zip(missing, results)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def _run_classifier(self, texts):
+        classifier = self.classifier
+        with METRICS.timer("loader_topic_seconds"):
+            results = classifier(texts, candidate_labels=self.topic_labels, batch_size=self.batch_size)
+        METRICS.inc("loader_topic_texts_total", len(texts))
+        # The pipeline unwraps single-item inputs into a bare dict
+        return [results] if isinstance(results, dict) else results
+
+    def _classify_stage(self, batches):
+        """3. Topic classification + sentiment -> (graph triples, next unprocessed row)."""
+        for batch in batches:
+            yield self._process_batch(batch), batch[-1]['row'] + 1
 
     def _process_batch(self, batch):
         texts = [d['text'][:512] for d in batch] # Truncate for speed
         
-        # Zero-Shot (Runs on CPU now)
+        # Topic classifier (Runs on CPU now)
         try:
-            results = self.classifier(texts, candidate_labels=self.topic_labels)
-        except:
-            return 0
+            results = self._classify_topics(texts)
+        except Exception as e:
+            # The file fails instead of losing the batch: its checkpoint stays before these
+            # rows, so a resumed ingest classifies them again
+            METRICS.inc("loader_failed_batches_total")
+            print(f"   [Error] Topic classifier failed on rows {batch[0]['row']}-{batch[-1]['row']}: {e}")
+            raise
 
-        count = 0
+        triples = []
         for i, item in enumerate(batch):
             # Topic
             top_label = results[i]['labels'][0]
@@ -153,7 +584,8 @@ class UnsupervisedLoader:
             if item['rating'] >= 4.5: sent = Sentiment.POSITIVE
             elif item['rating'] <= 2.0: sent = Sentiment.NEGATIVE
             else:
-                vs = self.vader.polarity_scores(item['text'])
+                with METRICS.timer("loader_vader_seconds"):
+                    vs = self.vader.polarity_scores(item['text'])
                 if vs['compound'] >= 0.05: sent = Sentiment.POSITIVE
                 elif vs['compound'] <= -0.05: sent = Sentiment.NEGATIVE
                 else: sent = Sentiment.NEUTRAL
@@ -166,9 +598,8 @@ class UnsupervisedLoader:
 
             # Graph
             b_node = Node(item['brand'], "Brand")
-            r_node = Node(item['id'], "Review", {"text": item['text'][:200]})
+            r_node = Node(item['id'], "Review", {"text": item['text'][:200], "rating": item['rating']})
             edge = TemporalEdge(item['brand'], item['id'], "REVIEWED_IN", topic_enum, sent, date_obj)
             
-            self.graph.add_data(b_node, r_node, edge)
-            count += 1
-        return count
\ No newline at end of file
+            triples.append((b_node, r_node, edge))
+        return triples
\ No newline at end of file
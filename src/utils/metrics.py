@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from config import settings
+
+# Histogram bucket upper bounds: durations from 1 us to ~2 min, counts (e.g. tokens) up to 128k
+TIME_BUCKETS = tuple(1e-6 * 2 ** i for i in range(28))
+COUNT_BUCKETS = tuple(float(2 ** i) for i in range(18))
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus layout) with exact count/sum/min/max."""
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above the largest bound (+Inf)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate, interpolating linearly inside the bucket the q-th observation falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / n
+                return min(max(estimate, self.min), self.max)
+            seen += n
+        return self.max
+
+    def merge(self, other):
+        for i, n in enumerate(other["counts"]):
+            self.counts[i] += n
+        self.count += other["count"]
+        self.sum += other["sum"]
+        self.min = min(self.min, other["min"])
+        self.max = max(self.max, other["max"])
+
+    def state(self):
+        return {"counts": list(self.counts), "count": self.count, "sum": self.sum, "min": self.min, "max": self.max}
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms.
+
+    Disabled (the default) every call returns immediately; hot loops check `enabled`
+    before even reading the clock. Series are keyed by name plus optional labels,
+    e.g. observe("agent_prompt_build_seconds", 0.01, agent="critic").
+    Exported as a JSON summary (count, mean, p50/p95/p99) and in the Prometheus text format.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}    # (name, labels) -> number
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def timer(self, name, **labels):
+        """`with METRICS.timer("loader_ner_seconds"):` observes the block's duration."""
+        return _Timer(self, name, labels) if self.enabled else _NULL_TIMER
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # --- TRANSFER (e.g. from ingest worker processes) ---
+    def drain(self):
+        """Picklable state of every series, then reset."""
+        with self._lock:
+            state = {"histograms": [(k, h.buckets, h.state()) for k, h in self._histograms.items()],
+                     "counters": list(self._counters.items())}
+            self._histograms.clear()
+            self._counters.clear()
+        return state
+
+    def merge(self, state):
+        if not self.enabled or not state:
+            return
+        with self._lock:
+            for key, buckets, data in state["histograms"]:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(tuple(buckets))
+                histogram.merge(data)
+            for key, value in state["counters"]:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    # --- EXPORT ---
+    @staticmethod
+    def _series(name, labels):
+        return name + ("{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}" if labels else "")
+
+    def report(self):
+        """{"histograms": {series: summary}, "counters": {series: value}}"""
+        with self._lock:
+            histograms = {self._series(*k): {"count": h.count, "sum": h.sum, "mean": h.sum / h.count,
+                                              "min": h.min, "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                                              "p99": h.quantile(0.99), "max": h.max}
+                          for k, h in sorted(self._histograms.items()) if h.count}
+            counters = {self._series(*k): v for k, v in sorted(self._counters.items())}
+        return {"histograms": histograms, "counters": counters}
+
+    def prometheus(self):
+        """The Prometheus text exposition format."""
+        lines, typed = [], set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{self._series(name, labels)} {value}")
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else f"{bound:.6g}"
+                    lines.append(f"{self._series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+                lines.append(f"{self._series(name + '_sum', labels)} {h.sum}")
+                lines.append(f"{self._series(name + '_count', labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, name, directory=None):
+        """Writes <directory>/<name>.json and <name>.prom; returns their paths (None if disabled)."""
+        if not self.enabled:
+            return None
+        directory = directory or settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        json_path, prom_path = (os.path.join(directory, f"{name}.{ext}") for ext in ("json", "prom"))
+        with open(json_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        with open(prom_path, "w") as f:
+            f.write(self.prometheus())
+        print(f"[Metrics] Wrote {json_path} and {prom_path}")
+        return json_path, prom_path
+
+
+# The process-wide registry every component records into
+METRICS = Metrics(enabled=settings.METRICS_ENABLED)
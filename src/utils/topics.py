@@ -0,0 +1,76 @@
+import os
+import numpy as np
+
+# Local copy of BART-large-MNLI (from setup_model.py), else the Hub model
+LOCAL_ZERO_SHOT_MODEL = "/projectnb/cs599x1/students/akhilg/directed_study_v/brand_audit/models/bart-large-mnli"
+HUB_ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+TOPIC_MODES = ("zeroshot", "embedding")
+
+
+class EmbeddingTopicClassifier:
+    """
+    Fast topic classifier: cosine similarity between review and label embeddings.
+
+    Label descriptions are embedded once per label set; reviews are embedded in large
+    batches and scored with one matrix product, instead of one NLI pass per label.
+    Called like the zero-shot pipeline and returns the same {'labels', 'scores'} dicts
+    (labels sorted by score; scores are a softmax over the similarities).
+    """
+
+    def __init__(self, model_id=DEFAULT_EMBEDDING_MODEL, device="cpu", temperature=0.05):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_id, device=device)
+        self.temperature = temperature
+        self._label_cache = {}
+
+    def _label_matrix(self, labels):
+        key = tuple(labels)
+        matrix = self._label_cache.get(key)
+        if matrix is None:
+            matrix = self._label_cache[key] = self.model.encode(list(labels), normalize_embeddings=True)
+        return matrix
+
+    def __call__(self, texts, candidate_labels, batch_size=256):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        labels = self._label_matrix(candidate_labels)
+        reviews = self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+
+        sims = reviews @ labels.T  # (reviews x labels) cosine similarities
+        logits = sims / self.temperature
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs /= probs.sum(axis=1, keepdims=True)
+        order = np.argsort(-probs, axis=1, kind="stable")
+
+        results = [{'sequence': text,
+                    'labels': [candidate_labels[j] for j in row],
+                    'scores': [float(p[j]) for j in row]}
+                   for text, row, p in zip(texts, order, probs)]
+        return results[0] if single else results
+
+
+def topic_model_id(mode="zeroshot", embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """The model load_topic_classifier would load (used in cache keys), without loading it."""
+    if mode == "embedding":
+        return embedding_model
+    if mode != "zeroshot":
+        raise ValueError(f"Unknown topic classifier mode '{mode}' (expected one of {TOPIC_MODES})")
+    # Check for local model first (from your download step)
+    return LOCAL_ZERO_SHOT_MODEL if os.path.exists(LOCAL_ZERO_SHOT_MODEL) else HUB_ZERO_SHOT_MODEL
+
+
+def load_topic_classifier(mode="zeroshot", embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """Returns (classifier, model ID). Both modes run on CPU to keep GPU memory for Llama-3."""
+    model_id = topic_model_id(mode, embedding_model)
+    if mode == "embedding":
+        print(f"   -> Embedding classifier: {embedding_model}")
+        return EmbeddingTopicClassifier(embedding_model), model_id
+
+    from transformers import pipeline
+    if model_id == LOCAL_ZERO_SHOT_MODEL:
+        print(f"   -> Loading from local: {LOCAL_ZERO_SHOT_MODEL}")
+    else:
+        print("   -> Loading from Hub (Requires Internet on Login Node)")
+    return pipeline("zero-shot-classification", model=model_id, device=-1), model_id